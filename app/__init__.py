@@ -1,20 +1,67 @@
 from flask import Flask
 from config import Config
 
-def create_app(config_class=Config):
-    """Create and configure the Flask application."""
-    app = Flask(__name__, instance_relative_config=True)
+def create_app(config_class=Config, start_scheduler=None, instance_path=None):
+    """
+    Create and configure the Flask application.
+
+    start_scheduler overrides the ENABLE_EMBEDDED_SCHEDULER setting, e.g. for the
+    collector worker, which starts the scheduler once it is the leader.
+    instance_path overrides the instance folder (instance/ by default), e.g. for tests.
+    """
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
     app.config.from_object(config_class)
     app.config.from_pyfile('config.py', silent=True)  # Load instance config if it exists
 
+    # Encode the compact in-memory resources as JSON
+    from app.resource_model import init_app as init_resource_model
+    init_resource_model(app)
+
+    # Stream and compress API responses
+    from app.responses import init_app as init_responses
+    init_responses(app)
+
     # Register blueprints
     from app.routes import main_bp
     app.register_blueprint(main_bp)
 
+    # Register the cluster registry and its API endpoints (the scheduler collects from its clusters)
+    from app.clusters import init_app as init_clusters
+    init_clusters(app)
+
+    # Register the live updates stream (the scheduler publishes collection progress to it)
+    from app.live_updates import init_app as init_live_updates
+    init_live_updates(app)
+
+    # Register the event store and its API endpoints (the scheduler streams events into it)
+    from app.event_store import init_app as init_event_store
+    init_event_store(app)
+
     # Register scheduler and its API endpoints within app context
     from app.scheduler import init_app as init_scheduler
     with app.app_context():
-        init_scheduler(app)
+        init_scheduler(app, start_scheduler=start_scheduler)
+
+    # Register export module and its API endpoints within app context
+    from app.export import init_app as init_export
+    with app.app_context():
+        init_export(app)
+
+    # Register the fleet index and its API endpoints
+    from app.fleet_index import init_app as init_fleet_index
+    init_fleet_index(app)
+
+    # Register the metrics store API endpoints
+    from app.metrics_store import init_app as init_metrics_store
+    init_metrics_store(app)
+
+    # Register the capacity analytics API endpoints
+    from app.capacity import init_app as init_capacity
+    init_capacity(app)
+
+    # Register export jobs API endpoints
+    from app.export_jobs import init_app as init_export_jobs
+    init_export_jobs(app)
 
     @app.route('/health')
     def health_check():
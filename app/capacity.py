@@ -0,0 +1,346 @@
+"""
+Capacity analytics module.
+Computes requests, limits and usage against allocatable capacity per node,
+namespace and cluster, overcommit ratios and scheduling headroom, from the
+node descriptions and `oc adm top` usage of a collection snapshot.
+
+Quantities are parsed in bulk (each distinct quantity string once) and the
+aggregations are NumPy operations over all pods at once, so the analysis
+stays fast on clusters with tens of thousands of pods. The analysis needs no
+Flask app context, so reports rendered in export worker processes use it too.
+"""
+
+import os
+import re
+import logging
+from collections import OrderedDict
+import numpy as np
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Kubernetes quantity suffixes (decimal SI and binary)
+QUANTITY_SUFFIXES = {
+    'n': 1e-9, 'u': 1e-6, 'm': 1e-3, '': 1.0,
+    'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18,
+    'Ki': 2.0 ** 10, 'Mi': 2.0 ** 20, 'Gi': 2.0 ** 30, 'Ti': 2.0 ** 40, 'Pi': 2.0 ** 50, 'Ei': 2.0 ** 60
+}
+QUANTITY_PATTERN = re.compile(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)([a-zA-Z]*)$')
+
+# Rows of the "Non-terminated Pods" table of `oc describe node`:
+# namespace, name, CPU requests (%), CPU limits (%), memory requests (%), memory limits (%), age
+POD_ROW_PATTERN = re.compile(
+    r'^\s+(\S+)\s+(\S+)\s+(\S+)\s+\(\S+\)\s+(\S+)\s+\(\S+\)\s+(\S+)\s+\(\S+\)\s+(\S+)\s+\(\S+\)',
+    re.MULTILINE
+)
+
+# Resource blocks of `oc describe node` ("Capacity:", "Allocatable:"): indented "key: value" lines
+RESOURCE_LINE_PATTERN = re.compile(r'^\s+([\w./-]+):\s+(\S+)\s*$', re.MULTILINE)
+
+def parse_quantity(value):
+    """Parse a Kubernetes quantity (e.g. '250m', '1Gi', '2') to a float, or NaN if it isn't one."""
+    match = QUANTITY_PATTERN.match(str(value).strip())
+    if not match or match.group(2) not in QUANTITY_SUFFIXES:
+        return float('nan')
+    return float(match.group(1)) * QUANTITY_SUFFIXES[match.group(2)]
+
+def parse_quantities(values):
+    """
+    Parse an array of Kubernetes quantities to floats (NaN for invalid ones).
+    Each distinct string is parsed once: a cluster's pods share few distinct quantities.
+    """
+    values = list(values)
+    parsed = {value: parse_quantity(value) for value in set(values)}
+    return np.array(list(map(parsed.__getitem__, values)), dtype='f8')
+
+def _resource_block(description, title):
+    """Get the resources of a block of a node description (e.g. 'Allocatable') as a dict."""
+    start = description.find(f'\n{title}:')
+    if start < 0:
+        if not description.startswith(f'{title}:'):
+            return {}
+        start = 0
+    block = description[start:].split(':', 1)[1]
+    # The block ends at the next non-indented line
+    end = re.search(r'\n\S', block)
+    return dict(RESOURCE_LINE_PATTERN.findall(block[:end.start()] if end else block))
+
+def _pods_table(description):
+    """Get the "Non-terminated Pods" table of a node description, without its header."""
+    start = description.find('Non-terminated Pods:')
+    if start < 0:
+        return ''
+    table = description[start:]
+    end = table.find('\nAllocated resources:')
+    table = table[:end] if end >= 0 else table
+    # Skip the title, column names and separator lines
+    return table.split('\n', 3)[3] if table.count('\n') >= 3 else ''
+
+def _build_tables(data):
+    """
+    Build the node and pod tables of a snapshot as arrays.
+
+    Returns:
+        tuple: (nodes (dict of arrays), pods (dict of arrays))
+    """
+    descriptions = ((data.get('nodes') or {}).get('details') or {})
+    node_names = [name for name, description in descriptions.items() if isinstance(description, str)]
+
+    allocatable = {'cpu': [], 'memory': [], 'pods': []}
+    pod_rows = []
+    pod_counts = []
+    for name in node_names:
+        description = descriptions[name]
+        resources = _resource_block(description, 'Allocatable') or _resource_block(description, 'Capacity')
+        for resource in allocatable:
+            allocatable[resource].append(resources.get(resource, '0'))
+        rows = POD_ROW_PATTERN.findall(_pods_table(description))
+        pod_rows.extend(rows)
+        pod_counts.append(len(rows))
+    # One column per field of the pod rows
+    pod_columns = dict(zip(
+        ('namespace', 'name', 'cpu_requests', 'cpu_limits', 'memory_requests', 'memory_limits'),
+        zip(*pod_rows) if pod_rows else [()] * 6
+    ))
+
+    nodes = {
+        'name': np.array(node_names, dtype=str),
+        'allocatable_cpu': parse_quantities(allocatable['cpu']),
+        'allocatable_memory': parse_quantities(allocatable['memory']),
+        'allocatable_pods': parse_quantities(allocatable['pods'])
+    }
+    pods = {
+        'node': np.repeat(np.arange(len(node_names)), pod_counts).astype('i8'),
+        'namespace': np.array(pod_columns['namespace'], dtype=str),
+        'name': np.array(pod_columns['name'], dtype=str)
+    }
+    for column in ('cpu_requests', 'cpu_limits', 'memory_requests', 'memory_limits'):
+        pods[column] = np.nan_to_num(parse_quantities(pod_columns[column]))
+
+    # Join the usage reported by `oc adm top` on the node name and on the pod namespace/name
+    metrics = data.get('metrics') or {}
+    node_usage = metrics.get('node_usage_list') or []
+    nodes['cpu_usage'], nodes['memory_usage'] = _join_usage(
+        nodes['name'], [entry.get('NAME', '') for entry in node_usage], node_usage
+    )
+    pod_usage = metrics.get('pod_usage_list') or []
+    pods['cpu_usage'], pods['memory_usage'] = _join_usage(
+        np.char.add(np.char.add(pods['namespace'], '/'), pods['name']),
+        [f"{entry.get('NAMESPACE', '')}/{entry.get('NAME', '')}" for entry in pod_usage], pod_usage
+    )
+    return nodes, pods
+
+def _join_usage(keys, usage_keys, usage):
+    """
+    Get the CPU and memory usage of each key from the `oc adm top` entries (NaN where there is none).
+    The join is a sorted search of the keys in the usage keys.
+    """
+    cpu = np.full(len(keys), np.nan)
+    memory = np.full(len(keys), np.nan)
+    if not len(keys) or not usage:
+        return cpu, memory
+    usage_keys = np.array(usage_keys, dtype=str)
+    usage_cpu = parse_quantities([entry.get('CPU(cores)', '') for entry in usage])
+    usage_memory = parse_quantities([entry.get('MEMORY(bytes)', '') for entry in usage])
+
+    order = np.argsort(usage_keys, kind='stable')
+    sorted_keys = usage_keys[order]
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    found = sorted_keys[positions] == keys
+    cpu[found] = usage_cpu[order[positions[found]]]
+    memory[found] = usage_memory[order[positions[found]]]
+    return cpu, memory
+
+def _ratio(numerator, denominator):
+    """Element-wise ratio, NaN where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype='f8')
+    denominator = np.asarray(denominator, dtype='f8')
+    return np.divide(numerator, denominator, out=np.full(np.broadcast(numerator, denominator).shape, np.nan), where=denominator > 0)
+
+def _number(value, digits=3):
+    """Convert a NumPy number to a JSON-friendly rounded float (None for NaN)."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+def _group_totals(index, count, pods):
+    """Sum the requests, limits and usage of the pods of each group (node or namespace)."""
+    totals = {'pods': np.bincount(index, minlength=count)}
+    for column in ('cpu_requests', 'cpu_limits', 'memory_requests', 'memory_limits'):
+        totals[column] = np.bincount(index, weights=pods[column], minlength=count)
+    for column in ('cpu_usage', 'memory_usage'):
+        totals[column] = np.bincount(index, weights=np.nan_to_num(pods[column]), minlength=count)
+        # Usage is unknown for a group none of whose pods have usage
+        totals[column][np.bincount(index, weights=~np.isnan(pods[column]), minlength=count) == 0] = np.nan
+    return totals
+
+def _summaries(totals, allocatable=None):
+    """Derive the ratios of group totals and convert them to JSON-friendly summaries."""
+    summary = {key: values for key, values in totals.items()}
+    if allocatable is not None:
+        summary.update(allocatable)
+        for resource in ('cpu', 'memory'):
+            summary[f'{resource}_request_ratio'] = _ratio(totals[f'{resource}_requests'], allocatable[f'allocatable_{resource}'])
+            summary[f'{resource}_limit_ratio'] = _ratio(totals[f'{resource}_limits'], allocatable[f'allocatable_{resource}'])
+            summary[f'{resource}_utilization'] = _ratio(totals[f'{resource}_usage'], allocatable[f'allocatable_{resource}'])
+    for resource in ('cpu', 'memory'):
+        # How much of what was requested is actually used
+        summary[f'{resource}_usage_to_request'] = _ratio(totals[f'{resource}_usage'], totals[f'{resource}_requests'])
+    return summary
+
+def _headroom(allocatable, totals, reference_pod):
+    """
+    Compute the unrequested capacity of each node and how many reference pods would still
+    fit on it, i.e. the bin-packing headroom (free CPU, memory and pod slots all limit it).
+    """
+    free_cpu = np.maximum(allocatable['allocatable_cpu'] - totals['cpu_requests'], 0)
+    free_memory = np.maximum(allocatable['allocatable_memory'] - totals['memory_requests'], 0)
+    free_pods = np.maximum(allocatable['allocatable_pods'] - totals['pods'], 0)
+    fit = free_pods.astype('f8')
+    if reference_pod['cpu'] > 0:
+        fit = np.minimum(fit, np.floor(free_cpu / reference_pod['cpu']))
+    if reference_pod['memory'] > 0:
+        fit = np.minimum(fit, np.floor(free_memory / reference_pod['memory']))
+    return {
+        'free_cpu': free_cpu,
+        'free_memory': free_memory,
+        'free_pods': free_pods,
+        'reference_pods_fit': fit
+    }
+
+def _default_reference_pod(pods):
+    """The median requests of the pods that set requests, as the typical pod to schedule."""
+    cpu = pods['cpu_requests'][pods['cpu_requests'] > 0]
+    memory = pods['memory_requests'][pods['memory_requests'] > 0]
+    return {
+        'cpu': float(np.median(cpu)) if cpu.size else 0.0,
+        'memory': float(np.median(memory)) if memory.size else 0.0
+    }
+
+def _to_entries(columns, names, name_key):
+    """Convert per-group column arrays to a list of dicts."""
+    entries = []
+    for index, name in enumerate(names):
+        entry = {name_key: str(name)}
+        for key, values in columns.items():
+            entry[key] = _number(values[index]) if np.issubdtype(np.asarray(values).dtype, np.floating) else int(values[index])
+        entries.append(entry)
+    return entries
+
+def analyze(data, reference_pod=None, namespace_limit=None):
+    """
+    Compute the capacity analytics of a collection snapshot.
+
+    Args:
+        data (dict): Collection data (uses the nodes and metrics sections).
+        reference_pod (dict, optional): Requests of the pod used for the headroom ('cpu' in cores,
+                                        'memory' in bytes). Defaults to the median pod requests.
+        namespace_limit (int, optional): Only the namespaces with the highest CPU requests.
+
+    Returns:
+        dict: cluster (totals and ratios), nodes, namespaces, reference_pod and pod counts.
+    """
+    nodes, pods = _build_tables(data)
+    node_count = len(nodes['name'])
+    allocatable = {key: nodes[key] for key in ('allocatable_cpu', 'allocatable_memory', 'allocatable_pods')}
+    reference_pod = dict(_default_reference_pod(pods), **(reference_pod or {}))
+
+    # Per node: the pods' requests, limits and usage, with the usage reported for the node itself
+    node_totals = _group_totals(pods['node'], node_count, pods)
+    node_summary = _summaries(node_totals, allocatable)
+    node_summary['node_cpu_usage'] = nodes['cpu_usage']
+    node_summary['node_memory_usage'] = nodes['memory_usage']
+    node_summary['node_cpu_utilization'] = _ratio(nodes['cpu_usage'], nodes['allocatable_cpu'])
+    node_summary['node_memory_utilization'] = _ratio(nodes['memory_usage'], nodes['allocatable_memory'])
+    node_summary.update(_headroom(allocatable, node_totals, reference_pod))
+
+    # Per namespace
+    namespaces, namespace_index = np.unique(pods['namespace'], return_inverse=True)
+    namespace_summary = _summaries(_group_totals(namespace_index.ravel(), len(namespaces), pods))
+    order = np.argsort(-namespace_summary['cpu_requests'], kind='stable')[:namespace_limit]
+    namespace_summary = {key: np.asarray(values)[order] for key, values in namespace_summary.items()}
+
+    # Cluster: the sum of the nodes
+    cluster_totals = {key: np.array([np.sum(values)]) for key, values in node_totals.items() if key not in ('cpu_usage', 'memory_usage')}
+    for column in ('cpu_usage', 'memory_usage'):
+        cluster_totals[column] = np.array([np.nansum(node_totals[column]) if not np.all(np.isnan(node_totals[column])) else np.nan])
+    cluster_allocatable = {key: np.array([np.sum(values)]) for key, values in allocatable.items()}
+    cluster_summary = _summaries(cluster_totals, cluster_allocatable)
+    for key in ('free_cpu', 'free_memory', 'free_pods', 'reference_pods_fit'):
+        cluster_summary[key] = np.array([np.sum(node_summary[key])])
+    cluster_summary['nodes'] = np.array([node_count])
+
+    return {
+        'cluster': _to_entries(cluster_summary, ['cluster'], 'name')[0],
+        'nodes': _to_entries(node_summary, nodes['name'], 'name'),
+        'namespaces': _to_entries(namespace_summary, namespaces[order], 'namespace'),
+        'namespace_count': len(namespaces),
+        'reference_pod': {key: _number(value) for key, value in reference_pod.items()},
+        'pods_without_requests': int(np.sum((pods['cpu_requests'] == 0) & (pods['memory_requests'] == 0))),
+        'pods_without_limits': int(np.sum((pods['cpu_limits'] == 0) & (pods['memory_limits'] == 0)))
+    }
+
+# Number of analyses kept in the cache
+ANALYSIS_CACHE_SIZE = 32
+
+# Analyses of the latest snapshots: (snapshot id, reference pod, namespace limit) -> analysis, least recently used first
+_analysis_cache = OrderedDict()
+
+def init_app(app):
+    """Initialize the capacity analytics with the Flask app."""
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the capacity analytics."""
+    from flask import jsonify, request
+    from app import responses
+    from app.export import _get_latest_collection_file, _get_snapshot_id, _open_collection_data
+
+    @app.route('/api/v2/capacity')
+    def api_capacity():
+        """API endpoint to get the capacity analytics of the latest collection, e.g. ?cpu=500m&memory=1Gi&namespaces=20."""
+        reference_pod = {}
+        for resource in ('cpu', 'memory'):
+            if request.args.get(resource):
+                value = parse_quantity(request.args[resource])
+                if np.isnan(value) or value < 0:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Invalid {resource} quantity: {request.args[resource]}'
+                    }), 400
+                reference_pod[resource] = value
+        namespace_limit = request.args.get('namespaces', 50, type=int)
+        if namespace_limit < 1:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid number of namespaces: {namespace_limit}'
+            }), 400
+
+        collection_file = _get_latest_collection_file()
+        snapshot_id = _get_snapshot_id(collection_file)
+        etag = responses.make_etag(snapshot_id) if snapshot_id else None
+        last_modified = responses.file_last_modified(collection_file)
+        cached = responses.not_modified(etag, last_modified)
+        if cached:
+            return cached
+        cache_key = (snapshot_id, tuple(sorted(reference_pod.items())), namespace_limit)
+        if cache_key not in _analysis_cache:
+            data = _open_collection_data(collection_file)
+            if not data or not data.get('nodes'):
+                return jsonify({
+                    'success': False,
+                    'error': 'No node data available'
+                }), 404
+            # Only the analyses of each cluster's latest snapshot are worth keeping
+            cluster_dir = os.path.dirname(snapshot_id)
+            for key in [key for key in _analysis_cache if key[0] != snapshot_id and os.path.dirname(key[0]) == cluster_dir]:
+                del _analysis_cache[key]
+            _analysis_cache[cache_key] = analyze(data, reference_pod, namespace_limit)
+            # The reference pods and limits are chosen by clients: keep the most recently used analyses only
+            while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+                _analysis_cache.popitem(last=False)
+        _analysis_cache.move_to_end(cache_key)
+
+        return responses.json_response(
+            dict(_analysis_cache[cache_key], success=True, snapshot_id=snapshot_id), etag, last_modified
+        )
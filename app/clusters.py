@@ -0,0 +1,270 @@
+"""
+Cluster registry module.
+Keeps the list of clusters to collect from, each with its own kubeconfig (and
+optionally a context within it), in a JSON file in the instance directory.
+Without a registry, the app collects from a single 'default' cluster using
+KUBECONFIG_PATH (or the kubeconfig written by the authentication page).
+
+The UI and the API are scoped to a cluster with the `cluster` query parameter,
+which defaults to the first registered cluster.
+"""
+
+import os
+import re
+import json
+import glob
+import hashlib
+import logging
+import tempfile
+import yaml
+from flask import current_app, request, has_request_context, jsonify, abort
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Registry file, in the instance directory unless CLUSTER_REGISTRY is set
+REGISTRY_FILE = 'clusters.json'
+
+# Name of the implicit cluster collected from when no cluster is registered
+DEFAULT_CLUSTER = 'default'
+
+# Cluster names are used in paths and scheduler job ids: DNS labels only
+CLUSTER_NAME_PATTERN = re.compile(r'^[a-z0-9]([-a-z0-9]{0,61}[a-z0-9])?$')
+
+# Registry entries, cached until the registry file changes: (mtime, entries)
+_registry_cache = (None, [])
+
+def init_app(app):
+    """Initialize the cluster registry with the Flask app."""
+    @app.before_request
+    def _check_cluster_param():
+        """Reject requests scoped to a cluster that isn't registered."""
+        cluster = request.args.get('cluster')
+        if cluster and not get_cluster(cluster):
+            if request.path.startswith('/api/'):
+                return jsonify({
+                    'success': False,
+                    'error': f'Unknown cluster: {cluster}'
+                }), 404
+            abort(404)
+
+    @app.context_processor
+    def _inject_clusters():
+        """Make the clusters and the current cluster available to the templates."""
+        return {
+            'clusters': get_cluster_names(),
+            'current_cluster': get_current_cluster()
+        }
+
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def get_registry_path():
+    """Get the path to the cluster registry file."""
+    return current_app.config.get('CLUSTER_REGISTRY') or os.path.join(current_app.instance_path, REGISTRY_FILE)
+
+def _load_registry():
+    """Load the registered clusters from the registry file."""
+    global _registry_cache
+    registry_path = get_registry_path()
+    try:
+        mtime = os.path.getmtime(registry_path)
+    except OSError:
+        return []
+    if _registry_cache[0] == (registry_path, mtime):
+        return _registry_cache[1]
+
+    try:
+        with open(registry_path, 'r') as f:
+            entries = json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading cluster registry: {e}")
+        return _registry_cache[1]
+
+    entries = [entry for entry in entries if CLUSTER_NAME_PATTERN.match(entry.get('name', ''))]
+    _registry_cache = ((registry_path, mtime), entries)
+    return entries
+
+def _save_registry(entries):
+    """Save the registered clusters to the registry file (atomically, as other workers read it)."""
+    registry_path = get_registry_path()
+    os.makedirs(os.path.dirname(registry_path), exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(prefix=f'{os.path.basename(registry_path)}.', suffix='.tmp', dir=os.path.dirname(registry_path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_file, registry_path)
+
+def load_clusters():
+    """
+    Get the clusters to collect from.
+
+    Returns:
+        list: Cluster entries (dicts with name, kubeconfig and context).
+    """
+    entries = _load_registry()
+    if entries:
+        return entries
+    return [{'name': DEFAULT_CLUSTER, 'kubeconfig': None, 'context': None}]
+
+def get_cluster_names():
+    """Get the names of the clusters to collect from."""
+    return [entry['name'] for entry in load_clusters()]
+
+def get_cluster(name):
+    """Get a cluster entry by name, or None."""
+    return next((entry for entry in load_clusters() if entry['name'] == name), None)
+
+def get_default_cluster():
+    """Get the name of the cluster used when a request doesn't specify one."""
+    return load_clusters()[0]['name']
+
+def get_current_cluster():
+    """Get the cluster the current request is scoped to (the `cluster` query parameter), or the default cluster."""
+    if has_request_context() and request.args.get('cluster'):
+        return request.args.get('cluster')
+    return get_default_cluster()
+
+def get_kubeconfig(name=None):
+    """
+    Get the kubeconfig to collect from a cluster with.
+
+    Args:
+        name (str, optional): Cluster name. Defaults to the current cluster.
+
+    Returns:
+        str|None: Path to the kubeconfig, or None to use oc's default kubeconfig.
+    """
+    entry = get_cluster(name or get_current_cluster())
+    if not entry or (entry['name'] == DEFAULT_CLUSTER and not entry.get('kubeconfig')):
+        # The implicit cluster: the configured kubeconfig, or the one written by the authentication page
+        kubeconfig = current_app.config.get('KUBECONFIG_PATH')
+        instance_kubeconfig = os.path.join(current_app.instance_path, 'kubeconfig')
+        if not kubeconfig and os.path.exists(instance_kubeconfig):
+            kubeconfig = instance_kubeconfig
+        return kubeconfig
+    if entry.get('context'):
+        return _get_context_kubeconfig(entry)
+    return entry.get('kubeconfig')
+
+def _get_context_kubeconfig(entry):
+    """
+    Get a kubeconfig whose current context is the cluster's context, so that every oc
+    command of the cluster targets it without passing --context around.
+    The file name holds a digest of the source kubeconfig and the context, so that a cluster
+    registered again with another context or kubeconfig never reuses the previous file.
+    """
+    source = entry.get('kubeconfig') or os.path.expanduser('~/.kube/config')
+    digest = hashlib.sha1(json.dumps([os.path.abspath(source), entry['context']]).encode()).hexdigest()[:12]
+    clusters_dir = os.path.join(current_app.instance_path, 'clusters')
+    kubeconfig = os.path.join(clusters_dir, f"{entry['name']}-{digest}.kubeconfig")
+    if os.path.exists(kubeconfig) and os.path.getmtime(kubeconfig) >= os.path.getmtime(source):
+        return kubeconfig
+
+    with open(source, 'r') as f:
+        config = yaml.safe_load(f)
+    config['current-context'] = entry['context']
+
+    os.makedirs(os.path.dirname(kubeconfig), exist_ok=True)
+    # mkstemp creates the file readable by its owner only, as the kubeconfig holds credentials
+    fd, tmp_file = tempfile.mkstemp(prefix=f"{entry['name']}.", suffix='.tmp', dir=os.path.dirname(kubeconfig))
+    with os.fdopen(fd, 'w') as f:
+        yaml.safe_dump(config, f)
+    os.replace(tmp_file, kubeconfig)
+
+    # Drop the files derived for the cluster's previous registrations
+    for previous in glob.glob(os.path.join(glob.escape(clusters_dir), f"{glob.escape(entry['name'])}-*.kubeconfig")):
+        if previous != kubeconfig and re.fullmatch(r'[0-9a-f]{12}', os.path.basename(previous)[len(entry['name']) + 1:-len('.kubeconfig')]):
+            os.remove(previous)
+    return kubeconfig
+
+def get_data_dir(name=None):
+    """
+    Get the directory holding the collection files of a cluster.
+
+    The default cluster keeps its collection files at the top of the collected data
+    directory, where they were before clusters were introduced.
+    """
+    name = name or get_current_cluster()
+    data_dir = os.path.join(current_app.instance_path, 'collected_data')
+    if name == DEFAULT_CLUSTER:
+        return data_dir
+    return os.path.join(data_dir, name)
+
+def add_cluster(name, kubeconfig=None, context=None):
+    """
+    Register a cluster.
+
+    Returns:
+        tuple: (entry (dict|None), error_message (str|None))
+    """
+    if not name or not CLUSTER_NAME_PATTERN.match(name):
+        return None, "Invalid cluster name: use lowercase letters, digits and '-' (at most 63 characters)"
+    if kubeconfig and not os.path.exists(kubeconfig):
+        return None, f"Kubeconfig not found: {kubeconfig}"
+
+    entries = [entry for entry in _load_registry() if entry['name'] != name]
+    entry = {'name': name, 'kubeconfig': kubeconfig, 'context': context}
+    entries.append(entry)
+    _save_registry(entries)
+    logger.info(f"Registered cluster {name}")
+    return entry, None
+
+def remove_cluster(name):
+    """
+    Unregister a cluster. Its collection files are kept.
+
+    Returns:
+        str|None: Error message, or None.
+    """
+    entries = _load_registry()
+    if not any(entry['name'] == name for entry in entries):
+        return f"Unknown cluster: {name}"
+
+    _save_registry([entry for entry in entries if entry['name'] != name])
+    logger.info(f"Unregistered cluster {name}")
+    return None
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the cluster registry."""
+    from app.scheduler import on_clusters_changed
+
+    @app.route('/api/v2/clusters', methods=['GET', 'POST'])
+    def api_clusters():
+        """API endpoint to list the clusters or register one."""
+        if request.method == 'GET':
+            return jsonify({
+                'success': True,
+                'default': get_default_cluster(),
+                'clusters': load_clusters()
+            })
+
+        params = request.get_json(silent=True) or {}
+        entry, error = add_cluster(params.get('name'), params.get('kubeconfig'), params.get('context'))
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            })
+
+        on_clusters_changed()
+        return jsonify({
+            'success': True,
+            'message': f"Cluster {entry['name']} registered",
+            'cluster': entry
+        })
+
+    @app.route('/api/v2/clusters/<name>', methods=['DELETE'])
+    def api_delete_cluster(name):
+        """API endpoint to unregister a cluster."""
+        error = remove_cluster(name)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 404
+
+        on_clusters_changed()
+        return jsonify({
+            'success': True,
+            'message': f'Cluster {name} unregistered'
+        })
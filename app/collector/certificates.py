@@ -0,0 +1,245 @@
+"""
+Certificates module.
+Builds the certificate expiry inventory of a cluster from the PEM chains of
+its TLS secrets and CA bundle configmaps. Certificates are parsed in-process
+(a minimal DER reader for the X.509 fields the inventory needs: subject,
+issuer, serial and validity), spread across a process pool when there are many
+of them, and cached by SHA-256 fingerprint so that the certificates unchanged
+since the previous scan (most of them, e.g. the trusted CA bundle injected in
+every namespace) are never parsed again.
+"""
+
+import base64
+import hashlib
+import datetime
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Delimiters of PEM certificate blocks
+PEM_BEGIN = '-----BEGIN CERTIFICATE-----'
+PEM_END = '-----END CERTIFICATE-----'
+
+# Name attributes shown in subjects and issuers, by DER-encoded OID
+NAME_ATTRIBUTES = {
+    b'\x55\x04\x03': 'CN',
+    b'\x55\x04\x0a': 'O',
+    b'\x55\x04\x0b': 'OU'
+}
+
+# Certificates expiring within this many days are reported as Expiring
+DEFAULT_WARNING_DAYS = 30
+
+# Number of parsed certificates cached (least recently seen are dropped first)
+MAX_CACHED = 50000
+
+# Certificates are parsed in a process pool only when at least this many are not cached,
+# in batches of BATCH_SIZE (below it, starting the pool costs more than parsing)
+POOL_MIN_CERTIFICATES = 1000
+BATCH_SIZE = 250
+
+# Fingerprint -> parsed certificate, least recently seen first
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+def _read_tlv(der, offset):
+    """Read the DER element at an offset. Returns its tag and the start and end of its content."""
+    tag, length = der[offset], der[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(der[start:start + size], 'big')
+        start += size
+    end = start + length
+    if end > len(der):
+        raise ValueError('Truncated DER element')
+    return tag, start, end
+
+def _read_children(der, start, end):
+    """Read the elements of a constructed DER element's content."""
+    children = []
+    while start < end:
+        child = _read_tlv(der, start)
+        children.append(child)
+        start = child[2]
+    return children
+
+def _decode_string(der, tag, start, end):
+    """Decode a DER string value (BMPString, TeletexString or the UTF-8 compatible ones)."""
+    value = der[start:end]
+    if tag == 0x1e:
+        return value.decode('utf-16-be', errors='replace')
+    if tag == 0x14:
+        return value.decode('latin-1')
+    return value.decode('utf-8', errors='replace')
+
+def _decode_name(der, start, end):
+    """Decode a Name (the CN, O and OU attributes, in encoding order) as 'O=x, CN=y'."""
+    attributes = []
+    for _, set_start, set_end in _read_children(der, start, end):
+        for _, attribute_start, attribute_end in _read_children(der, set_start, set_end):
+            (_, oid_start, oid_end), (tag, value_start, value_end) = _read_children(der, attribute_start, attribute_end)[:2]
+            name = NAME_ATTRIBUTES.get(der[oid_start:oid_end])
+            if name:
+                attributes.append(f'{name}={_decode_string(der, tag, value_start, value_end)}')
+    return ', '.join(attributes)
+
+def _decode_time(der, tag, start, end):
+    """Decode a UTCTime or GeneralizedTime as an ISO 8601 UTC timestamp."""
+    value = der[start:end].decode('ascii').rstrip('Z')
+    if tag == 0x17:
+        # UTCTime: two-digit years, 1950 to 2049
+        value = ('19' if int(value[:2]) >= 50 else '20') + value
+    return datetime.datetime.strptime(value[:14], '%Y%m%d%H%M%S').strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def parse_certificate(der):
+    """
+    Parse a DER-encoded X.509 certificate.
+
+    Returns:
+        dict: subject, issuer, serial (hex), not_before and not_after (ISO 8601 UTC).
+
+    Raises:
+        ValueError: If the certificate can't be parsed.
+    """
+    try:
+        _, cert_start, cert_end = _read_tlv(der, 0)
+        _, tbs_start, tbs_end = _read_tlv(der, cert_start)
+        fields = _read_children(der, tbs_start, tbs_end)
+        if fields[0][0] == 0xa0:  # Explicit version (absent for v1 certificates)
+            fields = fields[1:]
+        serial, _, issuer, validity, subject = fields[:5]
+        not_before, not_after = _read_children(der, validity[1], validity[2])[:2]
+        return {
+            'subject': _decode_name(der, subject[1], subject[2]),
+            'issuer': _decode_name(der, issuer[1], issuer[2]),
+            'serial': der[serial[1]:serial[2]].hex(),
+            'not_before': _decode_time(der, *not_before),
+            'not_after': _decode_time(der, *not_after)
+        }
+    except (IndexError, ValueError) as e:
+        raise ValueError(f'Invalid certificate: {e}')
+
+def _parse_batch(ders):
+    """Parse certificates (in a pool worker). Returns the parsed certificates, or {'error': ...} for the invalid ones."""
+    parsed = []
+    for der in ders:
+        try:
+            parsed.append(parse_certificate(der))
+        except ValueError as e:
+            parsed.append({'error': str(e)})
+    return parsed
+
+def split_pem(pem):
+    """Get the DER certificates of a PEM chain or bundle, in order (invalid base64 blocks are skipped)."""
+    ders = []
+    start = (pem or '').find(PEM_BEGIN)
+    while start != -1:
+        end = pem.find(PEM_END, start)
+        if end == -1:
+            break
+        try:
+            ders.append(base64.b64decode(''.join(pem[start + len(PEM_BEGIN):end].split()), validate=True))
+        except ValueError:
+            logger.warning("Skipped a PEM certificate block with invalid base64")
+        start = pem.find(PEM_BEGIN, end)
+    return ders
+
+def parse_certificates(ders, workers=0):
+    """
+    Parse certificates, only those not parsed before.
+
+    Args:
+        ders (list): DER-encoded certificates.
+        workers (int): Processes parsing the certificates not cached (0 to parse them in-process).
+
+    Returns:
+        dict: SHA-256 fingerprint -> parsed certificate (see parse_certificate), or {'error': ...}.
+    """
+    by_fingerprint = {hashlib.sha256(der).hexdigest(): der for der in ders}
+    with _parsed_lock:
+        missing = [fingerprint for fingerprint in by_fingerprint if fingerprint not in _parsed]
+
+    if missing:
+        blobs = [by_fingerprint[fingerprint] for fingerprint in missing]
+        if workers and len(blobs) >= POOL_MIN_CERTIFICATES:
+            batches = [blobs[start:start + BATCH_SIZE] for start in range(0, len(blobs), BATCH_SIZE)]
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                parsed = [certificate for batch in pool.map(_parse_batch, batches) for certificate in batch]
+        else:
+            parsed = _parse_batch(blobs)
+        logger.info(f"Parsed {len(missing)} new certificates ({len(by_fingerprint) - len(missing)} cached)")
+
+    with _parsed_lock:
+        if missing:
+            _parsed.update(zip(missing, parsed))
+        for fingerprint in by_fingerprint:
+            _parsed.move_to_end(fingerprint)
+        result = {fingerprint: _parsed[fingerprint] for fingerprint in by_fingerprint}
+        while len(_parsed) > MAX_CACHED:
+            _parsed.popitem(last=False)
+    return result
+
+def _expiry_status(days_left, warning_days):
+    """Get the expiry status of a certificate expiring in days_left days."""
+    if days_left < 0:
+        return 'Expired'
+    return 'Expiring' if days_left < warning_days else 'Valid'
+
+def build_expiry_table(sources, workers=0, warning_days=DEFAULT_WARNING_DAYS, now=None):
+    """
+    Build the certificate expiry table of PEM sources.
+
+    Args:
+        sources (list): Dicts with the KIND, NAMESPACE, NAME and KEY holding a PEM chain, and the PEM.
+        workers (int): Processes parsing the certificates (see parse_certificates).
+        warning_days (int): Certificates expiring within this many days are Expiring.
+        now (datetime, optional): Current UTC time.
+
+    Returns:
+        tuple: Rows (one per certificate of each source, soonest expiry first, unparseable
+               ones last) and a summary (total, expired, expiring, unparseable, next_expiry).
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    chains = [(source, split_pem(source.get('PEM'))) for source in sources]
+    parsed = parse_certificates([der for _, ders in chains for der in ders], workers)
+
+    rows = []
+    for source, ders in chains:
+        for position, der in enumerate(ders):
+            fingerprint = hashlib.sha256(der).hexdigest()
+            certificate = parsed[fingerprint]
+            row = {key: source.get(key, '') for key in ('NAMESPACE', 'KIND', 'NAME', 'KEY')}
+            row['INDEX'] = position
+            if 'error' in certificate:
+                row.update(SUBJECT='', ISSUER='', SERIAL='', NOT_BEFORE='', NOT_AFTER='', DAYS_LEFT=None, STATUS='Unparseable')
+            else:
+                not_after = datetime.datetime.fromisoformat(certificate['not_after'].rstrip('Z'))
+                days_left = (not_after - now).days
+                row.update(
+                    SUBJECT=certificate['subject'],
+                    ISSUER=certificate['issuer'],
+                    SERIAL=certificate['serial'],
+                    NOT_BEFORE=certificate['not_before'],
+                    NOT_AFTER=certificate['not_after'],
+                    DAYS_LEFT=days_left,
+                    STATUS=_expiry_status(days_left, warning_days)
+                )
+            row['FINGERPRINT'] = fingerprint
+            rows.append(row)
+    rows.sort(key=lambda row: (row['DAYS_LEFT'] is None, row['NOT_AFTER'], row['NAMESPACE'], row['NAME'], row['INDEX']))
+
+    statuses = [row['STATUS'] for row in rows]
+    summary = {
+        'total': len(rows),
+        'expired': statuses.count('Expired'),
+        'expiring': statuses.count('Expiring'),
+        'unparseable': statuses.count('Unparseable'),
+        'warning_days': warning_days,
+        'next_expiry': next((row['NOT_AFTER'] for row in rows if row['STATUS'] != 'Expired' and row['NOT_AFTER']), None)
+    }
+    return rows, summary
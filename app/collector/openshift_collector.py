@@ -1,28 +1,54 @@
 import subprocess
+import base64
 import json
 import yaml
 import os
 import logging
 import time
+import datetime
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import current_app
+from app.collector.rate_limit import get_limiter, parse_retry_after, CircuitOpenError
+from app.collector.table_parser import parse_table
+from app.collector import certificates
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _get_oc_base_command(kubeconfig_path=None):
+    """Get the oc command prefix and environment for a kubeconfig (by default, the configured one)."""
+    base_command = ['oc']
+    env = os.environ.copy()
+
+    if kubeconfig_path:
+        logger.debug(f"Using kubeconfig: {kubeconfig_path}")
+        base_command.extend(['--kubeconfig', kubeconfig_path])
+    else:
+        # Get kubeconfig path from config if specified
+        kubeconfig = current_app.config.get('KUBECONFIG_PATH')
+        if kubeconfig:
+            logger.debug(f"Using kubeconfig from config: {kubeconfig}")
+            env['KUBECONFIG'] = kubeconfig
+    return base_command, env
+
 # Enhanced Helper function (incorporating retry and optional resource logic)
-def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optional_resource=False, retries=2, delay=2, timeout=60):
+def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optional_resource=False, retries=2, delay=2, timeout=60, cluster=None):
     """
     Runs an oc command with retry logic and optional output parsing.
 
+    Commands are rate limited per cluster, and retried with full-jitter exponential
+    backoff within the cluster's retry budget (see app/collector/rate_limit.py).
+
     Args:
         command_args (list): List of arguments for oc command (e.g., ['get', 'nodes']).
         kubeconfig_path (str, optional): Path to the kubeconfig file.
         parse_output (str, optional): 'json' or 'yaml' to parse output. None for raw text.
         optional_resource (bool): If True, treat 'NotFound' errors as non-fatal.
         retries (int): Number of retries on transient errors.
-        delay (int): Delay between retries in seconds.
+        delay (int): Base delay of the exponential backoff between retries in seconds.
         timeout (int): Timeout for the command execution.
+        cluster (str, optional): Name of the cluster, keying its rate limiter.
 
     Returns:
         tuple: (success (bool), result (parsed_data|str|None), error_message (str|None))
@@ -30,18 +56,7 @@ def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optio
                - result: Parsed JSON/YAML data, raw stdout string, or None if failed/not found.
                - error_message: Stderr content if an error occurred, or None.
     """
-    base_command = ['oc']
-    env = os.environ.copy()
-
-    if kubeconfig_path:
-        logger.debug(f"Using kubeconfig: {kubeconfig_path}")
-        base_command.extend(['--kubeconfig', kubeconfig_path])
-    else:
-        # Get kubeconfig path from config if specified
-        kubeconfig = current_app.config.get('KUBECONFIG_PATH')
-        if kubeconfig:
-            logger.debug(f"Using kubeconfig from config: {kubeconfig}")
-            env['KUBECONFIG'] = kubeconfig
+    base_command, env = _get_oc_base_command(kubeconfig_path)
 
     # Ensure output format arg is present if parsing requested
     if parse_output and f'-o{parse_output}' not in command_args and f'--output={parse_output}' not in command_args:
@@ -54,20 +69,31 @@ def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optio
     cmd_display = ' '.join(full_command) # For logging
     logger.info(f"Running command: {cmd_display}")
 
+    # Commands against the same cluster share a rate limit, retry budget and circuit breaker
+    # (keyed by the cluster name; the kubeconfig only keys commands run outside a cluster)
+    limiter = get_limiter(cluster or kubeconfig_path or env.get('KUBECONFIG') or 'default')
+
     attempt = 0
     while attempt <= retries:
         attempt += 1
         try:
-            result = subprocess.run(
-                full_command,
-                capture_output=True,
-                text=True,
-                check=False, # We check returncode manually
-                env=env,
-                timeout=timeout
-            )
+            limiter.before_request()
+        except CircuitOpenError as e:
+            logger.error(f"{e}: {cmd_display}")
+            return False, None, str(e)
+        try:
+            with limiter.in_flight():
+                result = subprocess.run(
+                    full_command,
+                    capture_output=True,
+                    text=True,
+                    check=False, # We check returncode manually
+                    env=env,
+                    timeout=timeout
+                )
 
             if result.returncode == 0:
+                limiter.record(True)
                 logger.debug(f"Command successful: {cmd_display}")
                 output = result.stdout
                 if parse_output == 'json':
@@ -95,15 +121,18 @@ def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optio
             # Check for 'NotFound' on optional resources
             if optional_resource and ('notfound' in stderr_lower or 'could not find the requested resource' in stderr_lower):
                 logger.info(f"Optional resource not found: {cmd_display}")
+                limiter.record(True)
                 return True, None, None # Success=True, Result=None, Error=None
 
             # Check for transient errors to retry
-            transient_errors = ["timeout", "connection refused", "tls handshake", "temporarily unavailable", "too many requests"]
+            transient_errors = ["timeout", "connection refused", "tls handshake", "temporarily unavailable", "too many requests",
+                                "service unavailable", "unable to handle the request"]
             is_transient = any(err in stderr_lower for err in transient_errors)
+            limiter.record(False, transient=is_transient)
 
-            if is_transient and attempt <= retries:
-                wait_time = delay * attempt
-                logger.warning(f"Transient error detected. Retrying in {wait_time}s...")
+            wait_time = limiter.retry_delay(attempt, delay, parse_retry_after(result.stderr)) if is_transient and attempt <= retries else None
+            if wait_time is not None:
+                logger.warning(f"Transient error detected. Retrying in {wait_time:.1f}s...")
                 time.sleep(wait_time)
                 continue
             else:
@@ -113,18 +142,21 @@ def _run_oc_command(command_args, kubeconfig_path=None, parse_output=None, optio
 
         except subprocess.TimeoutExpired:
             logger.error(f"Command timed out: {cmd_display}")
-            if attempt <= retries:
-                wait_time = delay * attempt
-                logger.warning(f"Timeout detected. Retrying in {wait_time}s...")
+            limiter.record(False, transient=True)
+            wait_time = limiter.retry_delay(attempt, delay) if attempt <= retries else None
+            if wait_time is not None:
+                logger.warning(f"Timeout detected. Retrying in {wait_time:.1f}s...")
                 time.sleep(wait_time)
                 continue
             else:
                  return False, None, "Command timed out after retries"
         except FileNotFoundError:
              logger.error(f"Command 'oc' not found. Is it installed and in PATH?")
+             limiter.record(False)
              return False, None, "'oc' command not found"
         except Exception as e:
             logger.error(f"Unexpected error running command '{cmd_display}': {e}")
+            limiter.record(False)
             return False, None, f"Unexpected error: {e}"
 
     # Should not be reached if loop logic is correct, but as a safeguard
@@ -172,39 +204,19 @@ def run_oc_command(command):
         raise Exception("Failed to parse command output as JSON")
 
 # --- Helper for parsing 'oc get ... -o wide' or similar tabular text output ---
-def _parse_oc_get_output(raw_output):
-    """Parses tabular `oc get` output into a list of dictionaries."""
-    if not raw_output or not isinstance(raw_output, str):
-        return []
-    lines = raw_output.strip().split('\n')
-    if len(lines) < 2: # Need header + at least one data row
-        return []
-
-    # Split header carefully, handling potential spaces within column names (less common)
-    header = [h.strip() for h in lines[0].split(None)] # Basic split, might need refinement
-
-    parsed_list = []
-    num_columns = len(header)
-    for line in lines[1:]:
-        # Split data lines, handling potential spaces in the last column
-        fields = line.split(None, num_columns - 1)
-        if len(fields) == num_columns:
-             row_dict = dict(zip(header, [f.strip() for f in fields]))
-             parsed_list.append(row_dict)
-        else:
-             logger.warning(f"Skipping malformed line (expected {num_columns} fields, got {len(fields)}): {line}")
-
-    return parsed_list
+def _parse_oc_get_output(raw_output, columns=None):
+    """Parses tabular `oc get` output (or headerless output with the given column names) into a list of dictionaries."""
+    return parse_table(raw_output, columns)
 
 # --- Collection Functions ---
 
-def get_basic_info(kubeconfig_path=None):
+def get_basic_info(kubeconfig_path=None, cluster=None):
     """Collects basic cluster information."""
     data = {}
-    success, result, err = _run_oc_command(['version', '-o', 'json'], kubeconfig_path, parse_output='json')
+    success, result, err = _run_oc_command(['version', '-o', 'json'], kubeconfig_path, cluster=cluster, parse_output='json')
     data['oc_version'] = result if success else {'error': err or 'Failed to get oc version'}
 
-    success, result, err = _run_oc_command(['get', 'clusterversion', 'version', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'clusterversion', 'version', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     data['cluster_version_yaml'] = result if success else {'error': err or 'Failed to get clusterversion'}
     # Extract key fields if available
     if success and isinstance(result, dict):
@@ -219,14 +231,14 @@ def get_basic_info(kubeconfig_path=None):
     else:
         data['summary'] = {'error': 'Could not parse cluster version details'}
 
-    success, result, err = _run_oc_command(['get', 'infrastructure', 'cluster', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'infrastructure', 'cluster', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     data['infrastructure_yaml'] = result if success else {'error': err or 'Failed to get infrastructure'}
     if success and isinstance(result, dict):
         data['summary']['infraName'] = result.get('status', {}).get('infrastructureName', 'N/A')
         data['summary']['apiServerURL'] = result.get('status', {}).get('apiServerURL', 'N/A')
         data['summary']['platform'] = result.get('status', {}).get('platformStatus', {}).get('type', 'N/A')
 
-    success, result, err = _run_oc_command(['cluster-info'], kubeconfig_path, parse_output=None)
+    success, result, err = _run_oc_command(['cluster-info'], kubeconfig_path, cluster=cluster, parse_output=None)
     data['cluster_info_dump'] = result if success else f"Error: {err or 'Failed to run cluster-info'}"
 
     return data
@@ -258,27 +270,18 @@ def get_cluster_info():
 
     return cluster_info
 
-def get_nodes_detailed(kubeconfig_path=None):
+def get_nodes_detailed(kubeconfig_path=None, cluster=None):
     """Collects node list and runs describe in parallel."""
     nodes_data = {'list': [], 'details': {}}
     parallel_jobs = current_app.config.get('PARALLEL_JOBS', 4)
 
     # Get node list first
-    success, result, err = _run_oc_command(['get', 'nodes', '-o', 'wide'], kubeconfig_path, parse_output=None)
+    success, result, err = _run_oc_command(['get', 'nodes', '-o', 'wide'], kubeconfig_path, cluster=cluster, parse_output=None)
     if not success:
         nodes_data['error'] = err or "Failed to get node list"
         return nodes_data
     nodes_data['list_raw'] = result
-
-    # Simple parsing of 'get nodes -o wide' output
-    header = []
-    lines = result.strip().split('\n')
-    if lines:
-        header = lines[0].split()
-        for line in lines[1:]:
-            fields = line.split(maxsplit=len(header)-1) # Split smartly
-            node_info = dict(zip(header, fields))
-            nodes_data['list'].append(node_info)
+    nodes_data['list'] = _parse_oc_get_output(result)
 
     # Describe nodes in parallel
     node_names = [node.get('NAME') for node in nodes_data['list'] if node.get('NAME')]
@@ -287,7 +290,7 @@ def get_nodes_detailed(kubeconfig_path=None):
         return nodes_data
 
     with ThreadPoolExecutor(max_workers=parallel_jobs) as executor:
-        future_to_node = {executor.submit(_run_oc_command, ['describe', 'node', name], kubeconfig_path): name for name in node_names}
+        future_to_node = {executor.submit(_run_oc_command, ['describe', 'node', name], kubeconfig_path, cluster=cluster): name for name in node_names}
         for future in as_completed(future_to_node):
             node_name = future_to_node[future]
             try:
@@ -389,57 +392,179 @@ def get_nodes_info():
 
     return nodes_info
 
-def get_operators_info(kubeconfig_path=None):
+def get_operators_info(kubeconfig_path=None, cluster=None):
     """Collects ClusterOperator status and OLM details."""
     operators_data = {}
-    success, result, err = _run_oc_command(['get', 'clusteroperators', '-o', 'wide'], kubeconfig_path, parse_output=None)
+    success, result, err = _run_oc_command(['get', 'clusteroperators', '-o', 'wide'], kubeconfig_path, cluster=cluster, parse_output=None)
     operators_data['clusteroperators_raw'] = result if success else f"Error: {err or 'Failed to get clusteroperators'}"
     operators_data['clusteroperators_list'] = _parse_oc_get_output(result) if success else []
 
-    success, result, err = _run_oc_command(['get', 'csv', '--all-namespaces', '-o', 'wide'], kubeconfig_path, parse_output=None)
+    success, result, err = _run_oc_command(['get', 'csv', '--all-namespaces', '-o', 'wide'], kubeconfig_path, cluster=cluster, parse_output=None)
     operators_data['csv_raw'] = result if success else f"Error: {err or 'Failed to get CSVs'}"
     operators_data['csv_list'] = _parse_oc_get_output(result) if success else []
 
     # OLM specific (can add more like installplans, catalogsources)
-    success, result, err = _run_oc_command(['get', 'subscriptions', '--all-namespaces', '-o', 'wide'], kubeconfig_path, parse_output=None)
+    success, result, err = _run_oc_command(['get', 'subscriptions', '--all-namespaces', '-o', 'wide'], kubeconfig_path, cluster=cluster, parse_output=None)
     operators_data['subscriptions_raw'] = result if success else f"Error: {err or 'Failed to get subscriptions'}"
     operators_data['subscriptions_list'] = _parse_oc_get_output(result) if success else []
 
     return operators_data
 
-def get_etcd_info(kubeconfig_path=None):
-    """Collects etcd health and member status via rsh."""
-    etcd_data = {}
-    # Find an etcd pod
-    success, pods_json, err = _run_oc_command(['get', 'pods', '-n', 'openshift-etcd', '-l', 'app=etcd', '-o', 'json'], kubeconfig_path, parse_output='json')
-    etcd_pod = None
-    if success and pods_json and pods_json.get('items'):
-        etcd_pod = pods_json['items'][0].get('metadata', {}).get('name')
-    else:
-        etcd_data['error'] = "Could not find an etcd pod."
-        return etcd_data
+# etcd client port of the members (the etcd pods run on the host network of the control plane nodes)
+ETCD_CLIENT_PORT = 2379
+
+# Deadline of each etcdctl request, within the per-member deadline of ETCD_MEMBER_TIMEOUT
+ETCDCTL_COMMAND_TIMEOUT = '3s'
+
+# Cluster (kubeconfig) -> (time.monotonic() of the check, etcd data), for ETCD_CACHE_TTL seconds
+_etcd_cache = {}
+_etcd_cache_lock = threading.Lock()
+
+def _iter_json_values(output):
+    """Decode the JSON values printed one after the other (e.g. by several etcdctl commands)."""
+    decoder = json.JSONDecoder()
+    position = 0
+    output = output or ''
+    while True:
+        while position < len(output) and output[position].isspace():
+            position += 1
+        if position >= len(output):
+            return
+        try:
+            value, position = decoder.raw_decode(output, position)
+        except json.JSONDecodeError:
+            return
+        yield value
+
+def _get_member_endpoint(pod):
+    """Get the client URL of the etcd member of an etcd pod, or None without a pod IP."""
+    ip = (pod.get('status') or {}).get('podIP')
+    if not ip:
+        return None
+    return f"https://[{ip}]:{ETCD_CLIENT_PORT}" if ':' in ip else f"https://{ip}:{ETCD_CLIENT_PORT}"
+
+def _check_etcd_member(pod, kubeconfig_path=None, timeout=10, cluster=None):
+    """
+    Check the etcd member of an etcd pod: its endpoint status and health (and the member list),
+    with a single exec bounded by timeout seconds.
 
-    if etcd_pod:
-        success_h, result_h, err_h = _run_oc_command(['rsh', '-n', 'openshift-etcd', etcd_pod, 'etcdctl', 'endpoint', 'health'], kubeconfig_path)
-        etcd_data['health_raw'] = result_h if success_h else f"Error: {err_h or 'Failed to get etcd health'}"
+    Returns:
+        tuple: Member entry, and the member list if the member could read it (or None).
+    """
+    metadata = pod.get('metadata') or {}
+    name = metadata.get('name')
+    endpoint = _get_member_endpoint(pod)
+    member = {
+        'POD': name,
+        'NODE': (pod.get('spec') or {}).get('nodeName'),
+        'ENDPOINT': endpoint,
+        'HEALTHY': False,
+        'ERROR': None
+    }
+    phase = (pod.get('status') or {}).get('phase')
+    if phase != 'Running' or not endpoint:
+        member['ERROR'] = f"Pod is {phase or 'not running'}"
+        return member, None
+
+    etcdctl = f"etcdctl --command-timeout={ETCDCTL_COMMAND_TIMEOUT} -w json"
+    script = (f"{etcdctl} --endpoints={endpoint} endpoint status; "
+              f"{etcdctl} --endpoints={endpoint} endpoint health; "
+              f"{etcdctl} member list")
+    # A wedged member fails on its own deadline, without retries, and doesn't hold up the others
+    success, output, err = _run_oc_command(
+        ['rsh', '-n', 'openshift-etcd', name, 'sh', '-c', script], kubeconfig_path, cluster=cluster, retries=0, timeout=timeout
+    )
 
-        success_m, result_m, err_m = _run_oc_command(['rsh', '-n', 'openshift-etcd', etcd_pod, 'etcdctl', 'member', 'list', '-w', 'table'], kubeconfig_path)
-        etcd_data['members_raw'] = result_m if success_m else f"Error: {err_m or 'Failed to get etcd members'}"
-    else:
-         etcd_data['error'] = "Found etcd pods json, but could not extract pod name."
+    member_list = None
+    for value in _iter_json_values(output):
+        if isinstance(value, dict) and 'members' in value:
+            member_list = [{
+                'ID': f"{entry.get('ID', 0):x}",
+                'NAME': entry.get('name', ''),
+                'PEER_URLS': entry.get('peerURLs') or [],
+                'CLIENT_URLS': entry.get('clientURLs') or [],
+                'IS_LEARNER': bool(entry.get('isLearner'))
+            } for entry in value.get('members') or []]
+        for entry in value if isinstance(value, list) else []:
+            if 'Status' in entry:
+                status = entry['Status'] or {}
+                member_id = (status.get('header') or {}).get('member_id', 0)
+                member.update(
+                    MEMBER_ID=f"{member_id:x}",
+                    LEADER=bool(member_id) and status.get('leader') == member_id,
+                    VERSION=status.get('version'),
+                    DB_SIZE=status.get('dbSize'),
+                    DB_SIZE_IN_USE=status.get('dbSizeInUse'),
+                    RAFT_TERM=status.get('raftTerm'),
+                    RAFT_INDEX=status.get('raftIndex'),
+                    RAFT_APPLIED_INDEX=status.get('raftAppliedIndex')
+                )
+            elif 'health' in entry:
+                member['HEALTHY'] = bool(entry['health'])
+                member['TOOK'] = entry.get('took')
+                if entry.get('error'):
+                    member['ERROR'] = entry['error']
+    if 'MEMBER_ID' not in member or 'TOOK' not in member:
+        member['ERROR'] = member['ERROR'] or err or 'Failed to get etcd member status'
+    return member, member_list
+
+def get_etcd_info(kubeconfig_path=None, cluster=None):
+    """
+    Collects the health, DB size, leader and raft indexes of every etcd member, checked
+    concurrently (each with its own deadline), and the member list. Results are cached
+    for ETCD_CACHE_TTL seconds, so that refreshes don't exec into the etcd pods again.
+    """
+    cache_ttl = current_app.config.get('ETCD_CACHE_TTL', 30)
+    with _etcd_cache_lock:
+        checked, cached = _etcd_cache.get(cluster or kubeconfig_path, (None, None))
+    if cached is not None and time.monotonic() - checked < cache_ttl:
+        return dict(cached)
 
-    return etcd_data
+    etcd_data = {}
+    success, pods_json, err = _run_oc_command(['get', 'pods', '-n', 'openshift-etcd', '-l', 'app=etcd', '-o', 'json'], kubeconfig_path, cluster=cluster, parse_output='json')
+    pods = pods_json.get('items') if success and isinstance(pods_json, dict) else None
+    if not pods:
+        etcd_data['error'] = f"Could not find an etcd pod{': ' + err if err else '.'}"
+        return etcd_data
 
-def get_namespaces_list(kubeconfig_path=None):
+    timeout = current_app.config.get('ETCD_MEMBER_TIMEOUT', 10)
+    members, member_list = [], None
+    with ThreadPoolExecutor(max_workers=len(pods)) as executor:
+        futures = [executor.submit(_check_etcd_member, pod, kubeconfig_path, timeout, cluster) for pod in pods]
+        for future in as_completed(futures):
+            member, listed = future.result()
+            members.append(member)
+            member_list = member_list or listed
+    members.sort(key=lambda member: member['POD'] or '')
+
+    healthy = sum(1 for member in members if member['HEALTHY'])
+    voting = sum(1 for entry in member_list if not entry['IS_LEARNER']) if member_list else len(members)
+    raft_indexes = [member['RAFT_INDEX'] for member in members if member.get('RAFT_INDEX') is not None]
+    etcd_data['members'] = members
+    etcd_data['member_list'] = member_list or []
+    etcd_data['summary'] = {
+        'members': voting,
+        'healthy': healthy,
+        'has_quorum': healthy > voting // 2,
+        'leader': next((member['POD'] for member in members if member.get('LEADER')), None),
+        'raft_index_spread': max(raft_indexes) - min(raft_indexes) if raft_indexes else None
+    }
+    etcd_data['checked_at'] = datetime.datetime.now().isoformat()
+
+    with _etcd_cache_lock:
+        _etcd_cache[cluster or kubeconfig_path] = (time.monotonic(), etcd_data)
+    return dict(etcd_data)
+
+def get_namespaces_list(kubeconfig_path=None, cluster=None):
     """Gets a list of namespace names."""
-    success, result, err = _run_oc_command(['get', 'namespaces', '-o', 'jsonpath={.items[*].metadata.name}'], kubeconfig_path)
+    success, result, err = _run_oc_command(['get', 'namespaces', '-o', 'jsonpath={.items[*].metadata.name}'], kubeconfig_path, cluster=cluster)
     if success:
         return result.split()
     else:
         logger.error(f"Failed to get namespaces: {err}")
         return []
 
-def get_resources_for_namespace(namespace, kubeconfig_path=None):
+def get_resources_for_namespace(namespace, kubeconfig_path=None, cluster=None):
     """Collects key resources for a specific namespace."""
     ns_data = {'namespace': namespace}
     resources_to_get_yaml = [
@@ -451,7 +576,7 @@ def get_resources_for_namespace(namespace, kubeconfig_path=None):
     ]
     # Secrets are handled separately for redaction
     secrets_success, secrets_result, secrets_err = _run_oc_command(
-        ['get', 'secret', '-n', namespace, '-o', 'yaml'], kubeconfig_path, parse_output='yaml'
+        ['get', 'secret', '-n', namespace, '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml'
     )
     if secrets_success:
         # Redact data field
@@ -472,7 +597,8 @@ def get_resources_for_namespace(namespace, kubeconfig_path=None):
                 ['get', resource, '-n', namespace, '-o', 'yaml'],
                 kubeconfig_path,
                 parse_output='yaml',
-                optional_resource=True # Many might not exist in a namespace
+                optional_resource=True, # Many might not exist in a namespace
+                cluster=cluster
             ): resource
             for resource in resources_to_get_yaml
         }
@@ -492,14 +618,13 @@ def get_resources_for_namespace(namespace, kubeconfig_path=None):
                 logger.error(f'Error getting {resource_name} in ns {namespace}: {exc}')
                 ns_data[resource_name] = {'error': f"Exception getting {resource_name}: {exc}"}
 
-    # Get events separately as plain text
-    success, result, err = _run_oc_command(['get', 'events', '-n', namespace], kubeconfig_path, parse_output=None)
-    ns_data['events_raw'] = result if success else f"Error: {err or 'Failed to get events'}"
+    # Events aren't fetched per namespace: they are in the event store (see app/event_store.py)
 
+    ns_data['collected_at'] = datetime.datetime.now().isoformat()
     return ns_data
 
 
-def get_cluster_resources(kubeconfig_path=None):
+def get_cluster_resources(kubeconfig_path=None, cluster=None):
     """Collects common cluster-scoped resources."""
     cluster_data = {}
     resources_to_get_yaml = [
@@ -518,17 +643,17 @@ def get_cluster_resources(kubeconfig_path=None):
     with ThreadPoolExecutor(max_workers=parallel_jobs) as executor:
         # Yaml resources
         futures_yaml = {
-            executor.submit(_run_oc_command, ['get', resource, '-o', 'yaml'], kubeconfig_path, parse_output='yaml'): resource
+            executor.submit(_run_oc_command, ['get', resource, '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml'): resource
             for resource in resources_to_get_yaml
         }
         # Optional Yaml resources
         futures_optional = {
-             executor.submit(_run_oc_command, ['get', resource, '-o', 'yaml'], kubeconfig_path, parse_output='yaml', optional_resource=True): resource
+             executor.submit(_run_oc_command, ['get', resource, '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml', optional_resource=True): resource
              for resource in resources_to_get_optional
         }
         # Text resources
         futures_text = {
-            executor.submit(_run_oc_command, ['get', resource], kubeconfig_path, parse_output=None): resource
+            executor.submit(_run_oc_command, ['get', resource], kubeconfig_path, cluster=cluster, parse_output=None): resource
             for resource in resources_to_get_text
         }
 
@@ -551,10 +676,10 @@ def get_cluster_resources(kubeconfig_path=None):
 
     return cluster_data
 
-def get_network_info(kubeconfig_path=None):
+def get_network_info(kubeconfig_path=None, cluster=None):
     """Collects network configuration and status."""
     net_data = {}
-    success, result, err = _run_oc_command(['get', 'network.config', 'cluster', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'network.config', 'cluster', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     net_data['network_config_yaml'] = result if success else {'error': err or 'Failed'}
     # Extract summary details
     if success and isinstance(result, dict):
@@ -564,76 +689,160 @@ def get_network_info(kubeconfig_path=None):
             'networkType': result.get('status', {}).get('networkType', 'N/A'),
         }
 
-    success, result, err = _run_oc_command(['get', 'netnamespace'], kubeconfig_path, optional_resource=True)
+    success, result, err = _run_oc_command(['get', 'netnamespace'], kubeconfig_path, cluster=cluster, optional_resource=True)
     net_data['netnamespaces_raw'] = result if success and result is not None else "Not Found or Error"
 
-    success, result, err = _run_oc_command(['get', 'hostsubnet'], kubeconfig_path, optional_resource=True)
+    success, result, err = _run_oc_command(['get', 'hostsubnet'], kubeconfig_path, cluster=cluster, optional_resource=True)
     net_data['hostsubnets_raw'] = result if success and result is not None else "Not Found or Error"
 
     return net_data
 
-def get_storage_info(kubeconfig_path=None):
+def get_storage_info(kubeconfig_path=None, cluster=None):
     """Collects storage classes, PVs, and PVCs."""
     storage_data = {}
-    success, result, err = _run_oc_command(['get', 'storageclass', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'storageclass', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     storage_data['storageclasses_yaml'] = result if success else {'error': err or 'Failed'}
 
-    success, result, err = _run_oc_command(['get', 'pv', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'pv', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     storage_data['persistentvolumes_yaml'] = result if success else {'error': err or 'Failed'}
 
     # PVCs are namespace-scoped, collect summary or link to namespace view
-    success, result, err = _run_oc_command(['get', 'pvc', '--all-namespaces', '-o', 'wide'], kubeconfig_path)
+    success, result, err = _run_oc_command(['get', 'pvc', '--all-namespaces', '-o', 'wide'], kubeconfig_path, cluster=cluster)
     storage_data['pvc_summary_raw'] = result if success else f"Error: {err or 'Failed'}"
     storage_data['pvc_summary_list'] = _parse_oc_get_output(result) if success else []
 
     return storage_data
 
-def get_security_info(kubeconfig_path=None):
+def get_security_info(kubeconfig_path=None, cluster=None):
     """Collects security context constraints and OAuth config."""
     sec_data = {}
-    success, result, err = _run_oc_command(['get', 'scc', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'scc', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     sec_data['scc_yaml'] = result if success else {'error': err or 'Failed'}
 
-    success, result, err = _run_oc_command(['get', 'oauth', 'cluster', '-o', 'yaml'], kubeconfig_path, parse_output='yaml')
+    success, result, err = _run_oc_command(['get', 'oauth', 'cluster', '-o', 'yaml'], kubeconfig_path, cluster=cluster, parse_output='yaml')
     sec_data['oauth_cluster_yaml'] = result if success else {'error': err or 'Failed'}
 
-    # Certificate Expiry (complex logic from bash, needs careful translation)
-    # This is a simplified placeholder - the bash script logic is more robust
-    sec_data['cert_expiry_raw'] = "Certificate expiry check needs full implementation."
-    # TODO: Translate the bash script's cert expiry logic using Python's openssl bindings or subprocess
+    sources, errors = _get_certificate_sources(kubeconfig_path, cluster)
+    rows, summary = certificates.build_expiry_table(
+        sources,
+        workers=current_app.config.get('CERT_PARSE_WORKERS', 4),
+        warning_days=current_app.config.get('CERT_EXPIRY_WARNING_DAYS', certificates.DEFAULT_WARNING_DAYS)
+    )
+    sec_data['cert_expiry_list'] = rows
+    sec_data['cert_expiry_summary'] = dict(summary, errors=errors)
 
     return sec_data
 
-def get_metrics_info(kubeconfig_path=None):
+# Page size of the cluster-wide secret and configmap lists read for the certificate inventory
+CERT_CHUNK_SIZE = 500
+
+# Keys of TLS secrets holding certificates (tls.key, the private key, is never read)
+TLS_SECRET_KEYS = ('tls.crt', 'ca.crt')
+
+def _get_certificate_sources(kubeconfig_path=None, cluster=None):
+    """
+    Get the PEM chains of the TLS secrets and CA bundle configmaps of all namespaces,
+    each list read in one paginated pass.
+
+    Returns:
+        tuple: Sources for certificates.build_expiry_table, and the errors of the lists that failed.
+    """
+    sources, errors = [], []
+    success, result, err = _run_oc_command(
+        ['get', 'secrets', '--all-namespaces', '--field-selector', 'type=kubernetes.io/tls',
+         '--chunk-size', str(CERT_CHUNK_SIZE), '-o', 'json'],
+        kubeconfig_path, parse_output='json', cluster=cluster
+    )
+    if success:
+        for item in result.get('items', []):
+            metadata = item.get('metadata') or {}
+            data = item.get('data') or {}
+            for key in TLS_SECRET_KEYS:
+                if not data.get(key):
+                    continue
+                try:
+                    pem = base64.b64decode(data[key]).decode('utf-8', errors='replace')
+                except ValueError:
+                    continue
+                sources.append({'KIND': 'Secret', 'NAMESPACE': metadata.get('namespace'), 'NAME': metadata.get('name'), 'KEY': key, 'PEM': pem})
+    else:
+        errors.append(f"TLS secrets: {err or 'Failed'}")
+
+    success, result, err = _run_oc_command(
+        ['get', 'configmaps', '--all-namespaces', '--chunk-size', str(CERT_CHUNK_SIZE), '-o', 'json'],
+        kubeconfig_path, parse_output='json', cluster=cluster
+    )
+    if success:
+        for item in result.get('items', []):
+            metadata = item.get('metadata') or {}
+            for key, value in (item.get('data') or {}).items():
+                if isinstance(value, str) and 'BEGIN CERTIFICATE' in value:
+                    sources.append({'KIND': 'ConfigMap', 'NAMESPACE': metadata.get('namespace'), 'NAME': metadata.get('name'), 'KEY': key, 'PEM': value})
+    else:
+        errors.append(f"CA bundle configmaps: {err or 'Failed'}")
+    return sources, errors
+
+# Columns of `oc adm top nodes` and `oc adm top pods --all-namespaces`, printed with --no-headers
+# (the names of the percentage columns vary across oc versions)
+NODE_USAGE_COLUMNS = ['NAME', 'CPU(cores)', 'CPU%', 'MEMORY(bytes)', 'MEMORY%']
+POD_USAGE_COLUMNS = ['NAMESPACE', 'NAME', 'CPU(cores)', 'MEMORY(bytes)']
+
+def get_metrics_info(kubeconfig_path=None, cluster=None):
     """Collects node and pod resource usage."""
     metrics_data = {}
-    success, result, err = _run_oc_command(['adm', 'top', 'nodes', '--no-headers'], kubeconfig_path)
+    success, result, err = _run_oc_command(['adm', 'top', 'nodes', '--no-headers'], kubeconfig_path, cluster=cluster)
     metrics_data['node_usage_raw'] = result if success else f"Error: {err or 'Failed'}"
-    metrics_data['node_usage_list'] = _parse_oc_get_output(f"NAME CPU(cores) CPU% MEMORY(bytes) MEMORY%\n{result}") if success else [] # Add dummy header for parser
+    metrics_data['node_usage_list'] = _parse_oc_get_output(result, NODE_USAGE_COLUMNS) if success else []
 
-    success, result, err = _run_oc_command(['adm', 'top', 'pods', '--all-namespaces', '--no-headers'], kubeconfig_path)
+    success, result, err = _run_oc_command(['adm', 'top', 'pods', '--all-namespaces', '--no-headers'], kubeconfig_path, cluster=cluster)
     metrics_data['pod_usage_raw'] = result if success else f"Error: {err or 'Failed'}"
-    metrics_data['pod_usage_list'] = _parse_oc_get_output(f"NAMESPACE NAME CPU(cores) MEMORY(bytes)\n{result}") if success else []
+    metrics_data['pod_usage_list'] = _parse_oc_get_output(result, POD_USAGE_COLUMNS) if success else []
 
     return metrics_data
 
-def get_events_info(kubeconfig_path=None, limit=100):
-    """Gets cluster-wide events, sorted by time."""
+def _parse_event(item):
+    """
+    Convert an Event object (core/v1 or events.k8s.io/v1) to an event entry, with the
+    columns of `oc get events` (OBJECT is kind/name, LASTSEEN a timestamp) and its UID.
+    """
+    metadata = item.get('metadata') or {}
+    involved_object = item.get('involvedObject') or item.get('regarding') or {}
+    series = item.get('series') or {}
+    kind = involved_object.get('kind') or ''
+    name = involved_object.get('name') or ''
+    created = metadata.get('creationTimestamp')
+    return {
+        'UID': metadata.get('uid') or f"{metadata.get('namespace')}/{metadata.get('name')}",
+        'NAMESPACE': metadata.get('namespace') or involved_object.get('namespace') or '',
+        'TYPE': item.get('type') or 'Normal',
+        'REASON': item.get('reason') or '',
+        'KIND': kind,
+        'NAME': name,
+        'OBJECT': f"{kind.lower()}/{name}" if kind else name,
+        'MESSAGE': (item.get('message') or item.get('note') or '').strip(),
+        'SOURCE': (item.get('source') or {}).get('component') or item.get('reportingComponent') or '',
+        'COUNT': item.get('count') or series.get('count') or 1,
+        'FIRSTSEEN': item.get('firstTimestamp') or item.get('eventTime') or created,
+        'LASTSEEN': item.get('lastTimestamp') or series.get('lastObservedTime') or item.get('eventTime') or created
+    }
+
+def get_events_info(kubeconfig_path=None, limit=100, cluster=None):
+    """Gets cluster-wide events, newest first. recent_events_list holds the newest `limit` events."""
     events_data = {}
-    success, result, err = _run_oc_command(['get', 'events', '--all-namespaces', f'--sort-by=.lastTimestamp'], kubeconfig_path)
-    if success:
-        events_data['events_raw'] = result
-        # Simple split for summary, more robust parsing is better
-        lines = result.strip().split('\n')
-        events_data['events_list'] = _parse_oc_get_output(result) if success else []
+    success, result, err = _run_oc_command(['get', 'events', '--all-namespaces', '-o', 'json'], kubeconfig_path, cluster=cluster, parse_output='json')
+    if success and isinstance(result, dict):
+        events = sorted(
+            (_parse_event(item) for item in result.get('items') or []),
+            key=lambda event: event['LASTSEEN'] or '', reverse=True
+        )
+        events_data['events_list'] = events
         # Get recent and warnings for dashboard potentially
-        events_data['recent_events_list'] = events_data['events_list'][-20:] # Last 20 approx
-        events_data['warning_events_list'] = [e for e in events_data['events_list'] if e.get('TYPE') == 'Warning']
+        events_data['recent_events_list'] = events[:limit]
+        events_data['warning_events_list'] = [e for e in events if e.get('TYPE') == 'Warning']
         events_data['top_warning_reasons'] = _summarize_event_warnings(events_data['warning_events_list'])
 
     else:
         events_data['error'] = err or "Failed to get events"
-        events_data['events_raw'] = f"Error: {events_data['error']}"
         events_data['events_list'] = []
         events_data['recent_events_list'] = []
         events_data['warning_events_list'] = []
@@ -641,6 +850,90 @@ def get_events_info(kubeconfig_path=None, limit=100):
 
     return events_data
 
+def _iter_json_objects(lines):
+    """Decode the stream of JSON objects printed by `oc get --watch -o json`, one after the other."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    for line in lines:
+        buffer += line
+        # An object can only end on a closing brace; nested ones just fail to decode yet
+        if not line.rstrip().endswith('}'):
+            continue
+        try:
+            obj, _ = decoder.raw_decode(buffer.strip())
+        except json.JSONDecodeError:
+            continue
+        buffer = ''
+        yield obj
+
+def watch_events(on_event, stop, kubeconfig_path=None, timeout=300, cluster=None):
+    """
+    Watches cluster-wide events, calling on_event with the entry of each event
+    added or updated. The current events are passed first, then every change.
+
+    Args:
+        on_event (callable): Called with each event entry (see _parse_event).
+        stop (threading.Event): Ends the watch once set (at the next event, at the latest).
+        kubeconfig_path (str, optional): Path to the kubeconfig file.
+        timeout (int): Seconds after which the API server ends the watch.
+        cluster (str, optional): Name of the cluster, keying its rate limiter.
+
+    Returns:
+        tuple: (success (bool), number of events passed (int), error_message (str|None))
+    """
+    base_command, env = _get_oc_base_command(kubeconfig_path)
+    full_command = base_command + [
+        'get', 'events', '--all-namespaces', '--watch', '--output-watch-events', '-o', 'json',
+        f'--request-timeout={timeout}s'
+    ]
+    limiter = get_limiter(cluster or kubeconfig_path or env.get('KUBECONFIG') or 'default')
+    try:
+        limiter.before_request(long_lived=True)
+    except CircuitOpenError as e:
+        return False, 0, str(e)
+
+    logger.info(f"Watching events: {' '.join(full_command)}")
+    received = 0
+    try:
+        process = subprocess.Popen(full_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+    except (FileNotFoundError, PermissionError) as e:
+        limiter.record(False)
+        return False, 0, f"Error starting oc: {e}"
+    # The outcome of the watch is recorded once its stream starts, rather than when it ends minutes later
+    recorded = False
+    try:
+        for watch_event in _iter_json_objects(process.stdout):
+            if not recorded:
+                limiter.record(True)
+                recorded = True
+            if watch_event.get('type') in ('ADDED', 'MODIFIED') and isinstance(watch_event.get('object'), dict):
+                on_event(_parse_event(watch_event['object']))
+                received += 1
+            if stop.is_set():
+                break
+    except Exception:
+        if not recorded:
+            limiter.record(False)
+        raise
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        try:
+            _, stderr = process.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            _, stderr = process.communicate()
+
+    # The watch ending at its request timeout, or being stopped, is the normal outcome
+    stderr_lower = (stderr or '').lower()
+    if stop.is_set() or process.returncode == 0 or 'timeout' in stderr_lower or 'context deadline' in stderr_lower:
+        if not recorded:
+            limiter.record(True)
+        return True, received, None
+    if not recorded:
+        limiter.record(False, transient=True)
+    return False, received, (stderr or '').strip() or f"oc exited with code {process.returncode}"
+
 def _summarize_event_warnings(warning_events):
     """Counts occurrences of different warning reasons."""
     reasons = {}
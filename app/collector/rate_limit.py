@@ -0,0 +1,270 @@
+"""
+Rate limiting and retry policy for the oc commands run against a cluster.
+
+All the threads collecting from a cluster share one limiter, which combines:
+- a token bucket capping the rate of commands (QPS) with some burst,
+- a cap on the number of commands in flight at the same time,
+- a retry budget, so that retries can't multiply the load on a struggling API server,
+- full-jitter exponential backoff, so that failing threads don't retry in lockstep,
+- a circuit breaker that fails fast while the recent error rate is above a threshold.
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Defaults of the settings, overridden by the app config
+DEFAULT_SETTINGS = {
+    'OC_QPS': 10,
+    'OC_BURST': 20,
+    'OC_MAX_INFLIGHT': 4,
+    'OC_RETRY_BUDGET': 30,
+    'RETRY_MAX_DELAY': 30,
+    'CIRCUIT_BREAKER_THRESHOLD': 0.5,
+    'CIRCUIT_BREAKER_MIN_REQUESTS': 20,
+    'CIRCUIT_BREAKER_WINDOW': 60,
+    'CIRCUIT_BREAKER_COOLDOWN': 30
+}
+
+# Retry-After hints found in the error output of oc (e.g. with -v=6 or in API error messages)
+RETRY_AFTER_PATTERN = re.compile(r'retry[- ]after:?\s*(\d+)', re.IGNORECASE)
+
+# Limiters of the clusters (cluster name -> ClusterLimiter)
+limiters = {}
+_limiters_lock = threading.Lock()
+
+class CircuitOpenError(Exception):
+    """Raised when a command is refused because the circuit breaker of its cluster is open."""
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available. Returns whether a token was taken."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a token, waiting for one if needed. Returns the time waited in seconds."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class CircuitBreaker:
+    """
+    Opens once the error rate over a sliding window crosses a threshold, refuses
+    requests while open, and lets a single trial request through after a cooldown.
+    """
+
+    def __init__(self, threshold, min_requests, window, cooldown):
+        self.threshold = threshold
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.opened = None
+        self.trips = 0
+        self.results = deque()
+        self.lock = threading.Lock()
+
+    def _prune(self, now):
+        while self.results and self.results[0][0] < now - self.window:
+            self.results.popleft()
+
+    def allow(self, trial=True):
+        """Whether a request may be sent. Requests that may not be the trial one (trial=False) wait for the breaker to close."""
+        with self.lock:
+            if self.state == 'open':
+                if not trial or time.monotonic() - self.opened < self.cooldown:
+                    return False
+                # Let a trial request through
+                self.state = 'half_open'
+                return True
+            if self.state == 'half_open':
+                # A trial request is already in flight
+                return False
+            return True
+
+    def record(self, success):
+        """Record the outcome of a request."""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'half_open':
+                if success:
+                    self.state = 'closed'
+                    self.results.clear()
+                else:
+                    self.state = 'open'
+                    self.opened = now
+                return
+
+            self.results.append((now, success))
+            self._prune(now)
+            failures = sum(1 for _, ok in self.results if not ok)
+            if not success and len(self.results) >= self.min_requests and failures / len(self.results) >= self.threshold:
+                self.state = 'open'
+                self.opened = now
+                self.trips += 1
+                logger.warning(f"Circuit breaker opened: {failures} of the last {len(self.results)} requests failed")
+
+    def error_rate(self):
+        """Error rate over the sliding window."""
+        with self.lock:
+            self._prune(time.monotonic())
+            if not self.results:
+                return 0.0
+            return sum(1 for _, ok in self.results if not ok) / len(self.results)
+
+class ClusterLimiter:
+    """Rate limit, retry budget, backoff and circuit breaker shared by the commands run against a cluster."""
+
+    def __init__(self, cluster, settings):
+        self.cluster = cluster
+        self.max_delay = settings['RETRY_MAX_DELAY']
+        self.bucket = TokenBucket(settings['OC_QPS'], settings['OC_BURST'])
+        self.inflight = threading.BoundedSemaphore(settings['OC_MAX_INFLIGHT'])
+        # The retry budget refills at OC_RETRY_BUDGET retries per minute
+        self.retry_budget = TokenBucket(settings['OC_RETRY_BUDGET'] / 60, settings['OC_RETRY_BUDGET'])
+        self.breaker = CircuitBreaker(
+            settings['CIRCUIT_BREAKER_THRESHOLD'],
+            settings['CIRCUIT_BREAKER_MIN_REQUESTS'],
+            settings['CIRCUIT_BREAKER_WINDOW'],
+            settings['CIRCUIT_BREAKER_COOLDOWN']
+        )
+        self.stats = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'retries_denied': 0,
+            'rejected': 0,
+            'throttled': 0,
+            'throttled_seconds': 0.0,
+            'backoff_seconds': 0.0
+        }
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def before_request(self, long_lived=False):
+        """
+        Wait for the rate limit before sending a request.
+
+        Args:
+            long_lived (bool): The request is a long-lived stream (a watch), which never takes the trial
+                               slot of a half-open breaker: its outcome would hold every other request back.
+
+        Raises:
+            CircuitOpenError: The circuit breaker is open.
+        """
+        if not self.breaker.allow(trial=not long_lived):
+            self._count('rejected')
+            raise CircuitOpenError(f"Circuit breaker open for cluster {self.cluster}, not sending request")
+        waited = self.bucket.acquire()
+        self._count('requests')
+        if waited:
+            self._count('throttled')
+            self._count('throttled_seconds', waited)
+
+    @contextmanager
+    def in_flight(self):
+        """Hold one of the cluster's in-flight slots while a command runs."""
+        self.inflight.acquire()
+        try:
+            yield
+        finally:
+            self.inflight.release()
+
+    def record(self, success, transient=False):
+        """
+        Record the outcome of a request. Only transient failures (timeouts, overload)
+        count against the circuit breaker: for it, any other answer from the API server,
+        e.g. a missing resource or denied access, shows that the server is healthy.
+        """
+        self._count('successes' if success else 'failures')
+        self.breaker.record(success or not transient)
+
+    def retry_delay(self, attempt, base_delay, retry_after=None):
+        """
+        Get the delay before a retry, or None if the retry budget is exhausted.
+
+        Uses the server's Retry-After hint if there is one, full-jitter exponential backoff otherwise.
+        """
+        if not self.retry_budget.try_acquire():
+            self._count('retries_denied')
+            logger.warning(f"Retry budget exhausted for cluster {self.cluster}, not retrying")
+            return None
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+        else:
+            delay = random.uniform(0, min(self.max_delay, base_delay * 2 ** (attempt - 1)))
+        self._count('retries')
+        self._count('backoff_seconds', delay)
+        return delay
+
+    def get_stats(self):
+        """Get the stats of the cluster."""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['throttled_seconds'] = round(stats['throttled_seconds'], 3)
+        stats['backoff_seconds'] = round(stats['backoff_seconds'], 3)
+        stats['circuit_state'] = self.breaker.state
+        stats['circuit_trips'] = self.breaker.trips
+        stats['error_rate'] = round(self.breaker.error_rate(), 3)
+        return stats
+
+def _get_settings():
+    """Get the limiter settings from the app config, or the defaults outside an app context."""
+    if not has_app_context():
+        return dict(DEFAULT_SETTINGS)
+    return {key: current_app.config.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+def get_limiter(cluster):
+    """Get the limiter of a cluster, creating it on first use."""
+    with _limiters_lock:
+        if cluster not in limiters:
+            limiters[cluster] = ClusterLimiter(cluster, _get_settings())
+        return limiters[cluster]
+
+def parse_retry_after(output):
+    """Get the Retry-After delay in seconds from the error output of a command, or None."""
+    match = RETRY_AFTER_PATTERN.search(output or '')
+    return int(match.group(1)) if match else None
+
+def get_stats():
+    """Get the stats of every cluster (cluster name -> stats)."""
+    with _limiters_lock:
+        return {cluster: limiter.get_stats() for cluster, limiter in limiters.items()}
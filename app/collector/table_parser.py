@@ -0,0 +1,102 @@
+"""
+Table parser module.
+Parses the tabular output of `oc get` and `oc adm top`. These print their
+columns left-aligned and padded to the widest value with at least three
+spaces, so the columns are located from the offsets of the header names rather
+than by splitting on whitespace: header names (LAST SEEN, NOMINATED NODE,
+ACCESS MODES) and values (the DISPLAY of a CSV, the MESSAGE of an operator)
+may contain spaces, and values may be empty (the CAPACITY of a pending PVC).
+
+Tables are returned as columns (name -> list of values), or as rows (dicts).
+"""
+
+import re
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Header names: words separated by single spaces (columns are separated by at least two)
+HEADER_PATTERN = re.compile(r'\S+(?: \S+)*')
+
+def _get_header_columns(header):
+    """Get the (name, start offset) of each column of a header line."""
+    return [(match.group(), match.start()) for match in HEADER_PATTERN.finditer(header)]
+
+def _split_lines(raw_output):
+    """Split output into its non-blank lines."""
+    return [line for line in raw_output.rstrip().split('\n') if line.strip()]
+
+def _parse_split(lines, names):
+    """Parse headerless lines by splitting on whitespace (the last column takes the rest of the line)."""
+    count = len(names)
+    rows = [fields for fields in (line.split(None, count - 1) for line in lines) if len(fields) == count]
+    if len(rows) < len(lines):
+        logger.warning(f"Skipped {len(lines) - len(rows)} of {len(lines)} malformed lines (expected {count} fields)")
+    return {name: list(values) for name, values in zip(names, zip(*rows))} if rows else {name: [] for name in names}
+
+def _parse_aligned(lines, header_columns):
+    """Parse lines into columns at the offsets of the header columns."""
+    names = [name for name, _ in header_columns]
+    starts = [start for _, start in header_columns]
+    ends = starts[1:] + [None]
+    columns = {name: [line[start:end].strip() for line in lines] for name, start, end in zip(names, starts, ends)}
+
+    # A value overflowing into the next column (e.g. a line not printed by the same table writer)
+    # leaves no space before a column start: split such lines on whitespace instead
+    misaligned = set()
+    for start in starts[1:]:
+        before = [line[start - 1:start] for line in lines]
+        if before.count(' ') + before.count('') < len(lines):
+            misaligned.update(index for index, char in enumerate(before) if char not in ('', ' '))
+    malformed = set()
+    for index in misaligned:
+        fields = lines[index].split(None, len(names) - 1)
+        if len(fields) != len(names):
+            malformed.add(index)
+            continue
+        for name, value in zip(names, fields):
+            columns[name][index] = value
+    if malformed:
+        logger.warning(f"Skipped {len(malformed)} of {len(lines)} malformed lines (expected {len(names)} columns)")
+        columns = {
+            name: [value for index, value in enumerate(values) if index not in malformed]
+            for name, values in columns.items()
+        }
+    return columns
+
+def parse_table_columns(raw_output, columns=None):
+    """
+    Parse tabular output into columns.
+
+    Args:
+        raw_output (str): Output, with a header line unless columns are given.
+        columns (list, optional): Column names of output printed without a header (--no-headers),
+                                  which is split on whitespace (the last column takes the rest of the line).
+
+    Returns:
+        dict: Column name -> list of values (one per row), in column order. Empty without rows.
+    """
+    if not raw_output or not isinstance(raw_output, str):
+        return {name: [] for name in columns or []}
+    lines = _split_lines(raw_output)
+    if columns:
+        return _parse_split(lines, list(columns))
+    if len(lines) < 2:  # Need header + at least one data row
+        return {}
+    return _parse_aligned(lines[1:], _get_header_columns(lines[0]))
+
+def parse_table(raw_output, columns=None):
+    """
+    Parse tabular output into rows.
+
+    Args:
+        raw_output (str): Output, with a header line unless columns are given.
+        columns (list, optional): Column names of output printed without a header.
+
+    Returns:
+        list: Rows, as dicts of column name -> value.
+    """
+    table = parse_table_columns(raw_output, columns)
+    names = list(table)
+    return [dict(zip(names, values)) for values in zip(*table.values())]
@@ -0,0 +1,366 @@
+"""
+Event store module.
+Keeps the events of every cluster in an SQLite database in the instance
+directory, indexed by namespace, involved object, reason and type, with hourly
+time buckets. Events are ingested from every events collection and, in the
+process running the collection scheduler, streamed from a watch on each
+cluster. An event is stored once per UID: when it recurs, its count, message
+and last seen time are updated in place.
+"""
+
+import os
+import time
+import queue
+import datetime
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from flask import current_app, jsonify, request
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Store database file, in the instance directory
+STORE_FILE = 'events.db'
+
+# Size of the time buckets events are counted in, in seconds
+BUCKET_SECONDS = 3600
+
+# Page size of event queries, by default and at most
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Events written to the store at once by the watch writer
+WATCH_BATCH_SIZE = 500
+
+# Bounds of the delay before restarting a failed watch, in seconds
+WATCH_RETRY_MIN = 5
+WATCH_RETRY_MAX = 300
+
+# Event entry keys (see app.collector.openshift_collector._parse_event) -> store columns
+COLUMNS = {
+    'UID': 'uid',
+    'NAMESPACE': 'namespace',
+    'KIND': 'kind',
+    'NAME': 'name',
+    'OBJECT': 'object',
+    'TYPE': 'type',
+    'REASON': 'reason',
+    'MESSAGE': 'message',
+    'SOURCE': 'source',
+    'COUNT': 'count',
+    'FIRSTSEEN': 'first_seen',
+    'LASTSEEN': 'last_seen'
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    cluster TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    namespace TEXT,
+    kind TEXT,
+    name TEXT,
+    object TEXT,
+    type TEXT,
+    reason TEXT,
+    message TEXT,
+    source TEXT,
+    count INTEGER NOT NULL,
+    first_seen INTEGER,
+    last_seen INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    UNIQUE (cluster, uid)
+);
+CREATE INDEX IF NOT EXISTS events_last_seen ON events (cluster, last_seen, id);
+CREATE INDEX IF NOT EXISTS events_namespace ON events (cluster, namespace, last_seen, id);
+CREATE INDEX IF NOT EXISTS events_object ON events (cluster, kind, name, last_seen, id);
+CREATE INDEX IF NOT EXISTS events_reason ON events (cluster, reason, bucket);
+CREATE INDEX IF NOT EXISTS events_type ON events (cluster, type, bucket);
+"""
+
+# A recurring event (same UID) only updates the stored one if it is newer
+_UPSERT = """
+INSERT INTO events (cluster, uid, namespace, kind, name, object, type, reason, message, source,
+                    count, first_seen, last_seen, bucket)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (cluster, uid) DO UPDATE SET
+    message = excluded.message, count = excluded.count, last_seen = excluded.last_seen, bucket = excluded.bucket
+WHERE excluded.count > events.count OR excluded.last_seen > events.last_seen
+"""
+
+# Events received from the watches, waiting to be written by the writer thread: (cluster, event entry)
+_pending = queue.Queue()
+
+# Watch thread and stop flag of each cluster
+_watchers = {}
+_watchers_lock = threading.Lock()
+_writer = None
+
+def init_app(app):
+    """Initialize the event store with the Flask app."""
+    with app.app_context():
+        init_store()
+
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def get_store_path():
+    """Get the path to the store database."""
+    return os.path.join(current_app.instance_path, STORE_FILE)
+
+@contextmanager
+def _connect():
+    """Open a connection to the store database, committed (rolled back on errors) and closed on exit."""
+    conn = sqlite3.connect(get_store_path(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def init_store():
+    """Create the store database."""
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with _connect() as conn:
+        # WAL lets the web workers query while the collector worker writes events
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+
+def _parse_time(value):
+    """Parse an event timestamp (RFC 3339, as in Event objects) to a Unix timestamp, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+def _format_time(timestamp):
+    """Format a Unix timestamp like the timestamps of Event objects."""
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _to_row(cluster, event):
+    """Convert an event entry to the parameters of _UPSERT, or None if it has no time."""
+    last_seen = _parse_time(event.get('LASTSEEN'))
+    if last_seen is None:
+        return None
+    return (
+        cluster, event.get('UID'), event.get('NAMESPACE'), event.get('KIND'), event.get('NAME'),
+        event.get('OBJECT'), event.get('TYPE'), event.get('REASON'), event.get('MESSAGE'), event.get('SOURCE'),
+        int(event.get('COUNT') or 1), _parse_time(event.get('FIRSTSEEN')) or last_seen, last_seen,
+        last_seen - last_seen % BUCKET_SECONDS
+    )
+
+def _to_event(row):
+    """Convert a store row to an event entry."""
+    event = {key: row[column] for key, column in COLUMNS.items()}
+    event['FIRSTSEEN'] = _format_time(event['FIRSTSEEN'])
+    event['LASTSEEN'] = _format_time(event['LASTSEEN'])
+    return event
+
+def ingest(cluster, events):
+    """
+    Add events to the store, deduplicated on their UID.
+
+    Args:
+        cluster (str): Cluster name.
+        events (list): Event entries (see app.collector.openshift_collector._parse_event).
+
+    Returns:
+        int: Number of events added or updated.
+    """
+    rows = [row for row in (_to_row(cluster, event) for event in events if event.get('UID')) if row]
+    if not rows:
+        return 0
+    with _connect() as conn:
+        changes = conn.total_changes
+        conn.executemany(_UPSERT, rows)
+        return conn.total_changes - changes
+
+def prune(cluster, max_age_days):
+    """Remove the events of a cluster last seen more than max_age_days ago."""
+    cutoff = int(time.time()) - max_age_days * 86400
+    with _connect() as conn:
+        conn.execute("DELETE FROM events WHERE cluster = ? AND last_seen < ?", (cluster, cutoff))
+
+def has_events(cluster):
+    """Whether the store has any events of a cluster."""
+    with _connect() as conn:
+        return conn.execute("SELECT 1 FROM events WHERE cluster = ? LIMIT 1", (cluster,)).fetchone() is not None
+
+def _filter(cluster, namespace=None, kind=None, name=None, reason=None, event_type=None, since=None, until=None):
+    """Build the WHERE clause and parameters of an event query."""
+    conditions, params = ['cluster = ?'], [cluster]
+    for column, value in (('namespace', namespace), ('kind', kind), ('name', name),
+                          ('reason', reason), ('type', event_type)):
+        if value:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        conditions.append("last_seen >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("last_seen < ?")
+        params.append(until)
+    return ' AND '.join(conditions), params
+
+def parse_cursor(cursor):
+    """
+    Parse a page cursor (last_seen:id of the last event of the previous page).
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    last_seen, _, event_id = (cursor or '').partition(':')
+    return int(last_seen), int(event_id)
+
+def query_events(cluster, namespace=None, kind=None, name=None, reason=None, event_type=None,
+                 since=None, until=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Get a page of the events of a cluster, newest first.
+
+    Args:
+        cluster (str): Cluster name.
+        namespace, kind, name, reason, event_type (str, optional): Only events with these values.
+        since, until (int, optional): Only events last seen in this range (Unix timestamps).
+        limit (int): Page size, at most MAX_PAGE_SIZE.
+        cursor (str, optional): next_cursor of the previous page.
+
+    Returns:
+        dict: events (event entries), total (number of matching events) and
+              next_cursor (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where, params = _filter(cluster, namespace, kind, name, reason, event_type, since, until)
+    page_where, page_params = where, list(params)
+    if cursor:
+        # Keyset pagination: stable while new events are added, and no OFFSET scan
+        page_where += " AND (last_seen, id) < (?, ?)"
+        page_params.extend(parse_cursor(cursor))
+    with _connect() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM events WHERE {page_where} ORDER BY last_seen DESC, id DESC LIMIT ?",
+            page_params + [limit + 1]
+        ).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['last_seen']}:{rows[-1]['id']}"
+    return {
+        'events': [_to_event(row) for row in rows],
+        'total': total,
+        'next_cursor': next_cursor
+    }
+
+def count_by_bucket(cluster, since, event_type=None, namespace=None):
+    """
+    Count the events of a cluster per hourly bucket and reason. An event counts
+    in the bucket it was last seen in, with its number of occurrences.
+
+    Returns:
+        list: Bucket entries (start, reason, events, count), oldest first.
+    """
+    where, params = _filter(cluster, namespace=namespace, event_type=event_type)
+    with _connect() as conn:
+        rows = conn.execute(
+            f"""SELECT bucket, reason, COUNT(*) AS events, SUM(count) AS count FROM events
+                WHERE {where} AND bucket >= ? GROUP BY bucket, reason ORDER BY bucket, count DESC""",
+            params + [since - since % BUCKET_SECONDS]
+        ).fetchall()
+    return [{
+        'start': _format_time(row['bucket']),
+        'reason': row['reason'],
+        'events': row['events'],
+        'count': row['count']
+    } for row in rows]
+
+def _write_pending(app):
+    """Write the events received from the watches to the store, in batches."""
+    with app.app_context():
+        while True:
+            batch = [_pending.get()]
+            while len(batch) < WATCH_BATCH_SIZE:
+                try:
+                    batch.append(_pending.get_nowait())
+                except queue.Empty:
+                    break
+            by_cluster = {}
+            for cluster, event in batch:
+                by_cluster.setdefault(cluster, []).append(event)
+            for cluster, events in by_cluster.items():
+                try:
+                    ingest(cluster, events)
+                except Exception as e:
+                    logger.error(f"Error storing events of cluster {cluster}: {e}")
+
+def _watch_cluster(app, cluster, stop):
+    """Stream the events of a cluster into the store until stopped, restarting the watch as it ends."""
+    from app import clusters
+    from app.collector.openshift_collector import watch_events
+    delay = WATCH_RETRY_MIN
+    with app.app_context():
+        while not stop.is_set():
+            success, received, error = watch_events(
+                lambda event: _pending.put((cluster, event)), stop,
+                clusters.get_kubeconfig(cluster), current_app.config.get('EVENT_WATCH_TIMEOUT', 300), cluster
+            )
+            if success:
+                logger.debug(f"Event watch of cluster {cluster} ended after {received} events, restarting it")
+                delay = WATCH_RETRY_MIN
+                stop.wait(1)
+            else:
+                logger.warning(f"Event watch of cluster {cluster} failed, retrying in {delay}s: {error}")
+                stop.wait(delay)
+                delay = min(delay * 2, WATCH_RETRY_MAX)
+
+def start_watchers(app):
+    """Start a watch on the events of every registered cluster, and stop those of unregistered clusters."""
+    global _writer
+    from app import clusters
+    with app.app_context():
+        cluster_names = clusters.get_cluster_names()
+    with _watchers_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_pending, args=[app], daemon=True)
+            _writer.start()
+        for cluster in list(_watchers):
+            if cluster not in cluster_names:
+                logger.info(f"Stopping the event watch of cluster {cluster}")
+                _watchers.pop(cluster)[1].set()
+        for cluster in cluster_names:
+            if cluster in _watchers and _watchers[cluster][0].is_alive():
+                continue
+            stop = threading.Event()
+            thread = threading.Thread(target=_watch_cluster, args=[app, cluster, stop], daemon=True)
+            _watchers[cluster] = (thread, stop)
+            thread.start()
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the event store."""
+    from app import clusters
+
+    @app.route('/api/v2/events/histogram')
+    def api_events_histogram():
+        """API endpoint to count events per hour and reason over the last `hours` hours, e.g. ?type=Warning."""
+        hours = request.args.get('hours', 24, type=int)
+        cluster = clusters.get_current_cluster()
+        return jsonify({
+            'success': True,
+            'cluster': cluster,
+            'hours': hours,
+            'buckets': count_by_bucket(
+                cluster, int(time.time()) - hours * 3600, request.args.get('type'), request.args.get('namespace')
+            )
+        })
@@ -7,52 +7,35 @@ import json
 import datetime
 import logging
 import uuid
-from flask import current_app, url_for, render_template, send_file
-import weasyprint
+from flask import current_app, url_for, send_file
+from app.report_render import render_report
+from app import export_catalog, export_jobs, clusters, snapshot_file
+from app.responses import iter_compressed
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Exports history
-exports = []
+# Human-readable name of each export format
+EXPORT_LABELS = {
+    'pdf': 'PDF report',
+    'html': 'HTML report',
+    'json': 'JSON export'
+}
+
+# Approximate size of the chunks sent by streaming JSON exports (in characters)
+STREAM_CHUNK_SIZE = 64 * 1024
 
 def init_app(app):
     """Initialize the export module with the Flask app."""
-    # Load exports history if exists
-    _load_exports_history()
+    # Create the export catalog, migrating the exports history file if it exists
+    export_catalog.init_catalog()
     
     # Register API endpoints
     _register_api_endpoints(app)
 
-def _load_exports_history():
-    """Load exports history from file."""
-    exports_file = os.path.join(current_app.instance_path, 'exports_history.json')
-    if os.path.exists(exports_file):
-        try:
-            with open(exports_file, 'r') as f:
-                global exports
-                exports = json.load(f)
-                logger.info(f"Loaded exports history: {len(exports)} entries")
-        except Exception as e:
-            logger.error(f"Error loading exports history: {e}")
-
-def _save_exports_history():
-    """Save exports history to file."""
-    exports_file = os.path.join(current_app.instance_path, 'exports_history.json')
-    try:
-        # Ensure instance directory exists
-        os.makedirs(os.path.dirname(exports_file), exist_ok=True)
-        
-        with open(exports_file, 'w') as f:
-            json.dump(exports, f, indent=2, default=str)
-        
-        logger.info(f"Saved exports history: {len(exports)} entries")
-    except Exception as e:
-        logger.error(f"Error saving exports history: {e}")
-
-def _get_latest_collection_data():
-    """Get the latest collection data."""
-    data_dir = os.path.join(current_app.instance_path, 'collected_data')
+def _get_latest_collection_file(cluster=None):
+    """Get the path of the latest collection file of a cluster (defaults to the current cluster)."""
+    data_dir = clusters.get_data_dir(cluster)
     if not os.path.exists(data_dir):
         return None
     
@@ -61,179 +44,228 @@ def _get_latest_collection_data():
     if not collection_files:
         return None
     
-    latest_file = max(collection_files)
-    latest_file_path = os.path.join(data_dir, latest_file)
+    return os.path.join(data_dir, max(collection_files))
+
+def _get_snapshot_id(collection_file):
+    """
+    Get the snapshot id of a collection file: its path in the collected data directory
+    without extension, i.e. the file name for the default cluster and 'cluster/file name'
+    for the other clusters.
+    """
+    if not collection_file:
+        return None
+    data_dir = os.path.join(current_app.instance_path, 'collected_data')
+    return os.path.splitext(os.path.relpath(collection_file, data_dir))[0].replace(os.sep, '/')
+
+def _load_collection_data(collection_file):
+    """Load the data of a collection file."""
+    if not collection_file:
+        return None
     
     try:
-        with open(latest_file_path, 'r') as f:
+        with open(collection_file, 'r') as f:
             return json.load(f)
     except Exception as e:
         logger.error(f"Error loading collection data: {e}")
         return None
 
-def generate_pdf_report(sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
-    """Generate a PDF report from collected data."""
-    # Get the latest collection data
-    data = _get_latest_collection_data()
-    if not data:
-        return None, "No collection data available"
-    
-    # Filter sections if specified
-    if sections:
-        data = {k: v for k, v in data.items() if k in sections}
+def _open_collection_data(collection_file):
+    """Open the data of a collection file, loading each section on first access (see snapshot_file)."""
+    if not collection_file:
+        return None
     
-    # Generate HTML report
-    html = render_template(
-        'reports/pdf_report.html',
-        data=data,
-        title=title or "OpenShift Cluster Documentation",
-        timestamp=datetime.datetime.now() if include_timestamp else None,
-        include_charts=include_charts,
-        include_raw_data=include_raw_data
-    )
+    try:
+        return snapshot_file.SnapshotFile(collection_file)
+    except Exception as e:
+        logger.error(f"Error loading collection data: {e}")
+        return None
+
+def _get_latest_collection_data(cluster=None):
+    """Get the latest collection data of a cluster (defaults to the current cluster)."""
+    return _load_collection_data(_get_latest_collection_file(cluster))
+
+def _report_cache_key(snapshot_id, format_type, sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
+    """Build the report cache key for a snapshot and a set of render options."""
+    if format_type == 'json':
+        # JSON exports are the collection data alone: the render options don't apply to them
+        title, include_timestamp, include_charts, include_raw_data = None, True, True, False
+    return json.dumps([
+        snapshot_id,
+        format_type,
+        sorted(sections) if sections else None,
+        title,
+        include_timestamp,
+        include_charts,
+        include_raw_data
+    ])
+
+def _get_cached_export(cache_key):
+    """Get the export previously rendered for a cache key, if its file still exists."""
+    export = export_catalog.get_export_by_cache_key(cache_key)
+    if not export or not os.path.exists(export['file']):
+        return None
     
-    # Generate PDF from HTML
+    return export
+
+def invalidate_report_cache(snapshot_id):
+    """Invalidate the reports cached for a snapshot, e.g. once a new collection replaced it."""
+    if not snapshot_id:
+        return
+    export_catalog.clear_cache_keys(snapshot_id)
+    logger.info(f"Report cache invalidated for snapshot {snapshot_id}")
+
+def _new_export_file(format_type):
+    """Allocate an export id and the file path for a new export."""
     exports_dir = os.path.join(current_app.instance_path, 'exports')
     os.makedirs(exports_dir, exist_ok=True)
     
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
     export_id = str(uuid.uuid4())
-    pdf_file = os.path.join(exports_dir, f'report_{timestamp}_{export_id}.pdf')
-    
-    try:
-        weasyprint.HTML(string=html).write_pdf(pdf_file)
-        
-        # Add to exports history
-        export_entry = {
-            'id': export_id,
-            'date': datetime.datetime.now().isoformat(),
-            'type': 'pdf',
-            'sections': sections or list(data.keys()),
-            'file': pdf_file,
-            'size': os.path.getsize(pdf_file),
-            'url': url_for('main.download_export', export_id=export_id, _external=True)
-        }
-        
-        exports.append(export_entry)
-        _save_exports_history()
-        
-        return pdf_file, None
-    except Exception as e:
-        logger.error(f"Error generating PDF report: {e}")
-        return None, f"Error generating PDF report: {e}"
+    prefix = 'export' if format_type == 'json' else 'report'
+    return export_id, os.path.join(exports_dir, f'{prefix}_{timestamp}_{export_id}.{format_type}')
 
-def generate_html_report(sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
-    """Generate an HTML report from collected data."""
-    # Get the latest collection data
-    data = _get_latest_collection_data()
-    if not data:
-        return None, "No collection data available"
+def _add_export(export_id, format_type, sections, export_file, url, snapshot_id, cache_key):
+    """Add a generated export to the export catalog (which also serves as the report cache)."""
+    export_entry = {
+        'id': export_id,
+        'date': datetime.datetime.now().isoformat(),
+        'type': format_type,
+        'sections': sections,
+        'file': export_file,
+        'size': os.path.getsize(export_file),
+        'url': url,
+        'snapshot_id': snapshot_id,
+        'cache_key': cache_key
+    }
     
-    # Filter sections if specified
-    if sections:
-        data = {k: v for k, v in data.items() if k in sections}
+    export_catalog.add_export(export_entry)
+    return export_entry
+
+def _generate_export(format_type, sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
+    """Generate an export of the latest collection data in the given format."""
+    label = EXPORT_LABELS[format_type]
     
-    # Generate HTML report
-    html = render_template(
-        'reports/html_report.html',
-        data=data,
-        title=title or "OpenShift Cluster Documentation",
-        timestamp=datetime.datetime.now() if include_timestamp else None,
-        include_charts=include_charts,
-        include_raw_data=include_raw_data
-    )
+    # Return the cached export if the same export was already rendered for this snapshot
+    collection_file = _get_latest_collection_file()
+    if not collection_file:
+        return None, "No collection data available"
     
-    # Save HTML report
-    exports_dir = os.path.join(current_app.instance_path, 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
+    snapshot_id = _get_snapshot_id(collection_file)
+    cache_key = _report_cache_key(snapshot_id, format_type, sections, title, include_timestamp, include_charts, include_raw_data)
+    cached_export = _get_cached_export(cache_key)
+    if cached_export:
+        logger.info(f"Using cached {label}: {cached_export['file']}")
+        return cached_export['file'], None
     
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    export_id = str(uuid.uuid4())
-    html_file = os.path.join(exports_dir, f'report_{timestamp}_{export_id}.html')
+    export_id, export_file = _new_export_file(format_type)
     
     try:
-        with open(html_file, 'w') as f:
-            f.write(html)
+        included_sections = render_report(
+            collection_file,
+            export_file,
+            format_type,
+            sections=sections,
+            title=title,
+            include_timestamp=include_timestamp,
+            include_charts=include_charts,
+            include_raw_data=include_raw_data,
+            pdf_workers=current_app.config.get('PDF_RENDER_WORKERS', 4)
+        )
         
         # Add to exports history
-        export_entry = {
-            'id': export_id,
-            'date': datetime.datetime.now().isoformat(),
-            'type': 'html',
-            'sections': sections or list(data.keys()),
-            'file': html_file,
-            'size': os.path.getsize(html_file),
-            'url': url_for('main.download_export', export_id=export_id, _external=True)
-        }
-        
-        exports.append(export_entry)
-        _save_exports_history()
+        url = url_for('download_export', export_id=export_id, _external=True)
+        _add_export(export_id, format_type, sections or included_sections, export_file, url, snapshot_id, cache_key)
         
-        return html_file, None
+        return export_file, None
     except Exception as e:
-        logger.error(f"Error generating HTML report: {e}")
-        return None, f"Error generating HTML report: {e}"
+        logger.error(f"Error generating {label}: {e}")
+        return None, f"Error generating {label}: {e}"
+
+def generate_pdf_report(sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
+    """Generate a PDF report from collected data."""
+    return _generate_export('pdf', sections, title, include_timestamp, include_charts, include_raw_data)
+
+def generate_html_report(sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
+    """Generate an HTML report from collected data."""
+    return _generate_export('html', sections, title, include_timestamp, include_charts, include_raw_data)
 
 def generate_json_export(sections=None):
     """Generate a JSON export from collected data."""
-    # Get the latest collection data
-    data = _get_latest_collection_data()
+    return _generate_export('json', sections)
+
+def _iter_json_chunks(data, chunk_size=STREAM_CHUNK_SIZE, default=str):
+    """Serialize data to JSON incrementally, yielding UTF-8 chunks of about chunk_size characters."""
+    buffer = []
+    buffered = 0
+    for fragment in json.JSONEncoder(default=default).iterencode(data):
+        buffer.append(fragment)
+        buffered += len(fragment)
+        if buffered >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+def stream_json_export(sections=None, compress=False):
+    """
+    Stream a JSON export of the latest collection data, without writing an export file.
+
+    Returns:
+        tuple: (chunks (iterator|None), file_name (str|None), error_message (str|None))
+    """
+    collection_file = _get_latest_collection_file()
+    data = _open_collection_data(collection_file)
     if not data:
-        return None, "No collection data available"
-    
-    # Filter sections if specified
-    if sections:
-        data = {k: v for k, v in data.items() if k in sections}
+        return None, None, "No collection data available"
     
-    # Save JSON export
-    exports_dir = os.path.join(current_app.instance_path, 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
-    
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    export_id = str(uuid.uuid4())
-    json_file = os.path.join(exports_dir, f'export_{timestamp}_{export_id}.json')
+    # The sections are copied from the collection file by byte range, never loaded
+    file_name = f"{_get_snapshot_id(collection_file).replace('/', '_')}_{'_'.join(sections) if sections else 'all'}.json"
+    chunks = data.iter_json(sections, STREAM_CHUNK_SIZE)
+    if compress:
+        chunks = iter_compressed(chunks, 'gzip')
+        file_name += '.gz'
     
-    try:
-        with open(json_file, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
-        
-        # Add to exports history
-        export_entry = {
-            'id': export_id,
-            'date': datetime.datetime.now().isoformat(),
-            'type': 'json',
-            'sections': sections or list(data.keys()),
-            'file': json_file,
-            'size': os.path.getsize(json_file),
-            'url': url_for('main.download_export', export_id=export_id, _external=True)
-        }
-        
-        exports.append(export_entry)
-        _save_exports_history()
-        
-        return json_file, None
-    except Exception as e:
-        logger.error(f"Error generating JSON export: {e}")
-        return None, f"Error generating JSON export: {e}"
+    return chunks, file_name, None
 
 def _register_api_endpoints(app):
     """Register API endpoints for the export module."""
-    from flask import jsonify, request, send_file
+    from flask import jsonify, request, send_file, Response, stream_with_context
+    
+    def _streamed_json_export(sections):
+        """Build a streaming download response for a JSON export."""
+        compress = request.args.get('compress') == 'gzip'
+        chunks, file_name, error = stream_json_export(sections=sections, compress=compress)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            })
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype='application/gzip' if compress else 'application/json',
+            headers={'Content-Disposition': f'attachment; filename="{file_name}"'}
+        )
     
     @app.route('/api/v2/exports')
     def api_exports():
-        """API endpoint to get exports history."""
+        """API endpoint to get exports history, newest first, one page at a time."""
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        entries, total = export_catalog.list_exports(limit=limit, offset=offset)
         return jsonify({
-            'exports': exports
+            'exports': entries,
+            'total': total,
+            'limit': limit,
+            'offset': offset
         })
     
     @app.route('/api/v2/exports/<export_id>', methods=['DELETE'])
     def api_delete_export(export_id):
         """API endpoint to delete an export."""
-        global exports
-        
         # Find the export
-        export = next((e for e in exports if e['id'] == export_id), None)
+        export = export_catalog.get_export(export_id)
         if not export:
             return jsonify({
                 'success': False,
@@ -247,8 +279,7 @@ def _register_api_endpoints(app):
             logger.error(f"Error deleting export file: {e}")
         
         # Remove from exports history
-        exports = [e for e in exports if e['id'] != export_id]
-        _save_exports_history()
+        export_catalog.delete_export(export_id)
         
         return jsonify({
             'success': True,
@@ -266,23 +297,42 @@ def _register_api_endpoints(app):
         include_charts = request.args.get('charts', 'yes') == 'yes'
         include_raw_data = request.args.get('raw_data', 'no') == 'yes'
         
-        if format_type == 'pdf':
-            file_path, error = generate_pdf_report(
-                sections=sections,
-                title=title,
-                include_timestamp=include_timestamp,
-                include_charts=include_charts,
-                include_raw_data=include_raw_data
-            )
-        elif format_type == 'html':
-            file_path, error = generate_html_report(
+        if format_type in ('pdf', 'html'):
+            # Rendered in the export process pool (bounded by its queue) rather than in this web worker
+            job, error = export_jobs.submit_export_job(
+                format_type,
                 sections=sections,
                 title=title,
                 include_timestamp=include_timestamp,
                 include_charts=include_charts,
                 include_raw_data=include_raw_data
             )
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                })
+            
+            if job['status'] == 'completed':
+                # Already rendered for this snapshot
+                return jsonify({
+                    'success': True,
+                    'message': f'{format_type.upper()} report generated',
+                    'download_url': job['url']
+                })
+            
+            # Rendering in the background: follow the job at its status URL
+            status_url = url_for('api_export_job', job_id=job['id'], _external=True)
+            return jsonify({
+                'success': True,
+                'message': f'{format_type.upper()} report submitted',
+                'job_id': job['id'],
+                'status_url': status_url,
+                'job': job
+            }), 202, {'Location': status_url}
         elif format_type == 'json':
+            if request.args.get('stream') == 'yes':
+                return _streamed_json_export(sections)
             file_path, error = generate_json_export(sections=sections)
         else:
             return jsonify({
@@ -297,7 +347,7 @@ def _register_api_endpoints(app):
             })
         
         # Get the export entry
-        export = next((e for e in exports if e['file'] == file_path), None)
+        export = export_catalog.get_export_by_file(file_path)
         if not export:
             return jsonify({
                 'success': False,
@@ -316,6 +366,8 @@ def _register_api_endpoints(app):
         format_type = request.args.get('format', 'json')
         
         if format_type == 'json':
+            if request.args.get('stream') == 'yes':
+                return _streamed_json_export([section])
             file_path, error = generate_json_export(sections=[section])
         else:
             return jsonify({
@@ -330,7 +382,7 @@ def _register_api_endpoints(app):
             })
         
         # Get the export entry
-        export = next((e for e in exports if e['file'] == file_path), None)
+        export = export_catalog.get_export_by_file(file_path)
         if not export:
             return jsonify({
                 'success': False,
@@ -347,7 +399,7 @@ def _register_api_endpoints(app):
     def download_export(export_id):
         """Route to download an export."""
         # Find the export
-        export = next((e for e in exports if e['id'] == export_id), None)
+        export = export_catalog.get_export(export_id)
         if not export:
             return "Export not found", 404
         
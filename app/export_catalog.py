@@ -0,0 +1,143 @@
+"""
+Export catalog module.
+Keeps the exports history in an SQLite database in the instance directory,
+indexed by id, file, date and cache key. Every call opens its own connection,
+so the catalog can be shared by threads and by gunicorn worker processes.
+"""
+
+import os
+import json
+import logging
+import sqlite3
+from contextlib import contextmanager
+from flask import current_app
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Catalog database file, in the instance directory
+CATALOG_FILE = 'exports.db'
+
+# Legacy exports history file, migrated into the catalog on first use
+HISTORY_FILE = 'exports_history.json'
+
+# Columns of an export entry
+EXPORT_COLUMNS = ('id', 'date', 'type', 'sections', 'file', 'size', 'url', 'snapshot_id', 'cache_key')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exports (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    sections TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER,
+    url TEXT,
+    snapshot_id TEXT,
+    cache_key TEXT
+);
+CREATE INDEX IF NOT EXISTS exports_file ON exports (file);
+CREATE INDEX IF NOT EXISTS exports_date ON exports (date);
+CREATE INDEX IF NOT EXISTS exports_cache_key ON exports (cache_key);
+CREATE INDEX IF NOT EXISTS exports_snapshot_id ON exports (snapshot_id);
+"""
+
+def get_catalog_path():
+    """Get the path to the catalog database."""
+    return os.path.join(current_app.instance_path, CATALOG_FILE)
+
+@contextmanager
+def _connect():
+    """Open a connection to the catalog database, committed (rolled back on errors) and closed on exit."""
+    conn = sqlite3.connect(get_catalog_path(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _to_entry(row):
+    """Convert a catalog row to an export entry."""
+    if row is None:
+        return None
+    entry = dict(row)
+    entry['sections'] = json.loads(entry['sections'])
+    return entry
+
+def _to_row(entry):
+    """Convert an export entry to catalog row values."""
+    values = dict(entry, sections=json.dumps(entry.get('sections') or []))
+    return tuple(values.get(column) for column in EXPORT_COLUMNS)
+
+def init_catalog():
+    """Create the catalog database and migrate the legacy exports history into it."""
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with _connect() as conn:
+        # WAL lets readers in other workers proceed while an export is being recorded
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+
+    history_file = os.path.join(current_app.instance_path, HISTORY_FILE)
+    if os.path.exists(history_file):
+        try:
+            with open(history_file, 'r') as f:
+                history = json.load(f)
+            with _connect() as conn:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO exports ({', '.join(EXPORT_COLUMNS)}) VALUES ({', '.join('?' * len(EXPORT_COLUMNS))})",
+                    [_to_row(entry) for entry in history]
+                )
+            os.replace(history_file, f'{history_file}.migrated')
+            logger.info(f"Migrated exports history into the export catalog: {len(history)} entries")
+        except Exception as e:
+            logger.error(f"Error migrating exports history: {e}")
+
+def add_export(entry):
+    """Add an export entry to the catalog."""
+    with _connect() as conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO exports ({', '.join(EXPORT_COLUMNS)}) VALUES ({', '.join('?' * len(EXPORT_COLUMNS))})",
+            _to_row(entry)
+        )
+
+def get_export(export_id):
+    """Get an export entry by id."""
+    with _connect() as conn:
+        return _to_entry(conn.execute("SELECT * FROM exports WHERE id = ?", (export_id,)).fetchone())
+
+def get_export_by_file(file_path):
+    """Get an export entry by file path."""
+    with _connect() as conn:
+        return _to_entry(conn.execute("SELECT * FROM exports WHERE file = ?", (file_path,)).fetchone())
+
+def get_export_by_cache_key(cache_key):
+    """Get the most recent export entry rendered for a report cache key."""
+    with _connect() as conn:
+        return _to_entry(conn.execute(
+            "SELECT * FROM exports WHERE cache_key = ? ORDER BY date DESC LIMIT 1", (cache_key,)
+        ).fetchone())
+
+def clear_cache_keys(snapshot_id):
+    """Remove the cache keys of the exports rendered for a snapshot."""
+    with _connect() as conn:
+        conn.execute("UPDATE exports SET cache_key = NULL WHERE cache_key IS NOT NULL AND snapshot_id = ?", (snapshot_id,))
+
+def delete_export(export_id):
+    """Delete an export entry."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM exports WHERE id = ?", (export_id,))
+
+def list_exports(limit=100, offset=0):
+    """
+    List export entries, newest first.
+
+    Returns:
+        tuple: (entries (list), total (int))
+    """
+    with _connect() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM exports").fetchone()[0]
+        rows = conn.execute(
+            "SELECT * FROM exports ORDER BY date DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+    return [_to_entry(row) for row in rows], total
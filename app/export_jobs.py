@@ -0,0 +1,514 @@
+"""
+Export jobs module for generating reports in the background.
+Jobs run in a bounded process pool so that report rendering (WeasyPrint in
+particular) never ties up a web worker. Job state is kept in JSON files in the
+instance directory so that any web worker can report on or cancel any job.
+Each update of a job's state is made under the job's file lock, so that the
+progress, cancellation and outcome of a job never overwrite each other.
+
+The process that submitted a job holds an owner lock file for as long as it
+runs: the unfinished jobs whose owner lock is free were lost with a worker
+that restarted, and are marked failed when a worker starts.
+"""
+
+import os
+import json
+import fcntl
+import datetime
+import logging
+import uuid
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from flask import current_app, url_for
+from app.report_render import render_report, ExportCancelled
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Job states that will not change anymore
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+# Number of finished jobs to keep on disk
+MAX_FINISHED_JOBS = 100
+
+# Process pool running the export jobs, created on first use (and again once broken)
+executor = None
+_executor_lock = threading.Lock()
+
+# Futures of the jobs submitted from this process (job id -> Future)
+futures = {}
+
+# Set once the outcome of a job submitted from this process is recorded (job id -> Event)
+finished_events = {}
+
+# Owner lock of this process (pid, owner id, open lock file), held for as long as the process runs
+_owner = None
+_owner_lock = threading.Lock()
+
+def init_app(app):
+    """Initialize the export jobs module with the Flask app."""
+    # Jobs of a worker that restarted will never finish
+    with app.app_context():
+        try:
+            fail_orphaned_jobs(_get_jobs_dir())
+        except Exception as e:
+            logger.error(f"Error checking for orphaned export jobs: {e}")
+
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def _get_jobs_dir():
+    """Get the directory holding the job state files."""
+    jobs_dir = os.path.join(current_app.instance_path, 'export_jobs')
+    os.makedirs(jobs_dir, exist_ok=True)
+    return jobs_dir
+
+def _job_file(jobs_dir, job_id):
+    """Get the path of a job state file."""
+    return os.path.join(jobs_dir, f'{job_id}.json')
+
+def _cancel_file(jobs_dir, job_id):
+    """Get the path of a job cancellation flag file."""
+    return os.path.join(jobs_dir, f'{job_id}.cancel')
+
+def _lock_file(jobs_dir, job_id):
+    """Get the path of a job's lock file."""
+    return os.path.join(jobs_dir, f'{job_id}.lock')
+
+@contextmanager
+def _job_lock(jobs_dir, job_id):
+    """Hold the lock of a job (across processes) while reading and updating its state."""
+    with open(_lock_file(jobs_dir, job_id), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def _get_owner_dir(jobs_dir):
+    """Get the directory holding the owner lock files."""
+    owner_dir = os.path.join(jobs_dir, 'owners')
+    os.makedirs(owner_dir, exist_ok=True)
+    return owner_dir
+
+def _get_owner(jobs_dir):
+    """Get the owner id of this process, taking its owner lock on first use (and again in forked processes)."""
+    global _owner
+    with _owner_lock:
+        if _owner is None or _owner[0] != os.getpid():
+            owner_id = uuid.uuid4().hex
+            lock_file = open(os.path.join(_get_owner_dir(jobs_dir), f'{owner_id}.lock'), 'w')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _owner = (os.getpid(), owner_id, lock_file)
+        return _owner[1]
+
+def _is_owner_alive(jobs_dir, owner_id):
+    """Whether the process that submitted a job still runs (it holds its owner lock)."""
+    if not owner_id:
+        return False
+    if _owner is not None and _owner[0] == os.getpid() and _owner[1] == owner_id:
+        return True
+    try:
+        with open(os.path.join(_get_owner_dir(jobs_dir), f'{owner_id}.lock'), 'r') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except FileNotFoundError:
+        return False
+    except BlockingIOError:
+        return True
+    # Nobody holds it anymore
+    try:
+        os.remove(os.path.join(_get_owner_dir(jobs_dir), f'{owner_id}.lock'))
+    except FileNotFoundError:
+        pass
+    return False
+
+def fail_orphaned_jobs(jobs_dir):
+    """
+    Mark failed the unfinished jobs whose submitting process no longer runs.
+
+    Returns:
+        int: Number of jobs marked failed.
+    """
+    failed = 0
+    for job in _list_jobs(jobs_dir):
+        if job['status'] in FINISHED_STATES or _is_owner_alive(jobs_dir, job.get('owner')):
+            continue
+        now = datetime.datetime.now().isoformat()
+        job = _update_job(
+            jobs_dir, job['id'], status='failed', stage='Failed', finished=now,
+            error='The export worker restarted before the job finished, try again'
+        )
+        if job and job['status'] == 'failed':
+            logger.warning(f"Export job {job['id']} failed: its worker restarted")
+            failed += 1
+    return failed
+
+def _load_job(jobs_dir, job_id):
+    """Load a job from its state file."""
+    try:
+        with open(_job_file(jobs_dir, job_id), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error loading export job {job_id}: {e}")
+        return None
+
+def _save_job(jobs_dir, job):
+    """Save a job to its state file (atomically, as it is read from other processes)."""
+    job_file = _job_file(jobs_dir, job['id'])
+    fd, tmp_file = tempfile.mkstemp(prefix=f"{job['id']}.", suffix='.tmp', dir=jobs_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(job, f, default=str)
+    os.replace(tmp_file, job_file)
+
+def _update_job(jobs_dir, job_id, **fields):
+    """Update fields of a job unless it has already finished."""
+    with _job_lock(jobs_dir, job_id):
+        job = _load_job(jobs_dir, job_id)
+        if not job or job['status'] in FINISHED_STATES:
+            return job
+        job.update(fields)
+        job['updated'] = datetime.datetime.now().isoformat()
+        _save_job(jobs_dir, job)
+        return job
+
+def _list_jobs(jobs_dir):
+    """List all jobs, newest first."""
+    jobs = []
+    for file_name in os.listdir(jobs_dir):
+        if file_name.endswith('.json'):
+            job = _load_job(jobs_dir, file_name[:-len('.json')])
+            if job:
+                jobs.append(job)
+    return sorted(jobs, key=lambda job: job['created'], reverse=True)
+
+def _prune_jobs(jobs_dir):
+    """Remove the state files of the oldest finished jobs."""
+    finished_jobs = [job for job in _list_jobs(jobs_dir) if job['status'] in FINISHED_STATES]
+    for job in finished_jobs[MAX_FINISHED_JOBS:]:
+        for path in (_job_file(jobs_dir, job['id']), _cancel_file(jobs_dir, job['id']), _lock_file(jobs_dir, job['id'])):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def _get_executor():
+    """Get the process pool running the export jobs."""
+    global executor
+    with _executor_lock:
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=current_app.config.get('EXPORT_WORKERS', 2))
+        return executor
+
+def _reset_executor(pool):
+    """Drop a broken process pool, so that the next job starts a new one."""
+    global executor
+    with _executor_lock:
+        if executor is pool:
+            logger.warning("Export process pool broken, a new one will be started")
+            executor = None
+
+def run_export_job(jobs_dir, job):
+    """
+    Runs an export job. Executed in a worker process of the export pool.
+
+    Returns:
+        list: The sections included in the export.
+    """
+    job_id = job['id']
+    cancel_file = _cancel_file(jobs_dir, job_id)
+
+    def progress(stage, percent):
+        # Checked under the job's lock, so that a cancellation is never overwritten by a progress update
+        with _job_lock(jobs_dir, job_id):
+            if os.path.exists(cancel_file):
+                raise ExportCancelled(f"Export job {job_id} cancelled")
+            job_state = _load_job(jobs_dir, job_id)
+            if job_state and job_state['status'] not in FINISHED_STATES:
+                job_state.update(status='running', stage=stage, progress=percent, updated=datetime.datetime.now().isoformat())
+                _save_job(jobs_dir, job_state)
+
+    progress('Starting', 0)
+    try:
+        sections = render_report(
+            job['collection_file'],
+            job['file'],
+            job['format'],
+            sections=job['sections'],
+            title=job['title'],
+            include_timestamp=job['include_timestamp'],
+            include_charts=job['include_charts'],
+            include_raw_data=job['include_raw_data'],
+            pdf_workers=job['pdf_workers'],
+            progress=progress,
+            cancel_file=cancel_file
+        )
+        # Cancelled during a render step without progress calls (e.g. a single-pass WeasyPrint render)
+        if os.path.exists(cancel_file):
+            raise ExportCancelled(f"Export job {job_id} cancelled")
+        return sections
+    except Exception:
+        # Don't leave partial files behind
+        if os.path.exists(job['file']):
+            os.remove(job['file'])
+        raise
+
+def _on_job_done(app, jobs_dir, job_id, pool, future):
+    """Record the outcome of an export job once its future is done."""
+    futures.pop(job_id, None)
+    try:
+        _record_job_outcome(app, jobs_dir, job_id, pool, future)
+    finally:
+        finished_event = finished_events.pop(job_id, None)
+        if finished_event:
+            finished_event.set()
+
+def _record_job_outcome(app, jobs_dir, job_id, pool, future):
+    """Save the outcome of a done export job to its state file."""
+    with app.app_context(), _job_lock(jobs_dir, job_id):
+        from app.export import _add_export
+
+        job = _load_job(jobs_dir, job_id)
+        if not job or job['status'] in FINISHED_STATES:
+            return
+
+        now = datetime.datetime.now().isoformat()
+        if future.cancelled():
+            job.update({'status': 'cancelled', 'stage': 'Cancelled'})
+        elif isinstance(future.exception(), ExportCancelled):
+            job.update({'status': 'cancelled', 'stage': 'Cancelled'})
+        elif not future.exception() and os.path.exists(_cancel_file(jobs_dir, job_id)):
+            # Cancelled after the worker's last check: the report is not kept
+            if os.path.exists(job['file']):
+                os.remove(job['file'])
+            job.update({'status': 'cancelled', 'stage': 'Cancelled'})
+        elif isinstance(future.exception(), BrokenProcessPool):
+            # A worker process died (e.g. killed for its memory use): every job of the pool fails with it
+            _reset_executor(pool)
+            logger.error(f"Export job {job_id} failed: the export worker process terminated")
+            job.update({'status': 'failed', 'stage': 'Failed', 'error': 'The export worker process terminated, try again'})
+        elif future.exception():
+            logger.error(f"Export job {job_id} failed: {future.exception()}")
+            job.update({'status': 'failed', 'stage': 'Failed', 'error': str(future.exception())})
+        else:
+            _add_export(job['export_id'], job['format'], job['sections'] or future.result(), job['file'],
+                        job['url'], job['snapshot_id'], job['cache_key'])
+            job.update({'status': 'completed', 'stage': 'Completed', 'progress': 100})
+            logger.info(f"Export job {job_id} completed: {job['file']}")
+
+        job['updated'] = now
+        job['finished'] = now
+        _save_job(jobs_dir, job)
+
+        try:
+            os.remove(_cancel_file(jobs_dir, job_id))
+        except FileNotFoundError:
+            pass
+
+def submit_export_job(format_type, sections=None, title=None, include_timestamp=True, include_charts=True, include_raw_data=False):
+    """
+    Submits an export job to the process pool.
+
+    Returns:
+        tuple: (job (dict|None), error_message (str|None))
+    """
+    from app.export import (
+        _get_latest_collection_file, _get_snapshot_id, _report_cache_key, _get_cached_export, _new_export_file
+    )
+
+    jobs_dir = _get_jobs_dir()
+    collection_file = _get_latest_collection_file()
+    if not collection_file:
+        return None, "No collection data available"
+
+    # Bound the number of jobs waiting in this process
+    max_queued = current_app.config.get('EXPORT_QUEUE_SIZE', 10)
+    if len(futures) >= max_queued:
+        return None, f"Too many export jobs in progress (limit {max_queued}), try again later"
+
+    snapshot_id = _get_snapshot_id(collection_file)
+    cache_key = _report_cache_key(snapshot_id, format_type, sections, title, include_timestamp, include_charts, include_raw_data)
+    now = datetime.datetime.now().isoformat()
+    job = {
+        'id': str(uuid.uuid4()),
+        'status': 'queued',
+        'stage': 'Queued',
+        'progress': 0,
+        'error': None,
+        'created': now,
+        'updated': now,
+        'finished': None,
+        'format': format_type,
+        'sections': sections,
+        'title': title,
+        'include_timestamp': include_timestamp,
+        'include_charts': include_charts,
+        'include_raw_data': include_raw_data,
+        'pdf_workers': current_app.config.get('PDF_RENDER_WORKERS', 4),
+        'collection_file': collection_file,
+        'snapshot_id': snapshot_id,
+        'cache_key': cache_key,
+        'owner': _get_owner(jobs_dir)
+    }
+
+    # The same export was already rendered for this snapshot: the job is done right away
+    cached_export = _get_cached_export(cache_key)
+    if cached_export:
+        job.update({
+            'status': 'completed',
+            'stage': 'Completed',
+            'progress': 100,
+            'finished': now,
+            'export_id': cached_export['id'],
+            'file': cached_export['file'],
+            'url': cached_export['url']
+        })
+        _save_job(jobs_dir, job)
+        return job, None
+
+    export_id, export_file = _new_export_file(format_type)
+    job.update({
+        'export_id': export_id,
+        'file': export_file,
+        'url': url_for('download_export', export_id=export_id, _external=True)
+    })
+    _save_job(jobs_dir, job)
+    _prune_jobs(jobs_dir)
+
+    pool = _get_executor()
+    try:
+        future = pool.submit(run_export_job, jobs_dir, job)
+    except BrokenProcessPool:
+        # The pool broke since the previous job: submit to a new one
+        _reset_executor(pool)
+        pool = _get_executor()
+        try:
+            future = pool.submit(run_export_job, jobs_dir, job)
+        except BrokenProcessPool as e:
+            _reset_executor(pool)
+            _update_job(jobs_dir, job['id'], status='failed', stage='Failed', error=str(e), finished=now)
+            return None, "Export workers unavailable, try again later"
+    futures[job['id']] = future
+    finished_events[job['id']] = threading.Event()
+    future.add_done_callback(partial(_on_job_done, current_app._get_current_object(), jobs_dir, job['id'], pool))
+
+    logger.info(f"Submitted export job {job['id']} ({format_type})")
+    return job, None
+
+def wait_export_job(job_id, timeout):
+    """
+    Waits for an export job submitted from this process to finish.
+
+    Returns:
+        dict|None: The job, still queued or running if the timeout expired first.
+    """
+    finished_event = finished_events.get(job_id)
+    if finished_event:
+        finished_event.wait(timeout)
+    return _load_job(_get_jobs_dir(), job_id)
+
+def cancel_export_job(job_id):
+    """
+    Cancels an export job.
+
+    Returns:
+        tuple: (job (dict|None), error_message (str|None))
+    """
+    jobs_dir = _get_jobs_dir()
+    job = _load_job(jobs_dir, job_id)
+    if not job:
+        return None, "Export job not found"
+    if job['status'] in FINISHED_STATES:
+        return job, f"Export job already {job['status']}"
+
+    # A job still waiting in this process's pool can be dropped right away
+    future = futures.get(job_id)
+    if future and future.cancel():
+        return _load_job(jobs_dir, job_id), None
+
+    # Otherwise flag it; the worker stops at its next stage boundary (or its outcome is discarded)
+    with _job_lock(jobs_dir, job_id):
+        job = _load_job(jobs_dir, job_id)
+        if not job or job['status'] in FINISHED_STATES:
+            return job, f"Export job already {job['status'] if job else 'removed'}"
+        with open(_cancel_file(jobs_dir, job_id), 'w') as f:
+            f.write(datetime.datetime.now().isoformat())
+        job.update(stage='Cancelling', updated=datetime.datetime.now().isoformat())
+        _save_job(jobs_dir, job)
+    return job, None
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the export jobs module."""
+    from flask import jsonify, request
+
+    @app.route('/api/v2/export/jobs', methods=['GET', 'POST'])
+    def api_export_jobs():
+        """API endpoint to list export jobs or submit a new one."""
+        if request.method == 'GET':
+            limit = request.args.get('limit', 20, type=int)
+            return jsonify({
+                'jobs': _list_jobs(_get_jobs_dir())[:limit]
+            })
+
+        params = request.get_json(silent=True) or request.args
+        format_type = params.get('format', 'pdf')
+        if format_type not in ('pdf', 'html', 'json'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported format: {format_type}'
+            })
+
+        sections = params.get('sections')
+        if isinstance(sections, str):
+            sections = sections.split(',') if sections else None
+
+        job, error = submit_export_job(
+            format_type,
+            sections=sections,
+            title=params.get('title', 'OpenShift Cluster Documentation'),
+            include_timestamp=params.get('timestamp', 'yes') == 'yes',
+            include_charts=params.get('charts', 'yes') == 'yes',
+            include_raw_data=params.get('raw_data', 'no') == 'yes'
+        )
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            })
+
+        return jsonify({
+            'success': True,
+            'message': f'{format_type.upper()} export job submitted',
+            'job': job
+        })
+
+    @app.route('/api/v2/export/jobs/<job_id>', methods=['GET', 'DELETE'])
+    def api_export_job(job_id):
+        """API endpoint to get the status of an export job or cancel it."""
+        if request.method == 'GET':
+            job = _load_job(_get_jobs_dir(), job_id)
+            if not job:
+                return jsonify({
+                    'success': False,
+                    'error': 'Export job not found'
+                }), 404
+            return jsonify({
+                'success': True,
+                'job': job
+            })
+
+        job, error = cancel_export_job(job_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error,
+                'job': job
+            })
+
+        return jsonify({
+            'success': True,
+            'message': 'Export job cancelled',
+            'job': job
+        })
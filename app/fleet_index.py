@@ -0,0 +1,393 @@
+"""
+Fleet index module.
+Keeps aggregates of every collection snapshot of every cluster (cluster version,
+node counts and capacity, operator versions, warning reason counts) in an SQLite
+database in the instance directory. The aggregates are extracted when a snapshot
+is saved, so that fleet-wide questions (which clusters run operator X below
+version Y, top warning reasons this week) are answered without opening any
+collection file.
+"""
+
+import os
+import re
+import math
+import datetime
+import logging
+import sqlite3
+from contextlib import contextmanager
+from flask import current_app, jsonify, request
+from app.capacity import parse_quantity
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Index database file, in the instance directory
+INDEX_FILE = 'fleet.db'
+
+# Width of each numeric component of a version key, so that version keys compare as strings
+VERSION_PART_WIDTH = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id TEXT PRIMARY KEY,
+    cluster TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    openshift_version TEXT,
+    version_key TEXT,
+    platform TEXT,
+    nodes INTEGER,
+    ready_nodes INTEGER,
+    cpu_capacity REAL,
+    memory_capacity INTEGER,
+    pods_capacity INTEGER,
+    warnings INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshots_cluster ON snapshots (cluster, collected_at);
+CREATE INDEX IF NOT EXISTS snapshots_collected_at ON snapshots (collected_at);
+
+CREATE TABLE IF NOT EXISTS operator_versions (
+    snapshot_id TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    namespace TEXT,
+    name TEXT NOT NULL,
+    csv TEXT,
+    version TEXT,
+    version_key TEXT,
+    phase TEXT
+);
+CREATE INDEX IF NOT EXISTS operator_versions_snapshot ON operator_versions (snapshot_id);
+CREATE INDEX IF NOT EXISTS operator_versions_name ON operator_versions (name, version_key);
+
+CREATE TABLE IF NOT EXISTS warning_reasons (
+    snapshot_id TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS warning_reasons_snapshot ON warning_reasons (snapshot_id);
+CREATE INDEX IF NOT EXISTS warning_reasons_collected_at ON warning_reasons (collected_at);
+"""
+
+# Latest snapshot of each cluster
+_LATEST_SNAPSHOTS = """
+SELECT s.* FROM snapshots s
+JOIN (SELECT cluster, MAX(collected_at) AS collected_at FROM snapshots GROUP BY cluster) latest
+ON s.cluster = latest.cluster AND s.collected_at = latest.collected_at
+"""
+
+def init_app(app):
+    """Initialize the fleet index with the Flask app."""
+    with app.app_context():
+        init_index()
+
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def get_index_path():
+    """Get the path to the index database."""
+    return os.path.join(current_app.instance_path, INDEX_FILE)
+
+@contextmanager
+def _connect():
+    """Open a connection to the index database, committed (rolled back on errors) and closed on exit."""
+    conn = sqlite3.connect(get_index_path(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def init_index():
+    """Create the index database."""
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with _connect() as conn:
+        # WAL lets the web workers query while the collector worker indexes a snapshot
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+
+def version_key(version):
+    """
+    Get a key of a version that sorts like the version, e.g. '4.9.1' < '4.10.0'.
+    Only the leading numeric components count: '5.8.1-12' is keyed as 5.8.1.
+    """
+    match = re.match(r'^v?(\d+(?:\.\d+)*)', (version or '').strip())
+    if not match:
+        return None
+    return '.'.join(part.zfill(VERSION_PART_WIDTH) for part in match.group(1).split('.'))
+
+def _parse_node_capacity(description):
+    """Get the capacity of a node from its `oc describe node` output."""
+    if not isinstance(description, str) or 'Capacity:' not in description:
+        return {}
+    capacity = {}
+    for line in description.split('Capacity:', 1)[1].split('Allocatable:', 1)[0].strip().split('\n'):
+        if ':' in line:
+            key, value = line.strip().split(':', 1)
+            capacity[key.strip()] = value.strip()
+    return capacity
+
+def _summarize_nodes(nodes):
+    """Get the node counts and total capacity of a snapshot's nodes section."""
+    node_list = nodes.get('list') or []
+    summary = {
+        'nodes': len(node_list),
+        'ready_nodes': sum(1 for node in node_list if node.get('STATUS', '').split(',')[0] == 'Ready'),
+        'cpu_capacity': 0.0,
+        'memory_capacity': 0,
+        'pods_capacity': 0
+    }
+    for description in (nodes.get('details') or {}).values():
+        capacity = _parse_node_capacity(description)
+        cpu = parse_quantity(capacity.get('cpu', '0'))
+        memory = parse_quantity(capacity.get('memory', '0'))
+        pods = parse_quantity(capacity.get('pods', '0'))
+        if math.isnan(cpu) or math.isnan(memory) or math.isnan(pods):
+            logger.warning(f"Ignoring unparsable node capacity: {capacity}")
+            continue
+        summary['cpu_capacity'] += cpu
+        summary['memory_capacity'] += int(memory)
+        summary['pods_capacity'] += int(pods)
+    return summary
+
+def _operator_name(csv_name, version):
+    """Get the operator name of a CSV, i.e. its name without the version suffix."""
+    for suffix in (f'.v{version}', f'.{version}'):
+        if version and csv_name.endswith(suffix):
+            return csv_name[:-len(suffix)]
+    return re.sub(r'\.v?\d+(\.\d+)*.*$', '', csv_name)
+
+def _get_warning_reasons(events):
+    """Get the warning reason counts of a snapshot's events section."""
+    if events.get('top_warning_reasons'):
+        return events['top_warning_reasons']
+    from app.collector.openshift_collector import _summarize_event_warnings
+    return _summarize_event_warnings(events.get('warning_events_list') or [])
+
+def index_snapshot(snapshot_id, cluster, data, collected_at=None):
+    """
+    Extract the aggregates of a collection snapshot into the index, replacing
+    those of the same snapshot if it was indexed before.
+
+    Args:
+        snapshot_id (str): Snapshot id (see app.export._get_snapshot_id).
+        cluster (str): Cluster name.
+        data (dict): Collection data.
+        collected_at (datetime, optional): Collection time. Defaults to now.
+    """
+    collected_at = (collected_at or datetime.datetime.now()).isoformat()
+    summary = (data.get('basic_info') or {}).get('summary') or {}
+    version = summary.get('openshiftVersion')
+    nodes = _summarize_nodes(data.get('nodes') or {})
+    warning_reasons = _get_warning_reasons(data.get('events') or {})
+
+    operators = []
+    for csv in (data.get('operators') or {}).get('csv_list') or []:
+        csv_name = csv.get('NAME')
+        if not csv_name:
+            continue
+        operators.append((
+            snapshot_id, cluster, csv.get('NAMESPACE'), _operator_name(csv_name, csv.get('VERSION')),
+            csv_name, csv.get('VERSION'), version_key(csv.get('VERSION')), csv.get('PHASE')
+        ))
+
+    with _connect() as conn:
+        for table in ('snapshots', 'operator_versions', 'warning_reasons'):
+            conn.execute(f"DELETE FROM {table} WHERE snapshot_id = ?", (snapshot_id,))
+        conn.execute(
+            "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (snapshot_id, cluster, collected_at, version, version_key(version), summary.get('platform'),
+             nodes['nodes'], nodes['ready_nodes'], nodes['cpu_capacity'], nodes['memory_capacity'],
+             nodes['pods_capacity'], sum(warning_reasons.values()))
+        )
+        conn.executemany("INSERT INTO operator_versions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", operators)
+        conn.executemany(
+            "INSERT INTO warning_reasons VALUES (?, ?, ?, ?, ?)",
+            [(snapshot_id, cluster, collected_at, reason, count) for reason, count in warning_reasons.items()]
+        )
+
+def prune_index(max_age_days):
+    """Remove the aggregates of the snapshots older than max_age_days."""
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=max_age_days)).isoformat()
+    with _connect() as conn:
+        old_snapshots = "SELECT snapshot_id FROM snapshots WHERE collected_at < ?"
+        conn.execute(f"DELETE FROM operator_versions WHERE snapshot_id IN ({old_snapshots})", (cutoff,))
+        conn.execute("DELETE FROM warning_reasons WHERE collected_at < ?", (cutoff,))
+        conn.execute("DELETE FROM snapshots WHERE collected_at < ?", (cutoff,))
+
+def is_indexed(snapshot_id):
+    """Whether a snapshot is in the index."""
+    with _connect() as conn:
+        return conn.execute("SELECT 1 FROM snapshots WHERE snapshot_id = ?", (snapshot_id,)).fetchone() is not None
+
+def backfill(cluster_data_dirs):
+    """
+    Index the collection files that aren't indexed yet, e.g. those saved before the index existed.
+
+    Args:
+        cluster_data_dirs (dict): Cluster name -> directory of its collection files.
+
+    Returns:
+        int: Number of snapshots indexed.
+    """
+    from app.export import _get_snapshot_id, _open_collection_data
+    indexed = 0
+    for cluster, data_dir in cluster_data_dirs.items():
+        if not os.path.exists(data_dir):
+            continue
+        for file_name in sorted(os.listdir(data_dir)):
+            if not (file_name.startswith('collection_') and file_name.endswith('.json')):
+                continue
+            collection_file = os.path.join(data_dir, file_name)
+            snapshot_id = _get_snapshot_id(collection_file)
+            if is_indexed(snapshot_id):
+                continue
+            data = _open_collection_data(collection_file)
+            if data is None:
+                continue
+            # Named collection_YYYYmmdd_HHMMSS[_ffffff].json after the time they were saved
+            try:
+                collected_at = datetime.datetime.strptime(file_name[11:26], '%Y%m%d_%H%M%S')
+            except ValueError:
+                collected_at = datetime.datetime.fromtimestamp(os.path.getmtime(collection_file))
+            index_snapshot(snapshot_id, cluster, data, collected_at)
+            indexed += 1
+    if indexed:
+        logger.info(f"Indexed {indexed} existing collection snapshots")
+    return indexed
+
+def get_latest_clusters():
+    """Get the aggregates of the latest snapshot of each cluster."""
+    with _connect() as conn:
+        rows = conn.execute(f"{_LATEST_SNAPSHOTS} ORDER BY s.cluster").fetchall()
+    return [_to_cluster(row) for row in rows]
+
+def _to_cluster(row):
+    """Convert a snapshots row to a cluster summary."""
+    entry = dict(row)
+    entry.pop('version_key')
+    return entry
+
+def find_operators(name=None, below=None, at_least=None):
+    """
+    Find the operators installed in the latest snapshot of each cluster.
+
+    Args:
+        name (str, optional): Operator name (CSV name without its version).
+        below (str, optional): Only operators with a version lower than this one.
+        at_least (str, optional): Only operators with this version or a higher one.
+
+    Returns:
+        list: Operator entries (cluster, namespace, name, csv, version, phase), by cluster.
+    """
+    conditions, params = [], []
+    if name:
+        conditions.append("o.name = ?")
+        params.append(name)
+    if below:
+        conditions.append("o.version_key < ?")
+        params.append(version_key(below))
+    if at_least:
+        conditions.append("o.version_key >= ?")
+        params.append(version_key(at_least))
+    query = f"""
+        SELECT o.cluster, o.namespace, o.name, o.csv, o.version, o.phase, s.snapshot_id, s.collected_at
+        FROM ({_LATEST_SNAPSHOTS}) s JOIN operator_versions o ON o.snapshot_id = s.snapshot_id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY o.cluster, o.name, o.namespace
+    """
+    with _connect() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+def top_warning_reasons(since, limit=10, cluster=None):
+    """
+    Get the most frequent warning reasons across the fleet since a given time.
+
+    Snapshots taken a few minutes apart see the same events, so counts aren't summed
+    over snapshots: a reason counts for its peak count of each day in each cluster.
+
+    Returns:
+        list: Reason entries (reason, count, clusters), most frequent first.
+    """
+    params = [since.isoformat()]
+    cluster_filter = ''
+    if cluster:
+        cluster_filter = 'AND cluster = ?'
+        params.append(cluster)
+    params.append(limit)
+    query = f"""
+        SELECT reason, SUM(day_count) AS count, COUNT(DISTINCT cluster) AS clusters FROM (
+            SELECT cluster, reason, substr(collected_at, 1, 10) AS day, MAX(count) AS day_count
+            FROM warning_reasons WHERE collected_at >= ? {cluster_filter}
+            GROUP BY cluster, reason, day
+        ) GROUP BY reason ORDER BY count DESC, reason LIMIT ?
+    """
+    with _connect() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+def get_cluster_history(cluster, since):
+    """Get the aggregates of a cluster's snapshots since a given time, oldest first."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT * FROM snapshots WHERE cluster = ? AND collected_at >= ? ORDER BY collected_at",
+            (cluster, since.isoformat())
+        ).fetchall()
+    return [_to_cluster(row) for row in rows]
+
+def _parse_since(days):
+    """Get the start of a query window of `days` days."""
+    return datetime.datetime.now() - datetime.timedelta(days=days)
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the fleet index."""
+
+    @app.route('/api/v2/fleet/clusters')
+    def api_fleet_clusters():
+        """API endpoint to get the version, nodes, capacity and warnings of each cluster's latest snapshot."""
+        return jsonify({
+            'success': True,
+            'clusters': get_latest_clusters()
+        })
+
+    @app.route('/api/v2/fleet/operators')
+    def api_fleet_operators():
+        """API endpoint to find operators across clusters, e.g. ?name=elasticsearch-operator&below=5.8."""
+        below = request.args.get('below')
+        at_least = request.args.get('at_least')
+        for version in (below, at_least):
+            if version and not version_key(version):
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid version: {version}'
+                }), 400
+
+        operators = find_operators(request.args.get('name'), below, at_least)
+        return jsonify({
+            'success': True,
+            'operators': operators,
+            'clusters': sorted({operator['cluster'] for operator in operators})
+        })
+
+    @app.route('/api/v2/fleet/warnings')
+    def api_fleet_warnings():
+        """API endpoint to get the top warning reasons across clusters over the last `days` days."""
+        days = request.args.get('days', 7, type=int)
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify({
+            'success': True,
+            'days': days,
+            'reasons': top_warning_reasons(_parse_since(days), limit, request.args.get('cluster'))
+        })
+
+    @app.route('/api/v2/fleet/history')
+    def api_fleet_history():
+        """API endpoint to get the node counts, capacity and warnings of a cluster over the last `days` days."""
+        from app import clusters
+        days = request.args.get('days', 7, type=int)
+        cluster = clusters.get_current_cluster()
+        return jsonify({
+            'success': True,
+            'cluster': cluster,
+            'snapshots': get_cluster_history(cluster, _parse_since(days))
+        })
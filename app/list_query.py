@@ -0,0 +1,308 @@
+"""
+List query module.
+Evaluates the list query parameters shared by the list API endpoints against
+the latest collection snapshot of a cluster:
+
+    fields=metadata.name,status.phase   only these fields of each item (dotted paths)
+    filter=status.phase!=Running        only the items matching every condition, with
+                                        = (equals), != (differs), ~ (contains, ignoring
+                                        case), < and > (numbers, or else strings)
+    sort=-metadata.creationTimestamp    item order ('-' for descending)
+    limit=50&cursor=<next_cursor>       one page of the items
+
+The section of a snapshot holding a list is loaded alone from the collection
+file (see snapshot_file) and kept in an index ((snapshot id, section) -> the
+section, and the filtered and sorted results computed so far), so that paging
+through a list neither reloads nor re-sorts it, and no whole snapshot is held.
+Cursors point into the snapshot the first page was read from, so pages stay
+consistent while new snapshots land, and name the cluster of the list: a cursor
+passed with another cluster is rejected.
+"""
+
+import os
+import re
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from flask import current_app
+from app import clusters, resource_model
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Query parameters that turn a request to a list endpoint into a list query
+LIST_ARGS = ('fields', 'filter', 'sort', 'limit', 'cursor')
+
+# Page size of list queries, by default and at most
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Number of snapshot sections kept in the index, and of results kept per section
+INDEX_SECTIONS = 16
+INDEX_RESULTS = 32
+
+# A filter condition: field path, operator, value
+CONDITION_PATTERN = re.compile(r'^([^=!~<>]+)(!=|=|~|<|>)(.*)$')
+
+# (snapshot id, section) -> {'data': section data, 'results': (path, conditions, sort) -> items}, least recently used first
+_index = OrderedDict()
+
+# Marks a section the snapshot doesn't have
+_MISSING = object()
+_index_lock = threading.Lock()
+
+def is_list_request(args):
+    """Whether a request's query parameters ask for a list query."""
+    return any(name in args for name in LIST_ARGS)
+
+def get_field(item, path):
+    """Get the value of a dotted field path of an item (list elements by index), or None."""
+    value = item
+    for key in path.split('.'):
+        if isinstance(value, Mapping):
+            value = value.get(key)
+        elif isinstance(value, (list, tuple)) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+def select_fields(item, fields):
+    """Get an item with only the given fields, keeping their nesting."""
+    selected = {}
+    for path in fields:
+        value = get_field(item, path)
+        if value is None:
+            continue
+        keys = path.split('.')
+        target = selected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return selected
+
+def _parse_number(value):
+    """Parse a number, or None."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_conditions(filters):
+    """
+    Parse filter parameters (each a comma-separated list of conditions).
+
+    Returns:
+        tuple: (path, operator, value) conditions.
+
+    Raises:
+        ValueError: If a condition is invalid.
+    """
+    conditions = []
+    for condition in (part.strip() for value in filters for part in value.split(',')):
+        if not condition:
+            continue
+        match = CONDITION_PATTERN.match(condition)
+        if not match:
+            raise ValueError(f"Invalid filter condition: {condition}")
+        conditions.append((match.group(1).strip(), match.group(2), match.group(3).strip()))
+    return tuple(conditions)
+
+def _matches(item, conditions):
+    """Whether an item matches every condition."""
+    for path, operator, expected in conditions:
+        value = get_field(item, path)
+        text = '' if value is None else str(value)
+        if operator == '=':
+            matched = value is not None and text == expected
+        elif operator == '!=':
+            matched = value is None or text != expected
+        elif operator == '~':
+            matched = expected.lower() in text.lower()
+        else:
+            number, expected_number = _parse_number(value), _parse_number(expected)
+            if number is not None and expected_number is not None:
+                left, right = number, expected_number
+            elif value is not None:
+                left, right = text, expected
+            else:
+                return False
+            matched = left < right if operator == '<' else left > right
+        if not matched:
+            return False
+    return True
+
+def parse_sort(sort):
+    """Parse a sort parameter into (path, descending) keys."""
+    return tuple((key.lstrip('-'), key.startswith('-')) for key in (sort or '').split(',') if key.strip('- '))
+
+def _sort_key(path):
+    """Sort key of a field: numbers before strings."""
+    def key(item):
+        value = get_field(item, path)
+        number = _parse_number(value) if not isinstance(value, (Mapping, list, tuple)) else None
+        return (0, number, '') if number is not None else (1, 0, str(value))
+    return key
+
+def _sorted(items, sort_keys):
+    """Sort items by several keys, each ascending or descending (missing values stay last)."""
+    items = list(items)
+    for path, descending in reversed(sort_keys):
+        key = _sort_key(path)
+        present = [item for item in items if get_field(item, path) is not None]
+        missing = [item for item in items if get_field(item, path) is None]
+        items = sorted(present, key=key, reverse=descending) + missing
+    return items
+
+def _encode_cursor(cluster, snapshot_id, offset):
+    """Encode a page cursor: the cluster, snapshot and offset of the next page."""
+    return base64.urlsafe_b64encode(f"{cluster}|{snapshot_id or ''}|{offset}".encode()).decode()
+
+def _decode_cursor(cursor):
+    """Decode a page cursor into (cluster, snapshot id, offset). Raises ValueError if invalid."""
+    try:
+        cluster, snapshot_id, offset = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 2)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # Snapshot ids are paths in the collected data directory: don't let a cursor point outside of it
+    if offset < 0 or snapshot_id.startswith('/') or '..' in snapshot_id.split('/'):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return cluster, snapshot_id or None, offset
+
+def _is_cluster_snapshot(cluster, snapshot_id):
+    """Whether a snapshot id is a collection file of a cluster (in the cluster's data directory)."""
+    collection_file = os.path.join(current_app.instance_path, 'collected_data', *f'{snapshot_id}.json'.split('/'))
+    return os.path.dirname(collection_file) == clusters.get_data_dir(cluster)
+
+def _get_items(data, path):
+    """
+    Get the items of a list of a snapshot (a path of keys from the snapshot root).
+    Plain values (e.g. namespace names) are returned as {'NAME': value} items.
+
+    Raises:
+        LookupError: If the snapshot has no such list.
+    """
+    value = data
+    for key in path:
+        if not isinstance(value, Mapping) or key not in value:
+            raise LookupError(f"No such list: {'.'.join(path)}")
+        value = value[key]
+    if not isinstance(value, list):
+        raise LookupError(f"Not a list: {'.'.join(path)}")
+    return [item if isinstance(item, Mapping) else {'NAME': item} for item in value]
+
+def _get_section(snapshot_id, section):
+    """
+    Get the index entry of a section of a snapshot, loading the section alone on first use.
+    None if the snapshot no longer exists.
+
+    Raises:
+        LookupError: If the snapshot has no such section.
+    """
+    from app.export import _open_collection_data
+    key = (snapshot_id, section)
+    with _index_lock:
+        entry = _index.get(key)
+        if entry is not None:
+            _index.move_to_end(key)
+    if entry is None:
+        collection_file = os.path.join(current_app.instance_path, 'collected_data', *f'{snapshot_id}.json'.split('/'))
+        if not os.path.exists(collection_file):
+            return None
+        snapshot = _open_collection_data(collection_file)
+        if snapshot is None:
+            return None
+        # Sections stay in the index: keep their hot lists compact
+        data = resource_model.compact_snapshot({section: snapshot[section]})[section] if section in snapshot else _MISSING
+        with _index_lock:
+            entry = _index.setdefault(key, {'data': data, 'results': OrderedDict()})
+            _index.move_to_end(key)
+            while len(_index) > INDEX_SECTIONS:
+                _index.popitem(last=False)
+    if entry['data'] is _MISSING:
+        raise LookupError(f"No such section: {section}")
+    return entry
+
+def get_latest_section(cluster, section):
+    """Get the id and a section of the latest snapshot of a cluster, through the index. The section is None when missing."""
+    from app.export import _get_latest_collection_file, _get_snapshot_id
+    snapshot_id = _get_snapshot_id(_get_latest_collection_file(cluster))
+    try:
+        entry = _get_section(snapshot_id, section) if snapshot_id else None
+    except LookupError:
+        entry = None
+    return (snapshot_id if entry else None), (entry['data'] if entry else None)
+
+def _get_results(entry, path, conditions, sort_keys):
+    """Get the filtered and sorted items of a list of an indexed snapshot."""
+    key = (path, conditions, sort_keys)
+    with _index_lock:
+        if key in entry['results']:
+            entry['results'].move_to_end(key)
+            return entry['results'][key]
+    items = _get_items({path[0]: entry['data']}, path)
+    results = _sorted([item for item in items if _matches(item, conditions)], sort_keys)
+    with _index_lock:
+        entry['results'][key] = results
+        while len(entry['results']) > INDEX_RESULTS:
+            entry['results'].popitem(last=False)
+    return results
+
+def query_snapshot_list(cluster, path, args, fallback=None):
+    """
+    Get a page of a list of the latest snapshot of a cluster.
+
+    Args:
+        cluster (str): Cluster name.
+        path (tuple): Keys of the list from the snapshot root, e.g. ('nodes', 'list').
+        args (MultiDict): Query parameters (see the module docstring).
+        fallback (callable, optional): Returns data shaped like a snapshot with the list,
+                                       e.g. collected live, when the snapshot doesn't have it.
+
+    Returns:
+        dict: items, total (number of matching items), next_cursor (None on the
+              last page) and snapshot_id (None for fallback data).
+
+    Raises:
+        ValueError: If a query parameter is invalid.
+        LookupError: If there is no such list.
+    """
+    from app.export import _get_latest_collection_file, _get_snapshot_id
+    fields = [field for field in (args.get('fields') or '').split(',') if field]
+    conditions = parse_conditions(args.getlist('filter'))
+    sort_keys = parse_sort(args.get('sort'))
+    try:
+        limit = max(1, min(int(args.get('limit') or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ValueError(f"Invalid limit: {args.get('limit')}")
+
+    if args.get('cursor'):
+        cursor_cluster, snapshot_id, offset = _decode_cursor(args['cursor'])
+        if cursor_cluster != cluster or (snapshot_id and not _is_cluster_snapshot(cluster, snapshot_id)):
+            raise ValueError(f"Cursor doesn't belong to cluster {cluster}")
+    else:
+        snapshot_id, offset = _get_snapshot_id(_get_latest_collection_file(cluster)), 0
+
+    try:
+        entry = _get_section(snapshot_id, path[0]) if snapshot_id else None
+        if entry is None and args.get('cursor') and snapshot_id:
+            raise ValueError("Cursor expired: its snapshot no longer exists")
+        if entry is None:
+            raise LookupError('No snapshot')
+        results = _get_results(entry, tuple(path), conditions, sort_keys)
+    except LookupError:
+        if fallback is None:
+            raise
+        snapshot_id = None
+        results = _sorted([item for item in _get_items(fallback(), path) if _matches(item, conditions)], sort_keys)
+
+    page = results[offset:offset + limit]
+    return {
+        'items': [select_fields(item, fields) for item in page] if fields else page,
+        'total': len(results),
+        'next_cursor': _encode_cursor(cluster, snapshot_id, offset + limit) if offset + limit < len(results) else None,
+        'snapshot_id': snapshot_id
+    }
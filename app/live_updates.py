@@ -0,0 +1,192 @@
+"""
+Live updates module.
+Publishes collection progress (runs and sections started and finished, items
+collected, errors) and new snapshot notifications as small messages, and pushes
+them to the browsers with Server-Sent Events at /api/v2/live.
+
+Messages are appended to a log file in the instance directory, so that the web
+workers also see the messages of the collector worker. The id of a message is
+its position in the log, so a reconnecting client resumes after the last
+message it received (Last-Event-ID).
+"""
+
+import os
+import json
+import time
+import datetime
+import logging
+import threading
+from flask import current_app, request, Response, stream_with_context
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Message log, in the instance directory, rotated to LOG_FILE.1 once larger than MAX_LOG_SIZE bytes
+LOG_FILE = 'live_updates.log'
+MAX_LOG_SIZE = 1024 * 1024
+
+# Seconds between checks of the log for new messages, and between keep-alive comments
+POLL_INTERVAL = 0.5
+KEEPALIVE_INTERVAL = 15
+
+# Milliseconds clients wait before reconnecting when a stream ends, and when all the stream slots are taken
+RECONNECT_DELAY = 2000
+BUSY_RECONNECT_DELAY = 30000
+
+_publish_lock = threading.Lock()
+
+# Bounds the streams open at the same time in this process (LIVE_MAX_STREAMS), as each holds a worker thread
+_stream_slots = None
+_stream_slots_lock = threading.Lock()
+
+def init_app(app):
+    """Initialize the live updates with the Flask app."""
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def get_log_path():
+    """Get the path to the message log."""
+    return os.path.join(current_app.instance_path, LOG_FILE)
+
+def publish(message_type, cluster, **fields):
+    """
+    Publish a message to the live update clients. Publishing errors are logged, never raised.
+
+    Args:
+        message_type (str): 'collection', 'section' or 'snapshot'.
+        cluster (str): Cluster the message is about.
+        **fields: Message fields, e.g. section, status, error.
+    """
+    message = dict(fields, type=message_type, cluster=cluster, time=datetime.datetime.now().isoformat())
+    line = json.dumps(message, default=str) + '\n'
+    try:
+        path = get_log_path()
+        with _publish_lock:
+            if os.path.exists(path) and os.path.getsize(path) > MAX_LOG_SIZE:
+                os.replace(path, f'{path}.1')
+            # One append per message: the lines of concurrent publishers don't interleave
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    except Exception as e:
+        logger.error(f"Error publishing {message_type} update: {e}")
+
+def _parse_event_id(event_id):
+    """Parse a message id (log inode:position after the message), or None."""
+    try:
+        inode, position = (int(part) for part in (event_id or '').split(':'))
+        return inode, position
+    except ValueError:
+        return None
+
+def _get_inode(path):
+    """Get the inode of a log, or None if it doesn't exist."""
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+def _read_log(path, inode, position):
+    """
+    Read the complete lines of a log (the current or, once rotated, the previous one) from a position.
+
+    Returns:
+        tuple: (line, position after it) pairs, the position after them, and whether
+               the log was rotated (no more lines will be appended to it).
+    """
+    for log_path, rotated in ((path, False), (f'{path}.1', True)):
+        try:
+            with open(log_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_ino != inode:
+                    continue
+                f.seek(position)
+                data = f.read()
+        except FileNotFoundError:
+            continue
+        lines = []
+        for line in data[:data.rfind(b'\n') + 1].splitlines(keepends=True):
+            position += len(line)
+            lines.append((line.decode('utf-8').strip(), position))
+        return lines, position, rotated
+    return [], position, True
+
+def iter_events(cluster=None, last_event_id=None, timeout=300):
+    """
+    Stream the messages published from now on (or after last_event_id) as Server-Sent Events.
+
+    Args:
+        cluster (str, optional): Only the messages about this cluster.
+        last_event_id (str, optional): Id of the last message the client received.
+        timeout (int): Seconds after which the stream ends (the client reconnects).
+    """
+    path = get_log_path()
+    deadline = time.monotonic() + timeout
+    yield f"retry: {RECONNECT_DELAY}\n\n"
+
+    inode = _get_inode(path)
+    position = os.path.getsize(path) if inode is not None else 0
+    resume = _parse_event_id(last_event_id)
+    if resume and resume[0] in (inode, _get_inode(f'{path}.1')):
+        # Resume after the last message received, in the previous log if it was rotated since
+        inode, position = resume
+    elif last_event_id:
+        # Messages were missed: the client should reload the current state
+        yield "event: reset\ndata: {}\n\n"
+
+    last_sent = time.monotonic()
+    while True:
+        if inode is None:
+            # The log was created (or rotated) since: follow it from its start
+            inode, position = _get_inode(path), 0
+        if inode is not None:
+            lines, position, rotated = _read_log(path, inode, position)
+            for line, line_end in lines:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if cluster and message.get('cluster') != cluster:
+                    continue
+                last_sent = time.monotonic()
+                yield f"id: {inode}:{line_end}\nevent: {message.get('type', 'message')}\ndata: {line}\n\n"
+            if rotated:
+                inode = None
+                continue
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        time.sleep(POLL_INTERVAL)
+
+def _get_stream_slots():
+    """Get the semaphore bounding the open streams of this process, created on first use."""
+    global _stream_slots
+    with _stream_slots_lock:
+        if _stream_slots is None:
+            _stream_slots = threading.BoundedSemaphore(max(1, current_app.config.get('LIVE_MAX_STREAMS', 8)))
+        return _stream_slots
+
+def _iter_slot_events(slots, events):
+    """Stream events, releasing the stream slot once the stream ends or the client disconnects."""
+    try:
+        yield from events
+    finally:
+        slots.release()
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the live updates."""
+
+    @app.route('/api/v2/live')
+    def api_live():
+        """API endpoint streaming collection progress and new snapshots as Server-Sent Events (optionally of one `cluster`)."""
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        slots = _get_stream_slots()
+        if not slots.acquire(blocking=False):
+            # Every stream slot is taken: leave the worker threads to the other requests, the client retries later
+            return Response(f"retry: {BUSY_RECONNECT_DELAY}\n\n", mimetype='text/event-stream', headers=headers)
+        events = iter_events(
+            request.args.get('cluster'),
+            request.headers.get('Last-Event-ID'),
+            current_app.config.get('LIVE_STREAM_TIMEOUT', 60)
+        )
+        return Response(stream_with_context(_iter_slot_events(slots, events)), mimetype='text/event-stream', headers=headers)
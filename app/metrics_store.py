@@ -0,0 +1,411 @@
+"""
+Metrics store module.
+Keeps the node and pod usage reported by `oc adm top` as time series, in a
+columnar store in the instance directory: one binary file per column (NumPy
+arrays appended in place), partitioned by cluster, resolution and period.
+
+Samples are stored at the resolution they are collected at (every metrics
+refresh, 1 minute by default) and downsampled to hourly and daily rollups
+(mean and max), each resolution with its own retention. A range query reads
+only the partitions it covers and filters and groups them with NumPy.
+"""
+
+import os
+import json
+import shutil
+import datetime
+import logging
+import numpy as np
+from flask import current_app, jsonify, request
+from app.capacity import parse_quantity
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Store directory, in the instance directory
+STORE_DIR = 'metrics'
+
+# Series dictionary (series key -> series id) and rollup progress, in each cluster's directory
+SERIES_FILE = 'series.json'
+STATE_FILE = 'state.json'
+
+# Bucket size of each resolution in seconds ('raw' keeps samples as collected)
+RESOLUTIONS = {
+    'raw': None,
+    '1h': 3600,
+    '1d': 86400
+}
+
+# Source resolution each rollup is computed from
+ROLLUP_SOURCES = {
+    '1h': 'raw',
+    '1d': '1h'
+}
+
+# Partition period of each resolution, as a strftime format of the period start (UTC)
+PARTITION_FORMATS = {
+    'raw': '%Y%m%d',
+    '1h': '%Y%m%d',
+    '1d': '%Y%m'
+}
+
+# Default retention of each resolution in days
+DEFAULT_RETENTION = {
+    'raw': 7,
+    '1h': 90,
+    '1d': 730
+}
+
+# Column types: times are Unix timestamps in seconds, CPU in cores, memory in bytes
+COLUMN_TYPES = {
+    'time': 'u4',
+    'series': 'u4',
+    'count': 'u2',
+    'cpu': 'f4',
+    'cpu_max': 'f4',
+    'memory': 'f4',
+    'memory_max': 'f4'
+}
+RAW_COLUMNS = ('time', 'series', 'cpu', 'memory')
+ROLLUP_COLUMNS = ('time', 'series', 'count', 'cpu', 'cpu_max', 'memory', 'memory_max')
+
+# Query ranges up to these many seconds are answered from these resolutions
+AUTO_RESOLUTIONS = (
+    (2 * 86400, 'raw'),
+    (60 * 86400, '1h')
+)
+
+def init_app(app):
+    """Initialize the metrics store with the Flask app."""
+    # Register API endpoints
+    _register_api_endpoints(app)
+
+def get_store_dir(cluster):
+    """Get the store directory of a cluster."""
+    return os.path.join(current_app.instance_path, STORE_DIR, cluster)
+
+def _columns(resolution):
+    """Get the columns stored at a resolution."""
+    return RAW_COLUMNS if resolution == 'raw' else ROLLUP_COLUMNS
+
+def _read_json(path, default):
+    """Read a JSON file, or return the default if it doesn't exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _write_json(path, value):
+    """Write a JSON file atomically."""
+    tmp_file = f'{path}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_file, path)
+
+def _series_key(kind, namespace, name):
+    """Get the key of a series in the series dictionary."""
+    return f"{kind}/{namespace or ''}/{name}"
+
+def _load_series(cluster):
+    """Load the series dictionary of a cluster (series key -> series id)."""
+    return _read_json(os.path.join(get_store_dir(cluster), SERIES_FILE), {})
+
+def _partition_start(resolution, timestamp):
+    """Get the name of the partition holding a timestamp."""
+    return datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc).strftime(PARTITION_FORMATS[resolution])
+
+def _partition_range(resolution, partition):
+    """Get the start and end timestamps of a partition."""
+    start = datetime.datetime.strptime(partition, PARTITION_FORMATS[resolution]).replace(tzinfo=datetime.timezone.utc)
+    if resolution == '1d':
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+    else:
+        end = start + datetime.timedelta(days=1)
+    return start.timestamp(), end.timestamp()
+
+def _list_partitions(cluster, resolution):
+    """List the partitions of a resolution, oldest first."""
+    resolution_dir = os.path.join(get_store_dir(cluster), resolution)
+    if not os.path.exists(resolution_dir):
+        return []
+    return sorted(os.listdir(resolution_dir))
+
+def _append(cluster, resolution, columns):
+    """Append rows (dict of column arrays) to the partitions of a resolution."""
+    # Partitions are days or months: name each distinct day once rather than each row
+    days = np.asarray(columns['time'], dtype='i8') // 86400
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    partitions = np.array([_partition_start(resolution, day * 86400) for day in unique_days])[day_index.ravel()]
+    for partition in np.unique(partitions):
+        rows = partitions == partition
+        partition_dir = os.path.join(get_store_dir(cluster), resolution, partition)
+        os.makedirs(partition_dir, exist_ok=True)
+        for column in _columns(resolution):
+            with open(os.path.join(partition_dir, f'{column}.bin'), 'ab') as f:
+                f.write(np.asarray(columns[column][rows], dtype=COLUMN_TYPES[column]).tobytes())
+
+def _read_partition(cluster, resolution, partition):
+    """Read the columns of a partition."""
+    partition_dir = os.path.join(get_store_dir(cluster), resolution, partition)
+    columns = {}
+    for column in _columns(resolution):
+        path = os.path.join(partition_dir, f'{column}.bin')
+        columns[column] = np.fromfile(path, dtype=COLUMN_TYPES[column]) if os.path.exists(path) else np.array([], dtype=COLUMN_TYPES[column])
+    # A write interrupted by a crash may have left some columns longer than the others
+    length = min(len(values) for values in columns.values())
+    return {column: values[:length] for column, values in columns.items()}
+
+def read_range(cluster, resolution, start, end, series_ids=None):
+    """
+    Read the rows of a resolution with start <= time < end.
+
+    Args:
+        series_ids (iterable, optional): Only the rows of these series.
+
+    Returns:
+        dict: Column arrays. Raw rows are given the rollup columns (count 1, max = value).
+    """
+    if series_ids is not None:
+        series_ids = np.fromiter(series_ids, dtype=COLUMN_TYPES['series'])
+    parts = []
+    for partition in _list_partitions(cluster, resolution):
+        partition_start, partition_end = _partition_range(resolution, partition)
+        if partition_end <= start or partition_start >= end:
+            continue
+        columns = _read_partition(cluster, resolution, partition)
+        rows = (columns['time'] >= start) & (columns['time'] < end)
+        if series_ids is not None:
+            rows &= np.isin(columns['series'], series_ids)
+        parts.append({column: values[rows] for column, values in columns.items()})
+
+    columns = {
+        column: np.concatenate([part[column] for part in parts]) if parts else np.array([], dtype=COLUMN_TYPES[column])
+        for column in _columns(resolution)
+    }
+    if resolution == 'raw':
+        columns['count'] = np.ones(len(columns['time']), dtype=COLUMN_TYPES['count'])
+        columns['cpu_max'] = columns['cpu']
+        columns['memory_max'] = columns['memory']
+    return columns
+
+def _parse_usage(metrics):
+    """Get the (kind, namespace, name, cpu, memory) samples of a metrics section."""
+    samples = []
+    for kind, entries in (('node', metrics.get('node_usage_list')), ('pod', metrics.get('pod_usage_list'))):
+        for entry in entries or []:
+            cpu = parse_quantity(entry.get('CPU(cores)'))
+            memory = parse_quantity(entry.get('MEMORY(bytes)'))
+            if 'NAME' not in entry or np.isnan(cpu) or np.isnan(memory):
+                logger.debug(f"Skipping unparsable {kind} usage {entry}")
+                continue
+            samples.append((kind, entry.get('NAMESPACE'), entry['NAME'], cpu, memory))
+    return samples
+
+def record_metrics(cluster, metrics, timestamp=None):
+    """
+    Append the usage samples of a metrics section to the store, then update the rollups
+    and apply the retention.
+
+    Returns:
+        int: Number of samples stored.
+    """
+    timestamp = int(timestamp or datetime.datetime.now().timestamp())
+    samples = _parse_usage(metrics)
+    if not samples:
+        return 0
+
+    store_dir = get_store_dir(cluster)
+    os.makedirs(store_dir, exist_ok=True)
+    series = _load_series(cluster)
+    series_ids = []
+    for kind, namespace, name, _, _ in samples:
+        key = _series_key(kind, namespace, name)
+        if key not in series:
+            series[key] = len(series)
+        series_ids.append(series[key])
+    _write_json(os.path.join(store_dir, SERIES_FILE), series)
+
+    _append(cluster, 'raw', {
+        'time': np.full(len(samples), timestamp),
+        'series': np.array(series_ids),
+        'cpu': np.array([sample[3] for sample in samples]),
+        'memory': np.array([sample[4] for sample in samples])
+    })
+
+    update_rollups(cluster, timestamp)
+    prune(cluster, timestamp)
+    return len(samples)
+
+def _rollup(columns, step):
+    """Downsample rows to buckets of `step` seconds per series (count-weighted mean and max)."""
+    buckets = columns['time'].astype('i8') // step * step
+    keys = np.stack([buckets, columns['series'].astype('i8')])
+    unique_keys, inverse = np.unique(keys, axis=1, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    boundaries = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+    weights = columns['count'].astype('f8')
+    counts = np.bincount(inverse, weights=weights)
+    return {
+        'time': unique_keys[0],
+        'series': unique_keys[1],
+        'count': np.minimum(counts, np.iinfo(COLUMN_TYPES['count']).max),
+        'cpu': np.bincount(inverse, weights=columns['cpu'] * weights) / counts,
+        'cpu_max': np.maximum.reduceat(columns['cpu_max'][order], boundaries),
+        'memory': np.bincount(inverse, weights=columns['memory'] * weights) / counts,
+        'memory_max': np.maximum.reduceat(columns['memory_max'][order], boundaries)
+    }
+
+def update_rollups(cluster, now):
+    """Compute the rollups of the buckets completed since the last update."""
+    state_file = os.path.join(get_store_dir(cluster), STATE_FILE)
+    state = _read_json(state_file, {})
+    for resolution, source in ROLLUP_SOURCES.items():
+        step = RESOLUTIONS[resolution]
+        end = int(now) // step * step
+        start = state.get(resolution)
+        if start is None:
+            # First rollup: start from the oldest source partition
+            partitions = _list_partitions(cluster, source)
+            if not partitions:
+                continue
+            start = int(_partition_range(source, partitions[0])[0]) // step * step
+        if start >= end:
+            continue
+        columns = read_range(cluster, source, start, end)
+        if len(columns['time']):
+            _append(cluster, resolution, _rollup(columns, step))
+        state[resolution] = end
+    _write_json(state_file, state)
+
+def _get_retention():
+    """Get the retention of each resolution in days."""
+    return dict(DEFAULT_RETENTION, **current_app.config.get('METRICS_RETENTION', {}))
+
+def prune(cluster, now):
+    """Remove the partitions older than the retention of their resolution."""
+    for resolution, days in _get_retention().items():
+        cutoff = now - days * 86400
+        for partition in _list_partitions(cluster, resolution):
+            if _partition_range(resolution, partition)[1] <= cutoff:
+                shutil.rmtree(os.path.join(get_store_dir(cluster), resolution, partition), ignore_errors=True)
+
+def select_series(cluster, kind, namespace=None, name=None):
+    """Get the series of a kind matching a namespace and a name prefix (series id -> (namespace, name))."""
+    selected = {}
+    for key, series_id in _load_series(cluster).items():
+        series_kind, series_namespace, series_name = key.split('/', 2)
+        if series_kind != kind:
+            continue
+        if namespace and series_namespace != namespace:
+            continue
+        if name and not series_name.startswith(name):
+            continue
+        selected[series_id] = (series_namespace or None, series_name)
+    return selected
+
+def query(cluster, kind, start, end, resolution=None, namespace=None, name=None, limit=10):
+    """
+    Get usage time series for charting.
+
+    Args:
+        kind (str): 'node' or 'pod'.
+        start, end (int): Time range (Unix timestamps).
+        resolution (str, optional): 'raw', '1h' or '1d'. Defaults to the finest one retained for the range.
+        namespace, name (str, optional): Only the series of this namespace, with a name starting with this prefix.
+        limit (int): Maximum number of series, the ones with the highest mean CPU first.
+
+    Returns:
+        dict: resolution and series (list of dicts with namespace, name and the timestamps,
+              cpu, cpu_max, memory and memory_max vectors).
+    """
+    if not resolution:
+        resolution = next((res for max_range, res in AUTO_RESOLUTIONS if end - start <= max_range), '1d')
+    selected = select_series(cluster, kind, namespace, name)
+    columns = read_range(cluster, resolution, start, end, selected.keys())
+    if not len(columns['time']):
+        return {'resolution': resolution, 'series': []}
+
+    # Group the rows by series, in time order
+    order = np.lexsort((columns['time'], columns['series']))
+    columns = {column: values[order] for column, values in columns.items()}
+    series_ids, first_rows = np.unique(columns['series'], return_index=True)
+    bounds = np.r_[first_rows, len(columns['series'])]
+
+    # Keep the series with the highest mean CPU
+    mean_cpu = np.add.reduceat(columns['cpu'].astype('f8'), first_rows) / np.diff(bounds)
+    top = np.argsort(-mean_cpu, kind='stable')[:limit]
+
+    series = []
+    for index in top:
+        rows = slice(bounds[index], bounds[index + 1])
+        series_namespace, series_name = selected[int(series_ids[index])]
+        series.append({
+            'namespace': series_namespace,
+            'name': series_name,
+            'timestamps': columns['time'][rows].tolist(),
+            'cpu': columns['cpu'][rows].astype('f8').round(4).tolist(),
+            'cpu_max': columns['cpu_max'][rows].astype('f8').round(4).tolist(),
+            'memory': columns['memory'][rows].astype('i8').tolist(),
+            'memory_max': columns['memory_max'][rows].astype('i8').tolist()
+        })
+    return {'resolution': resolution, 'series': series}
+
+def get_store_size(cluster):
+    """Get the disk size of a cluster's store in bytes, per resolution."""
+    sizes = {}
+    for resolution in RESOLUTIONS:
+        resolution_dir = os.path.join(get_store_dir(cluster), resolution)
+        sizes[resolution] = sum(
+            os.path.getsize(os.path.join(root, file_name))
+            for root, _, file_names in os.walk(resolution_dir) for file_name in file_names
+        )
+    return sizes
+
+def _register_api_endpoints(app):
+    """Register API endpoints for the metrics store."""
+    from app import clusters
+
+    @app.route('/api/v2/metrics/series')
+    def api_metrics_series():
+        """API endpoint to get node or pod usage time series, e.g. ?kind=pod&namespace=x&hours=24."""
+        kind = request.args.get('kind', 'node')
+        resolution = request.args.get('resolution')
+        if kind not in ('node', 'pod'):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid kind. Must be node or pod.'
+            }), 400
+        if resolution and resolution not in RESOLUTIONS:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid resolution. Must be one of {', '.join(RESOLUTIONS)}."
+            }), 400
+
+        end = request.args.get('end', type=int) or int(datetime.datetime.now().timestamp())
+        start = request.args.get('start', type=int) or end - request.args.get('hours', 24, type=int) * 3600
+        cluster = clusters.get_current_cluster()
+        result = query(
+            cluster, kind, start, end, resolution,
+            request.args.get('namespace'), request.args.get('name'), request.args.get('limit', 10, type=int)
+        )
+        return jsonify({
+            'success': True,
+            'cluster': cluster,
+            'kind': kind,
+            'start': start,
+            'end': end,
+            'resolution': result['resolution'],
+            'series': result['series']
+        })
+
+    @app.route('/api/v2/metrics/store')
+    def api_metrics_store():
+        """API endpoint to get the disk size and retention of the metrics store of a cluster."""
+        cluster = clusters.get_current_cluster()
+        return jsonify({
+            'success': True,
+            'cluster': cluster,
+            'size': get_store_size(cluster),
+            'retention_days': _get_retention()
+        })
@@ -0,0 +1,159 @@
+"""
+Page cache module.
+Keeps the HTML views rendered from a collection snapshot (nodes, operators,
+storage, ...) as files, plain and gzipped, per snapshot. The pages of a new
+snapshot are rendered right after it is collected (the pages of the sections
+that didn't change are carried over from the previous snapshot), so that
+requests are answered from the files, and with 304 Not Modified while the
+client already has the page of the latest snapshot.
+
+The files are kept in the instance directory, shared by the collector worker
+that renders them and the web workers that serve them.
+"""
+
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+import logging
+import uuid
+from flask import current_app, render_template, request, Response
+from app import clusters, responses
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Directory of the rendered pages, in the instance directory
+CACHE_DIR = 'page_cache'
+
+# Number of snapshots per cluster whose pages are kept (older pages may still be served while a new snapshot lands)
+KEEP_SNAPSHOTS = 2
+
+# Pages rendered from a snapshot: page -> (template, title, snapshot section passed to the template, default)
+PAGES = {
+    'cluster': ('pages/cluster_overview.html', 'Cluster Overview', 'cluster', {}),
+    'operators': ('pages/operators.html', 'Operators', 'operators', {}),
+    'etcd': ('pages/etcd.html', 'ETCD', 'etcd', {}),
+    'nodes': ('pages/nodes.html', 'Nodes', 'nodes', {}),
+    'namespaces': ('pages/namespaces.html', 'Namespaces', 'namespaces', []),
+    'storage': ('pages/storage.html', 'Storage', 'storage', {}),
+    'network': ('pages/network.html', 'Network', 'network', {}),
+    'security': ('pages/security.html', 'Security', 'security', {}),
+    'metrics': ('pages/metrics.html', 'Metrics', 'metrics', {}),
+    'events': ('pages/events.html', 'Events', 'events', {})
+}
+
+def get_cache_dir(snapshot_id):
+    """Get the directory of the rendered pages of a snapshot."""
+    return os.path.join(current_app.instance_path, CACHE_DIR, *snapshot_id.split('/'))
+
+def _get_page_file(snapshot_id, page):
+    """
+    Get the path of a rendered page of a snapshot. Pages list the registered
+    clusters (the cluster selector), so their file names depend on them.
+    """
+    digest = hashlib.sha1(json.dumps(clusters.get_cluster_names()).encode()).hexdigest()[:8]
+    return os.path.join(get_cache_dir(snapshot_id), f'{page}-{digest}.html')
+
+def render_page(page, data):
+    """Render a page from the data of a snapshot."""
+    template, title, section, default = PAGES[page]
+    return render_template(template, title=title, **{section: data.get(section, default)})
+
+def _write_page(page_file, html):
+    """Write a rendered page, and its gzipped copy (atomically, as other workers serve them)."""
+    os.makedirs(os.path.dirname(page_file), exist_ok=True)
+    body = html.encode('utf-8')
+    for path, content in ((page_file, body), (f'{page_file}.gz', gzip.compress(body, 9))):
+        fd, tmp_file = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_file, path)
+
+def _carry_over_page(previous_file, page_file):
+    """Reuse the rendered page of the previous snapshot. Returns False if there is none."""
+    if not (os.path.exists(previous_file) and os.path.exists(f'{previous_file}.gz')):
+        return False
+    os.makedirs(os.path.dirname(page_file), exist_ok=True)
+    for source, target in ((previous_file, page_file), (f'{previous_file}.gz', f'{page_file}.gz')):
+        # A unique name in the target directory, for the hard link
+        tmp_file = os.path.join(os.path.dirname(target), f'.{uuid.uuid4().hex}.tmp')
+        try:
+            os.link(source, tmp_file)
+        except OSError:
+            shutil.copyfile(source, tmp_file)
+        os.replace(tmp_file, target)
+    return True
+
+def prerender(snapshot_id, cluster, data, sections=None, previous_snapshot_id=None):
+    """
+    Render the pages of a new snapshot of a cluster, and drop the pages of its older snapshots.
+
+    Args:
+        snapshot_id (str): Snapshot id.
+        cluster (str): Cluster of the snapshot.
+        data (dict): Snapshot data.
+        sections (list, optional): Sections that changed since the previous snapshot (None: all of them).
+        previous_snapshot_id (str, optional): Snapshot whose pages of the unchanged sections are reused.
+
+    Returns:
+        int: Number of pages rendered (rather than reused).
+    """
+    rendered = 0
+    # Render as a request to the cluster's pages would (the cluster selector, url_for)
+    with current_app.test_request_context(query_string={'cluster': cluster}):
+        for page, (_, _, section, _) in PAGES.items():
+            page_file = _get_page_file(snapshot_id, page)
+            if (previous_snapshot_id and sections is not None and section not in sections
+                    and _carry_over_page(_get_page_file(previous_snapshot_id, page), page_file)):
+                continue
+            _write_page(page_file, render_page(page, data))
+            rendered += 1
+    prune(snapshot_id)
+    logger.info(f"Rendered {rendered} of {len(PAGES)} pages of snapshot {snapshot_id}")
+    return rendered
+
+def prune(snapshot_id):
+    """Drop the pages of all but the latest KEEP_SNAPSHOTS snapshots of the cluster of a snapshot."""
+    parent = os.path.dirname(get_cache_dir(snapshot_id))
+    cached = sorted(name for name in os.listdir(parent) if name.startswith('collection_'))
+    for name in cached[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+def _read_page(page_file, encoding=None):
+    """Read a rendered page, gzipped if the encoding is gzip."""
+    with open(f'{page_file}.gz' if encoding == 'gzip' else page_file, 'rb') as f:
+        return f.read()
+
+def serve_page(page):
+    """
+    Respond with a page of the latest snapshot of the current cluster: from the page
+    cache (rendering the page on a miss), or with 304 Not Modified.
+    """
+    from app.export import _get_latest_collection_file, _get_snapshot_id, _open_collection_data
+    collection_file = _get_latest_collection_file(clusters.get_current_cluster())
+    snapshot_id = _get_snapshot_id(collection_file)
+    if not snapshot_id or not current_app.config.get('PAGE_CACHE', True):
+        return render_page(page, _open_collection_data(collection_file) or {})
+
+    page_file = _get_page_file(snapshot_id, page)
+    etag = responses.make_etag(f'{snapshot_id}:{os.path.basename(page_file)}')
+    last_modified = responses.file_last_modified(collection_file)
+    cached = responses.not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    encoding = 'gzip' if request.accept_encodings['gzip'] else None
+    try:
+        body = _read_page(page_file, encoding)
+    except FileNotFoundError:
+        # Not rendered yet, e.g. snapshots collected before the page cache existed
+        _write_page(page_file, render_page(page, _open_collection_data(collection_file) or {}))
+        body = _read_page(page_file, encoding)
+    response = Response(body, mimetype='text/html')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    responses.set_validators(response, etag, last_modified)
+    return response
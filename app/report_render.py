@@ -0,0 +1,290 @@
+"""
+Report rendering module.
+Renders reports from a collection file without a Flask app context, so it can
+run both inside the web process and in export worker processes.
+"""
+
+import os
+import io
+import json
+import datetime
+import logging
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from app.capacity import analyze as analyze_capacity
+from app.snapshot_file import SnapshotFile
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pypdf is optional: without it PDF reports are rendered in a single pass
+    PdfReader = PdfWriter = None
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Template file for each report format
+REPORT_TEMPLATES = {
+    'pdf': 'reports/pdf_report.html',
+    'html': 'reports/html_report.html'
+}
+
+# Parts a PDF report is split into when rendered in parallel, in report order: (part, title, data sections)
+PDF_PARTS = [
+    ('overview', 'Cluster Overview', ['basic_info', 'operators', 'etcd']),
+    ('nodes', 'Nodes', ['nodes']),
+    ('network', 'Network', ['network']),
+    ('storage', 'Storage', ['storage']),
+    ('security', 'Security', ['security']),
+    ('metrics', 'Metrics', ['metrics']),
+    ('events', 'Events', ['events']),
+    ('namespaces', 'Namespaces', ['namespaces']),
+    ('capacity', 'Capacity', ['capacity'])
+]
+
+# Interval, in seconds, at which a render in parts checks whether it was cancelled while parts are rendered
+CANCEL_POLL_INTERVAL = 1
+
+# Jinja environment, created lazily once per process
+_template_env = None
+
+class ExportCancelled(Exception):
+    """Raised from a progress callback to abort a report render."""
+
+def _css_string(value):
+    """Quote a value as a CSS string, e.g. the content of a page margin box (anything but plain text is escaped)."""
+    return Markup('"' + ''.join(
+        char if char.isalnum() or char in ' -_.,:()' else f'\\{ord(char):06x}' for char in str(value)
+    ) + '"')
+
+def _get_template_env():
+    """Get the Jinja environment for the report templates."""
+    global _template_env
+    if _template_env is None:
+        templates_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+        _template_env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(['html'])
+        )
+        _template_env.filters['css_string'] = _css_string
+    return _template_env
+
+def _render_html(template_name, **context):
+    """Render a report template to an HTML string."""
+    return _get_template_env().get_template(template_name).render(**context)
+
+def _check_cancelled(cancel_file):
+    """Raise ExportCancelled if the render was cancelled, i.e. its cancel file exists."""
+    if cancel_file and os.path.exists(cancel_file):
+        raise ExportCancelled("Report render cancelled")
+
+def _render_pdf_part(part, data, output_file, context, cancel_file=None):
+    """
+    Renders one part of a PDF report.
+
+    Returns:
+        int: The number of pages of the part.
+    """
+    import weasyprint
+
+    html = _render_html(REPORT_TEMPLATES['pdf'], data=data, part=part, **context)
+    _check_cancelled(cancel_file)
+    document = weasyprint.HTML(string=html).render()
+    _check_cancelled(cancel_file)
+    document.write_pdf(output_file)
+    return len(document.pages)
+
+def _render_pdf_section_part(collection_file, part, keys, output_file, context, cancel_file=None):
+    """
+    Renders one part of a PDF report from its sections of a collection file. Executed in a
+    worker process of the PDF render pool, which loads the sections of its part only.
+
+    Returns:
+        int: The number of pages of the part.
+    """
+    _check_cancelled(cancel_file)
+    snapshot = SnapshotFile(collection_file)
+    data = {key: snapshot[key] for key in keys if key in snapshot}
+    if 'capacity' in keys:
+        # Derived from the nodes and metrics sections
+        data['capacity'] = analyze_capacity(snapshot)
+    return _render_pdf_part(part, data, output_file, context, cancel_file)
+
+def _get_part_start_pages(parts, page_counts, cover_pages):
+    """Get the first page number of each part, given the number of pages of the cover."""
+    start_pages = {}
+    next_page = cover_pages + 1
+    for part in parts:
+        start_pages[part] = next_page
+        next_page += page_counts[part]
+    return start_pages
+
+def _render_pdf_cover(sections, cover_file, context, part_names, page_counts):
+    """
+    Renders the cover (title and table of contents) of a PDF report rendered in parts.
+    Rendered again while the table of contents doesn't fit on the assumed number of pages,
+    as the first page of each part follows the cover.
+
+    Returns:
+        dict: The first page number of each part.
+    """
+    sections_present = dict.fromkeys(sections, True)
+    cover_pages = 1
+    while True:
+        toc_pages = _get_part_start_pages(part_names, page_counts, cover_pages)
+        rendered_pages = _render_pdf_part('cover', sections_present, cover_file, dict(context, toc_pages=toc_pages))
+        if rendered_pages == cover_pages:
+            return toc_pages
+        cover_pages = rendered_pages
+
+def _render_pdf_in_parts(collection_file, sections, output_file, context, workers, progress=None, cancel_file=None):
+    """
+    Renders a PDF report as separate parts in a process pool and merges them.
+
+    Each worker loads and lays out the sections of a single part, so peak memory is
+    bounded by the largest part rather than the whole report, and this process loads
+    none of them. The cover (title and table of contents) is rendered last, once the
+    first page of each part is known, and page headers and footers are stamped onto
+    the merged document.
+
+    Args:
+        sections (set): The non-empty sections to include.
+    """
+    import weasyprint
+
+    parts = [(part, [key for key in keys if key in sections]) for part, _, keys in PDF_PARTS]
+    parts = [(part, keys) for part, keys in parts if keys]
+    part_names = [part for part, _ in parts]
+    part_titles = {part: title for part, title, _ in PDF_PARTS}
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_file)) as parts_dir:
+        part_files = {part: os.path.join(parts_dir, f'{part}.pdf') for part in part_names}
+        page_counts = {}
+
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(parts)))
+        try:
+            futures = {
+                pool.submit(_render_pdf_section_part, collection_file, part, keys, part_files[part], context, cancel_file): part
+                for part, keys in parts
+            }
+            pending = set(futures)
+            while pending:
+                # Checked while parts are rendered too, not only once one of them is done
+                done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                _check_cancelled(cancel_file)
+                for future in done:
+                    page_counts[futures[future]] = future.result()
+                if done:
+                    _report_progress(
+                        progress, f'Rendered {len(page_counts)} of {len(futures)} report parts',
+                        30 + 50 * len(page_counts) // len(futures)
+                    )
+        finally:
+            # Drop the parts not started yet if rendering failed or was cancelled
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        # Render the cover with the page numbers of the table of contents
+        _report_progress(progress, 'Rendering table of contents', 85)
+        cover_file = os.path.join(parts_dir, 'cover.pdf')
+        toc_pages = _render_pdf_cover(sections, cover_file, context, part_names, page_counts)
+
+        # Merge the parts, with a bookmark for each part
+        _report_progress(progress, 'Merging report parts', 90)
+        writer = PdfWriter()
+        writer.append(cover_file)
+        for part in part_names:
+            writer.append(part_files[part])
+            writer.add_outline_item(part_titles[part], toc_pages[part] - 1)
+
+        # Stamp page headers and footers, numbered across the whole report
+        overlay_html = _render_html('reports/pdf_page_overlay.html', title=context['title'], page_count=len(writer.pages))
+        overlay = PdfReader(io.BytesIO(weasyprint.HTML(string=overlay_html).write_pdf()))
+        for page, overlay_page in zip(writer.pages, overlay.pages):
+            page.merge_page(overlay_page)
+
+        with open(output_file, 'wb') as f:
+            writer.write(f)
+
+def _report_progress(progress, stage, percent):
+    """Report progress to the optional progress callback."""
+    if progress:
+        progress(stage, percent)
+
+def render_report(collection_file, output_file, format_type, sections=None, title=None, include_timestamp=True,
+                  include_charts=True, include_raw_data=False, pdf_workers=0, progress=None, cancel_file=None):
+    """
+    Renders a report for a collection file and writes it to output_file.
+
+    Args:
+        collection_file (str): Path to the collection data file.
+        output_file (str): Path of the report file to write.
+        format_type (str): 'pdf', 'html' or 'json'.
+        sections (list, optional): Sections to include. None for all sections.
+        title (str, optional): Report title.
+        include_timestamp (bool): Include the generation timestamp.
+        include_charts (bool): Include charts.
+        include_raw_data (bool): Include raw data dumps.
+        pdf_workers (int): Number of processes rendering the parts of a PDF report in parallel.
+                           0 renders the PDF in a single pass.
+        progress (callable, optional): Called as progress(stage, percent) between render stages.
+                                       May raise ExportCancelled to abort the render.
+        cancel_file (str, optional): Path of a file whose existence cancels the render. Also
+                                     checked within render stages, by the PDF part workers.
+
+    Returns:
+        list: The sections included in the report.
+    """
+    _report_progress(progress, 'Loading collection data', 10)
+    snapshot = SnapshotFile(collection_file)
+    keys = [key for key in snapshot if not sections or key in sections]
+
+    # Capacity analytics are derived from the nodes and metrics sections. JSON exports
+    # are the collected data, so they only include them when asked to.
+    with_capacity = (('capacity' in sections) if sections else format_type != 'json') and snapshot.has_data('nodes')
+
+    context = {
+        'title': title or "OpenShift Cluster Documentation",
+        'timestamp': datetime.datetime.now() if include_timestamp else None,
+        'include_charts': include_charts,
+        'include_raw_data': include_raw_data
+    }
+
+    # Render large PDF reports in parts, in parallel. The part workers load their sections themselves.
+    if format_type == 'pdf' and pdf_workers and PdfWriter is not None:
+        present = {key for key in keys if snapshot.has_data(key)} | ({'capacity'} if with_capacity else set())
+        part_count = sum(1 for _, _, part_keys in PDF_PARTS if present.intersection(part_keys))
+        if part_count > 1:
+            _report_progress(progress, 'Rendering report parts', 30)
+            _render_pdf_in_parts(collection_file, present, output_file, context, pdf_workers, progress, cancel_file)
+            return keys + (['capacity'] if with_capacity else [])
+
+    # Load the sections to include only
+    data = {key: snapshot[key] for key in keys}
+    if with_capacity:
+        _report_progress(progress, 'Computing capacity analytics', 20)
+        data['capacity'] = analyze_capacity(snapshot)
+
+    if format_type == 'json':
+        _report_progress(progress, 'Writing JSON export', 50)
+        with open(output_file, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+        return list(data.keys())
+
+    # Generate HTML report
+    _report_progress(progress, 'Rendering report', 30)
+    html = _render_html(REPORT_TEMPLATES[format_type], data=data, **context)
+
+    if format_type == 'pdf':
+        # Imported here so that HTML and JSON exports don't need WeasyPrint's native libraries
+        import weasyprint
+
+        _report_progress(progress, 'Generating PDF', 60)
+        _check_cancelled(cancel_file)
+        weasyprint.HTML(string=html).write_pdf(output_file)
+    else:
+        _report_progress(progress, 'Writing HTML report', 60)
+        with open(output_file, 'w') as f:
+            f.write(html)
+
+    return list(data.keys())
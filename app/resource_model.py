@@ -0,0 +1,140 @@
+"""
+Resource model module.
+Compact in-memory representation of the hot lists of a snapshot (pods, events,
+nodes, PVCs, usage samples and certificates), for the snapshots kept in memory
+(the list query index, the collector's current data).
+
+Each object is a Record: a read-only mapping holding its values in a tuple,
+with its keys in a shape shared by all the objects with the same keys, and
+short strings interned, so that the namespaces, labels, images, apiVersions
+and statuses repeated across tens of thousands of objects are stored once.
+Records behave like dicts for the templates and the list queries (get, items,
+[key]), and are converted to dicts only when encoded as JSON.
+"""
+
+import sys
+import logging
+from collections.abc import Mapping
+from flask.json.provider import DefaultJSONProvider
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Strings up to this length are interned (longer ones, e.g. messages, rarely repeat)
+INTERN_MAX_LENGTH = 128
+
+# Number of shapes kept for reuse (beyond it, new shapes are still created but not shared)
+MAX_SHAPES = 100000
+
+# Hot lists of a snapshot, as key paths ('*': every key, e.g. every namespace)
+HOT_LISTS = (
+    ('nodes', 'list'),
+    ('storage', 'pvc_summary_list'),
+    ('events', 'events_list'),
+    ('events', 'recent_events_list'),
+    ('events', 'warning_events_list'),
+    ('metrics', 'node_usage_list'),
+    ('metrics', 'pod_usage_list'),
+    ('security', 'cert_expiry_list'),
+    ('namespace_resources', '*', 'pods', 'items')
+)
+
+# Keys tuple -> Shape
+_shapes = {}
+
+class Shape:
+    """The keys of records, and the position of each key in their values."""
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {key: position for position, key in enumerate(keys)}
+
+def _get_shape(keys):
+    """Get the shared shape of records with these keys."""
+    shape = _shapes.get(keys)
+    if shape is None:
+        shape = Shape(keys)
+        if len(_shapes) < MAX_SHAPES:
+            _shapes[keys] = shape
+    return shape
+
+class Record(Mapping):
+    """A read-only, compact dict: values in a tuple, keys in a shared shape."""
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, key):
+        position = self._shape.index.get(key)
+        if position is None:
+            raise KeyError(key)
+        return self._values[position]
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._shape.index
+
+    def __repr__(self):
+        return f'Record({dict(self)!r})'
+
+    def to_dict(self):
+        """Get the record as a dict (nested records stay records)."""
+        return dict(zip(self._shape.keys, self._values))
+
+def compact(value):
+    """Get a compact copy of a JSON-like value: dicts as records, short strings interned."""
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+    if isinstance(value, Record):
+        return value
+    if isinstance(value, dict):
+        keys = tuple(sys.intern(key) if isinstance(key, str) else key for key in value)
+        return Record(_get_shape(keys), tuple(compact(item) for item in value.values()))
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+def _compact_path(value, path):
+    """Compact the lists at a key path of a value, in place."""
+    if not isinstance(value, dict) or not path:
+        return
+    key, rest = path[0], path[1:]
+    for name in (list(value) if key == '*' else [key] if key in value else []):
+        if rest:
+            _compact_path(value[name], rest)
+        elif isinstance(value[name], list):
+            # The list itself stays a list: only its items are compacted
+            value[name] = [compact(item) for item in value[name]]
+
+def compact_snapshot(data):
+    """Compact the hot lists of a snapshot, in place. Returns the snapshot."""
+    for path in HOT_LISTS:
+        _compact_path(data, path)
+    return data
+
+def json_default(value):
+    """JSON encoder default for snapshots with records (anything else is encoded as a string)."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that also encodes records."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+def init_app(app):
+    """Initialize the resource model with the Flask app: jsonify and tojson encode records."""
+    app.json = JSONProvider(app)
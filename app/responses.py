@@ -0,0 +1,160 @@
+"""
+Responses module.
+Builds the JSON responses of the API: streamed rather than serialized in one
+piece, compressed with the best encoding the client accepts (zstd, br or gzip),
+and answered with 304 Not Modified when the client already has the current
+version, checked before the payload is built, e.g. from the snapshot id of a
+snapshot-backed endpoint.
+
+Buffered JSON responses (jsonify) are compressed after the fact.
+"""
+
+import os
+import zlib
+import hashlib
+import datetime
+import itertools
+import logging
+from flask import current_app, request, Response, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: without it clients are sent zstd or gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional: without it clients are sent br or gzip
+    zstandard = None
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this many bytes aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Content encodings, preferred first when the client accepts several equally
+ENCODINGS = ('zstd', 'br', 'gzip')
+
+def init_app(app):
+    """Initialize the response layer with the Flask app."""
+    app.after_request(_compress_response)
+
+def get_encodings():
+    """Get the content encodings available in this process, preferred first."""
+    available = {'zstd': zstandard is not None, 'br': brotli is not None, 'gzip': True}
+    return [encoding for encoding in ENCODINGS if available[encoding]]
+
+def negotiate_encoding():
+    """Get the content encoding to compress the current response with, or None."""
+    return request.accept_encodings.best_match(get_encodings())
+
+def _compressor(encoding):
+    """Get (compress, flush) functions of a streaming compressor."""
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        return compressor.compress, compressor.flush
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip container
+    return compressor.compress, compressor.flush
+
+def iter_compressed(chunks, encoding='gzip'):
+    """Compress a stream of chunks with a content encoding."""
+    compress, flush = _compressor(encoding)
+    for chunk in chunks:
+        compressed = compress(chunk)
+        if compressed:
+            yield compressed
+    yield flush()
+
+def make_etag(key):
+    """Get the ETag of the current request's response for a version key (e.g. a snapshot id)."""
+    digest = hashlib.sha1(request.full_path.encode()).hexdigest()[:12]
+    return f'{key}:{digest}'
+
+def set_validators(response, etag=None, last_modified=None):
+    """Set the validators of a response, and make clients revalidate before reusing it."""
+    if etag:
+        # Weak: the same version has a different body per content encoding
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    if etag or last_modified:
+        response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+
+def not_modified(etag=None, last_modified=None):
+    """
+    Get a 304 response if the client already has this version of the response, else None.
+
+    Args:
+        etag (str, optional): ETag of the current version (see make_etag).
+        last_modified (datetime, optional): Time the current version was created.
+    """
+    if etag and request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif last_modified and request.if_modified_since:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    response = Response(status=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+def json_response(data, etag=None, last_modified=None, status=200):
+    """
+    Stream data as JSON, compressed with the negotiated encoding.
+
+    Args:
+        data: JSON-serializable data (datetimes are encoded like jsonify does).
+        etag (str, optional): ETag of this version (see make_etag).
+        last_modified (datetime, optional): Time this version was created.
+        status (int): HTTP status.
+    """
+    from app.export import _iter_json_chunks
+    chunks = _iter_json_chunks(data, default=current_app.json.default)
+    first = next(chunks, b'')
+    second = next(chunks, None)
+    encoding = negotiate_encoding()
+
+    if second is None:
+        # Fits in one chunk: send it in one piece, with a Content-Length
+        if encoding and len(first) >= MIN_COMPRESS_SIZE:
+            first = b''.join(iter_compressed([first], encoding))
+        else:
+            encoding = None
+        response = Response(first, status=status, mimetype='application/json')
+    else:
+        body = itertools.chain([first, second], chunks)
+        if encoding:
+            body = iter_compressed(body, encoding)
+        response = Response(stream_with_context(body), status=status, mimetype='application/json')
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    set_validators(response, etag, last_modified)
+    return response
+
+def _compress_response(response):
+    """Compress a buffered JSON response, if the client accepts a content encoding and it is large enough."""
+    if (response.mimetype != 'application/json' or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code < 200 or response.status_code == 204):
+        return response
+    body = response.get_data()
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        response.set_data(b''.join(iter_compressed([body], encoding)))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def file_last_modified(path):
+    """Get the modification time of a file as a UTC datetime, or None."""
+    try:
+        return datetime.datetime.fromtimestamp(int(os.path.getmtime(path)), datetime.timezone.utc)
+    except (OSError, TypeError):
+        return None
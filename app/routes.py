@@ -1,11 +1,17 @@
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, current_app
+import os
+import re
+import time
+import datetime
+import threading
+from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, current_app, abort
 from app.collector.openshift_collector import (
     get_cluster_info, get_nodes_info, get_basic_info, get_nodes_detailed,
-    get_operators_info, get_etcd_info, get_namespaces_list, get_resources_for_namespace,
+    get_operators_info, get_etcd_info, get_namespaces_list,
     get_cluster_resources, get_network_info, get_storage_info, get_security_info,
     get_metrics_info, get_events_info
 )
-from app.export import _get_latest_collection_data
+from app.export import _get_latest_collection_file, _get_snapshot_id
+from app import clusters, event_store, list_query, responses, page_cache, scheduler
 from app.auth import load_auth_config, save_auth_config, test_connection, create_kubeconfig
 
 # Create a Blueprint for the main routes
@@ -18,71 +24,125 @@ def index():
 
 @main_bp.route('/cluster')
 def cluster_overview():
-    data = _get_latest_collection_data() or {}
-    cluster = data.get('cluster', {})
-    return render_template('pages/cluster_overview.html', title='Cluster Overview', cluster=cluster)
+    return page_cache.serve_page('cluster')
 
 @main_bp.route('/operators')
 def operators_view():
-    data = _get_latest_collection_data() or {}
-    operators = data.get('operators', {})
-    return render_template('pages/operators.html', title='Operators', operators=operators)
+    return page_cache.serve_page('operators')
 
 @main_bp.route('/etcd')
 def etcd_view():
-    data = _get_latest_collection_data() or {}
-    etcd = data.get('etcd', {})
-    return render_template('pages/etcd.html', title='ETCD', etcd=etcd)
+    return page_cache.serve_page('etcd')
 
 @main_bp.route('/nodes')
 def nodes_view():
-    data = _get_latest_collection_data() or {}
-    nodes = data.get('nodes', {})
-    return render_template('pages/nodes.html', title='Nodes', nodes=nodes)
+    return page_cache.serve_page('nodes')
 
 @main_bp.route('/namespaces')
 def namespaces_view():
-    data = _get_latest_collection_data() or {}
-    namespaces = data.get('namespaces', [])
-    return render_template('pages/namespaces.html', title='Namespaces', namespaces=namespaces)
+    return page_cache.serve_page('namespaces')
+
+# Fields of the resources listed on the namespace detail page (the API serves the full items)
+NAMESPACE_DETAIL_FIELDS = ['metadata.name', 'metadata.creationTimestamp', 'status.phase']
+
+# Namespace names are DNS labels
+NAMESPACE_PATTERN = re.compile(r'^[a-z0-9]([-a-z0-9]{0,61}[a-z0-9])?$')
+
+# (cluster, namespace) -> time the refresh of a namespace missing from the snapshot was last requested
+_missing_namespace_refreshes = {}
+_missing_namespace_refreshes_lock = threading.Lock()
+
+def _request_missing_namespace_refresh(namespace, cluster):
+    """Request the refresh of a namespace missing from the snapshot, at most once per NAMESPACE_MISS_REFRESH_INTERVAL."""
+    interval = current_app.config.get('NAMESPACE_MISS_REFRESH_INTERVAL', 60)
+    now = time.monotonic()
+    with _missing_namespace_refreshes_lock:
+        requested = _missing_namespace_refreshes.get((cluster, namespace))
+        if requested is not None and now - requested < interval:
+            return
+        _missing_namespace_refreshes[(cluster, namespace)] = now
+    scheduler.request_namespace_refresh(namespace, cluster)
+
+def _get_collected_namespace(namespace):
+    """
+    Get the resources of a namespace of the current cluster from the latest snapshot,
+    with the time they were collected. Namespaces of the latest namespace list that
+    weren't collected yet are refreshed in the background, and (None, None) is returned.
+
+    Raises:
+        LookupError: If the namespace isn't in the latest namespace list.
+    """
+    cluster = clusters.get_current_cluster()
+    _, namespace_resources = list_query.get_latest_section(cluster, 'namespace_resources')
+    ns_data = (namespace_resources or {}).get(namespace)
+    if ns_data is None:
+        # Only namespaces known to exist are collected: a request can't queue oc commands for any name
+        _, namespaces = list_query.get_latest_section(cluster, 'namespaces')
+        if namespace not in (namespaces or []):
+            raise LookupError(f"Namespace {namespace} not found in the latest namespace list")
+        _request_missing_namespace_refresh(namespace, cluster)
+        return None, None
+    try:
+        collected_at = datetime.datetime.fromisoformat(ns_data['collected_at'])
+    except (KeyError, TypeError, ValueError):
+        # Collected before the collection time was recorded: as old as the snapshot
+        collected_at = datetime.datetime.fromtimestamp(os.path.getmtime(_get_latest_collection_file(cluster)))
+    return ns_data, collected_at
+
+def _format_age(collected_at):
+    """Format the age of data collected at a time, e.g. '5 minutes'."""
+    seconds = max(0, int((datetime.datetime.now() - collected_at).total_seconds()))
+    for unit, unit_seconds in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= unit_seconds:
+            count = seconds // unit_seconds
+            return f"{count} {unit}{'s' if count > 1 else ''}"
+    return f"{seconds} seconds"
 
 @main_bp.route('/namespace/<namespace>')
 def namespace_detail(namespace):
-    from app.collector.openshift_collector import get_resources_for_namespace
-    from flask import current_app
-    kubeconfig = current_app.config.get('KUBECONFIG_PATH')
-    ns_data = get_resources_for_namespace(namespace, kubeconfig)
-    return render_template('pages/namespace_detail.html', title=f'Namespace: {namespace}', namespace=namespace, ns_data=ns_data)
+    if not NAMESPACE_PATTERN.match(namespace):
+        abort(404)
+    try:
+        ns_data, collected_at = _get_collected_namespace(namespace)
+    except LookupError:
+        abort(404)
+    resources, errors = {}, {}
+    for resource, value in sorted((ns_data or {}).items()):
+        if not isinstance(value, dict):
+            continue
+        if value.get('error'):
+            errors[resource] = value['error']
+        elif isinstance(value.get('items'), list):
+            resources[resource] = [list_query.select_fields(item, NAMESPACE_DETAIL_FIELDS) for item in value['items']]
+    return render_template(
+        'pages/namespace_detail.html', title=f'Namespace: {namespace}', namespace=namespace,
+        resources=resources, errors=errors, events=_get_namespace_events(namespace), collected=ns_data is not None,
+        collected_at=collected_at, age=_format_age(collected_at) if collected_at else None
+    )
+
+def _get_namespace_events(namespace, limit=50):
+    """Get the latest events of a namespace of the current cluster from the event store."""
+    return event_store.query_events(clusters.get_current_cluster(), namespace=namespace, limit=limit)['events']
 
 @main_bp.route('/storage')
 def storage_view():
-    data = _get_latest_collection_data() or {}
-    storage = data.get('storage', {})
-    return render_template('pages/storage.html', title='Storage', storage=storage)
+    return page_cache.serve_page('storage')
 
 @main_bp.route('/network')
 def network_view():
-    data = _get_latest_collection_data() or {}
-    network = data.get('network', {})
-    return render_template('pages/network.html', title='Network', network=network)
+    return page_cache.serve_page('network')
 
 @main_bp.route('/security')
 def security_view():
-    data = _get_latest_collection_data() or {}
-    security = data.get('security', {})
-    return render_template('pages/security.html', title='Security', security=security)
+    return page_cache.serve_page('security')
 
 @main_bp.route('/metrics')
 def metrics_view():
-    data = _get_latest_collection_data() or {}
-    metrics = data.get('metrics', {})
-    return render_template('pages/metrics.html', title='Metrics', metrics=metrics)
+    return page_cache.serve_page('metrics')
 
 @main_bp.route('/events')
 def events_view():
-    data = _get_latest_collection_data() or {}
-    events = data.get('events', {})
-    return render_template('pages/events.html', title='Events', events=events)
+    return page_cache.serve_page('events')
 
 @main_bp.route('/collection-status')
 def collection_status():
@@ -168,33 +228,78 @@ def nodes_info():
 
 # --- New API endpoints for enhanced data collection ---
 
+def _get_live_target():
+    """
+    Get the kubeconfig and the cluster name the live collectors of a request run with.
+    The cluster name (None for an explicit kubeconfig parameter) keys the rate limiter.
+    """
+    if request.args.get('kubeconfig'):
+        return request.args.get('kubeconfig'), None
+    cluster = clusters.get_current_cluster()
+    return clusters.get_kubeconfig(cluster), cluster
+
+def _list_response(path, fallback):
+    """
+    Respond to a list query (fields, filter, sort, limit and cursor parameters) with a page
+    of a list of the latest snapshot; fallback collects the list when the snapshot lacks it.
+    Pages of a snapshot are answered with 304 Not Modified until a new snapshot lands.
+    """
+    try:
+        collection_file = _get_latest_collection_file(clusters.get_current_cluster())
+        snapshot_id = _get_snapshot_id(collection_file)
+        etag = responses.make_etag(snapshot_id) if snapshot_id else None
+        last_modified = responses.file_last_modified(collection_file)
+        cached = responses.not_modified(etag, last_modified)
+        if cached:
+            return cached
+        data = list_query.query_snapshot_list(clusters.get_current_cluster(), path, request.args, fallback)
+        data = dict(data, success=True, list=path[-1] if path[-1] != 'items' else path[-2])
+        if not data['snapshot_id']:
+            # Collected live: nothing to validate against
+            etag = last_modified = None
+        return responses.json_response(data, etag, last_modified)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @main_bp.route('/api/v2/cluster')
 def basic_info():
     """API endpoint to get enhanced cluster information."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_basic_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        data = get_basic_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/nodes')
 def nodes_detailed():
-    """API endpoint to get detailed information about cluster nodes."""
+    """API endpoint to get detailed information about cluster nodes. List queries page the nodes list."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_nodes_detailed(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        if list_query.is_list_request(request.args):
+            return _list_response(('nodes', 'list'), lambda: {'nodes': get_nodes_detailed(kubeconfig, cluster=cluster)})
+        data = get_nodes_detailed(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/operators')
 def operators_info():
-    """API endpoint to get information about cluster operators."""
+    """
+    API endpoint to get information about cluster operators. List queries page one of
+    clusteroperators_list (by default), csv_list and subscriptions_list (?list=).
+    """
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_operators_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        if list_query.is_list_request(request.args):
+            list_name = request.args.get('list', 'clusteroperators_list')
+            return _list_response(('operators', list_name), lambda: {'operators': get_operators_info(kubeconfig, cluster=cluster)})
+        data = get_operators_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -202,39 +307,79 @@ def operators_info():
 def etcd_info():
     """API endpoint to get information about etcd."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_etcd_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        data = get_etcd_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/namespaces')
 def namespaces_list():
-    """API endpoint to get a list of namespaces."""
+    """API endpoint to get a list of namespaces. List query items are {'NAME': namespace}."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_namespaces_list(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        if list_query.is_list_request(request.args):
+            return _list_response(('namespaces',), lambda: {'namespaces': get_namespaces_list(kubeconfig, cluster=cluster)})
+        data = get_namespaces_list(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/namespace/<namespace>')
 def namespace_resources(namespace):
-    """API endpoint to get resources for a specific namespace."""
+    """
+    API endpoint to get resources for a specific namespace, as of the latest snapshot
+    (with the time they were collected and their age in seconds). List queries page the
+    items of one resource, pods by default (?list=deployments).
+    Namespaces that weren't collected yet are collected in the background (202 Accepted).
+    """
+    if not NAMESPACE_PATTERN.match(namespace):
+        return jsonify({'success': False, 'error': f'Invalid namespace: {namespace}'}), 400
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_resources_for_namespace(namespace, kubeconfig)
-        return jsonify(data)
+        ns_data, collected_at = _get_collected_namespace(namespace)
+        if ns_data is None:
+            return jsonify({
+                'success': False,
+                'refreshing': True,
+                'error': f'Namespace {namespace} not collected yet: its collection was requested'
+            }), 202
+        if list_query.is_list_request(request.args):
+            return _list_response(('namespace_resources', namespace, request.args.get('list', 'pods'), 'items'), None)
+        data = dict(
+            ns_data, events=_get_namespace_events(namespace), collected_at=collected_at.isoformat(),
+            age_seconds=int((datetime.datetime.now() - collected_at).total_seconds())
+        )
+        return responses.json_response(data)
+    except LookupError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@main_bp.route('/api/v2/namespace/<namespace>/refresh', methods=['POST'])
+def refresh_namespace(namespace):
+    """API endpoint to collect the resources of a namespace again, in the background (concurrent requests share one refresh)."""
+    if not NAMESPACE_PATTERN.match(namespace):
+        return jsonify({'success': False, 'error': f'Invalid namespace: {namespace}'}), 400
+    started = scheduler.request_namespace_refresh(namespace, clusters.get_current_cluster())
+    return jsonify({
+        'success': True,
+        'message': f'Refresh of namespace {namespace} requested' if started else f'Namespace {namespace} is already being refreshed'
+    }), 202
+
 @main_bp.route('/api/v2/cluster-resources')
 def cluster_resources():
-    """API endpoint to get cluster-scoped resources."""
+    """API endpoint to get cluster-scoped resources. List queries page the items of one resource (?list=clusterroles)."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_cluster_resources(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        if list_query.is_list_request(request.args):
+            if not request.args.get('list'):
+                return jsonify({'success': False, 'error': 'Missing list parameter, e.g. list=clusterroles'}), 400
+            return _list_response(
+                ('cluster_resources', request.args['list'], 'items'),
+                lambda: {'cluster_resources': get_cluster_resources(kubeconfig, cluster=cluster)}
+            )
+        data = get_cluster_resources(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -242,9 +387,9 @@ def cluster_resources():
 def network_info():
     """API endpoint to get network information."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_network_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        data = get_network_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -252,19 +397,21 @@ def network_info():
 def storage_info():
     """API endpoint to get storage information."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_storage_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        data = get_storage_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/security')
 def security_info():
-    """API endpoint to get security information."""
+    """API endpoint to get security information. List queries page the certificate expiry list."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_security_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        if list_query.is_list_request(request.args):
+            return _list_response(('security', 'cert_expiry_list'), lambda: {'security': get_security_info(kubeconfig, cluster=cluster)})
+        data = get_security_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -272,19 +419,43 @@ def security_info():
 def metrics_info():
     """API endpoint to get metrics information."""
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        data = get_metrics_info(kubeconfig)
-        return jsonify(data)
+        kubeconfig, cluster = _get_live_target()
+        data = get_metrics_info(kubeconfig, cluster=cluster)
+        return responses.json_response(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/api/v2/events')
 def events_info():
-    """API endpoint to get events information."""
+    """
+    API endpoint to get a page of events from the event store, newest first, e.g.
+    ?namespace=x&kind=Pod&name=y&reason=BackOff&type=Warning&hours=24&limit=50&cursor=<next_cursor>.
+    """
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            event_store.parse_cursor(cursor)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+    
     try:
-        kubeconfig = request.args.get('kubeconfig')
-        limit = request.args.get('limit', 100, type=int)
-        data = get_events_info(kubeconfig, limit)
-        return jsonify(data)
+        cluster = clusters.get_current_cluster()
+        if not event_store.has_events(cluster):
+            # Nothing collected for this cluster yet: fetch its events once
+            events = get_events_info(clusters.get_kubeconfig(cluster), cluster=cluster)
+            event_store.ingest(cluster, events['events_list'])
+        hours = request.args.get('hours', type=int)
+        data = event_store.query_events(
+            cluster,
+            namespace=request.args.get('namespace'),
+            kind=request.args.get('kind'),
+            name=request.args.get('name'),
+            reason=request.args.get('reason'),
+            event_type=request.args.get('type'),
+            since=int(time.time()) - hours * 3600 if hours else None,
+            limit=request.args.get('limit', event_store.DEFAULT_PAGE_SIZE, type=int),
+            cursor=cursor
+        )
+        return jsonify(dict(data, success=True, cluster=cluster))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,14 +1,24 @@
 """
 Scheduler module for handling background data collection tasks.
+Collects every registered cluster (see app/clusters.py), with at most
+COLLECTION_CONCURRENCY clusters collected at the same time.
 """
 
 import logging
 import time
 import datetime
 import os
+import re
 import json
+import hashlib
+import threading
+import tempfile
+import fcntl
+from collections.abc import Mapping
 from flask import current_app
 from flask_apscheduler import APScheduler
+from app import staging, clusters, fleet_index, metrics_store, event_store, responses, live_updates, page_cache, resource_model, snapshot_file
+from app.collector import rate_limit
 from app.collector.openshift_collector import (
     get_basic_info, get_nodes_detailed, get_operators_info, get_etcd_info,
     get_namespaces_list, get_resources_for_namespace, get_cluster_resources,
@@ -27,10 +37,90 @@ collection_history = []
 collection_stats = {
     'total': 0,
     'successful': 0,
+    'partial': 0,
     'failed': 0,
     'avg_duration': 0
 }
 
+# Whether this process runs the collection scheduler. When it doesn't, a
+# dedicated collector worker (see app/worker.py) does, and this process only
+# reads the collection history and forwards requests to the worker.
+collector_process = False
+
+# File the web workers use to forward requests to the collector worker
+WORKER_REQUESTS_FILE = 'collector_requests.json'
+
+# Sections of a collection, in collection order, with their default refresh interval in seconds
+# when sections are collected on their own schedules (None follows the collection interval)
+DEFAULT_SECTION_INTERVALS = {
+    'basic_info': 900,
+    'nodes': 300,
+    'operators': 300,
+    'etcd': 300,
+    'network': 1800,
+    'storage': 1800,
+    'security': None,
+    'metrics': 60,
+    'events': 60,
+    'cluster_resources': None,
+    'namespaces': None
+}
+
+# Time-series sections: each refresh is recorded to the metrics and event stores, and kept in memory
+# until the next snapshot, rather than writing a snapshot every minute
+TIME_SERIES_SECTIONS = ('metrics', 'events')
+
+# Fields of a section that change at every check while the section itself doesn't (check times, latencies,
+# raft progress, ages), left out of its digest so that they alone don't publish a snapshot
+VOLATILE_FIELDS = {
+    'etcd': {'checked_at', 'TOOK', 'RAFT_TERM', 'RAFT_INDEX', 'RAFT_APPLIED_INDEX', 'raft_index_spread'},
+    'nodes': {'AGE', 'list_raw'}
+}
+
+# Volatile parts of the text of a section (the lease renewal and condition heartbeat times of node descriptions)
+VOLATILE_TEXT = {
+    'nodes': (
+        re.compile(r'^\s*RenewTime:.*$', re.MULTILINE),
+        re.compile(r'^(\s+\w+\s+(?:True|False|Unknown)\s+)\w{3}, \d{2} \w{3} \d{4} \d{2}:\d{2}:\d{2} [-+]\d{4}', re.MULTILINE)
+    )
+}
+
+# Upper bound of the adaptive back-off of an unchanged section, as a multiple of its interval
+ADAPTIVE_MAX_FACTOR = 4
+
+# Refresh schedule and state of each section of each cluster (cluster -> section -> dict)
+section_schedule = {}
+
+# Collection state of each cluster (cluster -> dict with status and last_collection)
+cluster_status = {}
+
+# Clusters the collection jobs are scheduled for
+scheduled_clusters = []
+
+# Rate limit and retry stats of the collector process's clusters, as last saved by it
+collector_client_stats = {}
+
+# Latest collection data of each cluster, kept in memory by the collector process to merge section refreshes into
+current_data = {}
+
+# Time-series sections of each cluster that changed since its last snapshot (cluster -> set), published with the next one
+unpublished_sections = {}
+
+# Serializes the collection runs of each cluster, so that section refreshes never interleave (cluster -> Lock)
+cluster_locks = {}
+_cluster_locks_lock = threading.Lock()
+
+# Namespaces being refreshed on request, as (cluster, namespace) pairs: concurrent requests share one refresh
+namespace_refreshes = set()
+_namespace_refreshes_lock = threading.Lock()
+
+# Serializes the updates of the collection history and stats, and their saving, across collection threads
+_history_lock = threading.Lock()
+
+# Bounds the number of clusters collected at the same time (COLLECTION_CONCURRENCY, set when the scheduler starts).
+# Taken after the cluster's lock, so that a run waiting for another run of its cluster doesn't hold a slot.
+collection_slots = threading.BoundedSemaphore(4)
+
 # Collection status
 collection_status = {
     'status': 'idle',
@@ -40,41 +130,174 @@ collection_status = {
     'schedule': 'Every hour'
 }
 
-def init_app(app):
-    """Initialize the scheduler with the Flask app."""
-    scheduler.init_app(app)
-    scheduler.start()
-    
+def init_app(app, start_scheduler=None):
+    """
+    Initialize the scheduler with the Flask app.
+
+    Args:
+        app (Flask): The Flask app.
+        start_scheduler (bool, optional): Whether to run the collection scheduler in this process.
+                                          Defaults to the ENABLE_EMBEDDED_SCHEDULER setting.
+    """
     # Load collection history if exists
     _load_collection_history()
     
-    # Schedule the collection job
-    _schedule_collection_job()
+    if start_scheduler is None:
+        start_scheduler = app.config.get('ENABLE_EMBEDDED_SCHEDULER', True)
+    if start_scheduler:
+        start_collection_scheduler(app)
     
     # Register API endpoints
     _register_api_endpoints(app)
 
+def start_collection_scheduler(app):
+    """Start the collection scheduler in this process and schedule the collection job."""
+    global collector_process, collection_slots
+    
+    # One scheduler per process: it stays bound to the first app and runs
+    # the collection jobs against that app for the lifetime of the process
+    if not scheduler.running:
+        collection_slots = threading.BoundedSemaphore(app.config.get('COLLECTION_CONCURRENCY', 4))
+        scheduler.init_app(app)
+        scheduler.start()
+    collector_process = True
+    
+    # Schedule the collection job
+    _schedule_collection_job()
+    
+    # Index the snapshots saved before the fleet index existed, without delaying the first collections
+    threading.Thread(target=_backfill_fleet_index, args=[app], daemon=True).start()
+    
+    # Resume the collection runs interrupted by the previous shutdown, if any
+    for cluster in clusters.get_cluster_names():
+        if staging.get_unfinished_run(cluster):
+            logger.info(f"Found an interrupted collection run of cluster {cluster}, resuming it")
+            _start_collection_thread(cluster)
+
+def _start_collection_thread(cluster):
+    """Run a full collection of a cluster in a separate thread."""
+    from threading import Thread
+    thread = Thread(target=collect_data, args=[cluster])
+    thread.daemon = True
+    thread.start()
+
+def _get_cluster_lock(cluster):
+    """Get the lock serializing the collection runs of a cluster."""
+    with _cluster_locks_lock:
+        return cluster_locks.setdefault(cluster, threading.Lock())
+
+def _get_first_run_offset(index, count, interval):
+    """Spread the first runs of the clusters' jobs over their interval, so that they don't all start at once."""
+    return datetime.timedelta(seconds=interval * (1 + index / max(count, 1)))
+
+def _remove_collection_jobs():
+    """Remove all the collection jobs."""
+    for job in scheduler.get_jobs():
+        if job.id.startswith('collect_'):
+            scheduler.remove_job(job.id)
+
+def on_clusters_changed():
+    """Reschedule the collection jobs after clusters were registered or unregistered."""
+    if collector_process:
+        _schedule_collection_job()
+        _save_collection_history()
+    else:
+        # The collector worker owns the schedule: ask it to reschedule
+        _submit_worker_request(reschedule=True)
+
 def _schedule_collection_job():
-    """Schedule the collection job based on the configured interval."""
-    # Remove existing job if it exists
-    if scheduler.get_job('collect_data'):
-        scheduler.remove_job('collect_data')
+    """Schedule the collection jobs of every cluster based on the configured interval."""
+    global scheduled_clusters
+    
+    # Remove existing jobs
+    _remove_collection_jobs()
+    scheduled_clusters = clusters.get_cluster_names()
+    for cluster in list(section_schedule):
+        if cluster not in scheduled_clusters:
+            del section_schedule[cluster]
+    
+    # Stream the events of the clusters between collections
+    if current_app.config.get('EVENT_WATCH', True):
+        event_store.start_watchers(scheduler.app)
     
-    # Schedule new job
+    if current_app.config.get('SECTION_SCHEDULING', True):
+        _schedule_section_jobs()
+        return
+    
+    # Schedule new jobs, one per cluster
     interval = collection_status['interval']
+    now = datetime.datetime.now()
+    for index, cluster in enumerate(scheduled_clusters):
+        scheduler.add_job(
+            id=f'collect_data:{cluster}',
+            func=collect_data,
+            args=[cluster],
+            trigger='interval',
+            seconds=interval,
+            next_run_time=now + _get_first_run_offset(index, len(scheduled_clusters), interval)
+        )
+    
+    # Update next collection time
+    collection_status['next_collection'] = now + datetime.timedelta(seconds=interval)
+    collection_status['schedule'] = f'Every {_format_interval(interval)}'
+    
+    logger.info(f"Scheduled collection jobs of {len(scheduled_clusters)} clusters to run every {_format_interval(interval)}")
+
+def _get_section_interval(section):
+    """Get the refresh interval of a section: its configured interval, or the collection interval."""
+    interval = current_app.config.get('SECTION_INTERVALS', {}).get(section, DEFAULT_SECTION_INTERVALS[section])
+    return interval or collection_status['interval']
+
+def _get_section_run_interval(section, interval):
+    """Get the interval between the runs of a section job (namespaces are sharded over their interval)."""
+    if section == 'namespaces':
+        return max(60, interval // max(1, current_app.config.get('NAMESPACE_SHARDS', 12)))
+    return interval
+
+def _schedule_section_job(cluster, section, first_run=None):
+    """(Re)schedule the refresh job of a section of a cluster at its effective interval."""
+    job_id = f'collect_{section}:{cluster}'
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
+    
+    run_interval = _get_section_run_interval(section, section_schedule[cluster][section]['effective_interval'])
+    next_run = datetime.datetime.now() + (first_run or datetime.timedelta(seconds=run_interval))
     scheduler.add_job(
-        id='collect_data',
-        func=collect_data,
+        id=job_id,
+        func=collect_section,
+        args=[section, cluster],
         trigger='interval',
-        seconds=interval,
-        next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=interval)
+        seconds=run_interval,
+        next_run_time=next_run,
+        coalesce=True
     )
+    section_schedule[cluster][section]['next_run'] = next_run
+
+def _schedule_section_jobs():
+    """Schedule a refresh job for each section of each cluster, in place of the full collection jobs."""
+    for index, cluster in enumerate(scheduled_clusters):
+        cluster_schedule = section_schedule.setdefault(cluster, {})
+        for section in DEFAULT_SECTION_INTERVALS:
+            state = cluster_schedule.setdefault(section, {})
+            state['interval'] = _get_section_interval(section)
+            state['effective_interval'] = state['interval']
+            run_interval = _get_section_run_interval(section, state['interval'])
+            _schedule_section_job(cluster, section, _get_first_run_offset(index, len(scheduled_clusters), run_interval))
     
-    # Update next collection time
-    collection_status['next_collection'] = datetime.datetime.now() + datetime.timedelta(seconds=interval)
-    collection_status['schedule'] = f'Every {_format_interval(interval)}'
+    _update_next_collection()
+    collection_status['schedule'] = f'Per section (slowest every {_format_interval(collection_status["interval"])})'
     
-    logger.info(f"Scheduled collection job to run every {_format_interval(interval)}")
+    logger.info(f"Scheduled section collection jobs of {len(scheduled_clusters)} clusters: " + ", ".join(
+        f"{section} every {_format_interval(_get_section_interval(section))}" for section in DEFAULT_SECTION_INTERVALS
+    ))
+
+def _update_next_collection():
+    """Set the next collection time to the next run of any section job."""
+    next_runs = [
+        state['next_run'] for cluster_schedule in section_schedule.values()
+        for state in cluster_schedule.values() if state.get('next_run')
+    ]
+    collection_status['next_collection'] = min(next_runs) if next_runs else None
 
 def _format_interval(seconds):
     """Format interval in seconds to a human-readable string."""
@@ -87,8 +310,14 @@ def _format_interval(seconds):
     else:
         return f"{seconds // 86400} days"
 
-def _load_collection_history():
-    """Load collection history from file."""
+def _load_collection_history(include_runtime_status=False):
+    """
+    Load collection history from file.
+
+    Args:
+        include_runtime_status (bool): Also load the current status and next collection time,
+                                       as written by the collector worker.
+    """
     history_file = os.path.join(current_app.instance_path, 'collection_history.json')
     if os.path.exists(history_file):
         try:
@@ -106,6 +335,15 @@ def _load_collection_history():
                     collection_status['schedule'] = status_data['schedule']
                 if 'last_collection' in status_data:
                     collection_status['last_collection'] = status_data['last_collection']
+                if include_runtime_status:
+                    collection_status['status'] = status_data.get('status', 'idle')
+                    collection_status['next_collection'] = status_data.get('next_collection')
+                    section_schedule.clear()
+                    section_schedule.update(data.get('sections', {}))
+                    cluster_status.clear()
+                    cluster_status.update(data.get('clusters', {}))
+                    collector_client_stats.clear()
+                    collector_client_stats.update(data.get('clients', {}))
                 
                 logger.info(f"Loaded collection history: {len(collection_history)} entries")
         except Exception as e:
@@ -118,118 +356,549 @@ def _save_collection_history():
         # Ensure instance directory exists
         os.makedirs(os.path.dirname(history_file), exist_ok=True)
         
-        with open(history_file, 'w') as f:
-            json.dump({
-                'history': collection_history,
-                'stats': collection_stats,
-                'status': collection_status
-            }, f, indent=2, default=str)
+        # Write atomically, as web workers read this file while the collector worker writes it
+        with _history_lock:
+            fd, tmp_file = tempfile.mkstemp(prefix='collection_history.', suffix='.tmp', dir=os.path.dirname(history_file))
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'history': collection_history,
+                    'stats': collection_stats,
+                    'status': collection_status,
+                    'sections': section_schedule,
+                    'clusters': cluster_status,
+                    'clients': rate_limit.get_stats()
+                }, f, indent=2, default=str)
+            os.replace(tmp_file, history_file)
         
         logger.info(f"Saved collection history: {len(collection_history)} entries")
     except Exception as e:
         logger.error(f"Error saving collection history: {e}")
 
-def collect_data():
-    """Collect data from the OpenShift cluster."""
-    from app import create_app  # Import here to avoid circular imports
-    app = create_app()
+def _get_section_collectors():
+    """Get the collector function of each section (other than namespaces), in collection order."""
+    return {
+        'basic_info': get_basic_info,
+        'nodes': get_nodes_detailed,
+        'operators': get_operators_info,
+        'etcd': get_etcd_info,
+        'network': get_network_info,
+        'storage': get_storage_info,
+        'security': get_security_info,
+        'metrics': get_metrics_info,
+        'events': get_events_info,
+        'cluster_resources': get_cluster_resources
+    }
+
+def _get_current_data(cluster):
+    """Get the latest collection data of a cluster, loading it from its latest collection file on first use."""
+    if cluster not in current_data:
+        from app.export import _get_latest_collection_data
+        current_data[cluster] = resource_model.compact_snapshot(_get_latest_collection_data(cluster) or {})
+    return current_data[cluster]
+
+def _without_volatile(value, fields, patterns):
+    """Get the data of a section without its volatile fields and text (see VOLATILE_FIELDS and VOLATILE_TEXT)."""
+    if isinstance(value, Mapping):
+        return {key: _without_volatile(item, fields, patterns) for key, item in value.items() if key not in fields}
+    if isinstance(value, (list, tuple)):
+        return [_without_volatile(item, fields, patterns) for item in value]
+    if isinstance(value, str):
+        for pattern in patterns:
+            value = pattern.sub(lambda match: match.group(1) if match.groups() else '', value)
+    return value
+
+def _section_digest(value, section=None):
+    """Digest of the data of a section, to tell whether it changed since the previous run (volatile fields aside)."""
+    if section in VOLATILE_FIELDS or section in VOLATILE_TEXT:
+        value = _without_volatile(value, VOLATILE_FIELDS.get(section, ()), VOLATILE_TEXT.get(section, ()))
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=resource_model.json_default).encode()).hexdigest()
+
+def _publish_collected_data(data, cluster, sections=None):
+    """
+    Save a new collection snapshot of a cluster and make it the cluster's current data.
+
+    Args:
+        data (dict): Collection data.
+        cluster (str): Cluster name.
+        sections (list, optional): Sections that changed since the previous snapshot (None: all of them).
+                                   The time-series sections changed since then are added to them.
+    """
+    from app.export import invalidate_report_cache, _get_snapshot_id, _get_latest_collection_file
+    carried = unpublished_sections.pop(cluster, set())
+    if sections is not None:
+        sections = list(sections) + sorted(carried - set(sections))
+    previous_snapshot_id = _get_snapshot_id(_get_latest_collection_file(cluster))
+    data_file = _save_collected_data(data, cluster)
+    # Kept in memory until the next snapshot: keep its hot lists compact
+    current_data[cluster] = resource_model.compact_snapshot(data)
+    if data_file:
+        # Reports rendered for the previous snapshot are now stale
+        invalidate_report_cache(previous_snapshot_id)
+        snapshot_id = _get_snapshot_id(data_file)
+        _index_snapshot(snapshot_id, cluster, data)
+        _prerender_pages(snapshot_id, cluster, data, sections, previous_snapshot_id)
+        live_updates.publish('snapshot', cluster, snapshot_id=snapshot_id, sections=sections or list(data))
+
+def _index_snapshot(snapshot_id, cluster, data):
+    """Add the aggregates of a new snapshot to the fleet index. Indexing errors don't fail the collection."""
+    try:
+        fleet_index.index_snapshot(snapshot_id, cluster, data)
+        fleet_index.prune_index(current_app.config.get('FLEET_INDEX_RETENTION_DAYS', 30))
+    except Exception as e:
+        logger.error(f"Error indexing snapshot {snapshot_id}: {e}")
+
+def _prerender_pages(snapshot_id, cluster, data, sections, previous_snapshot_id):
+    """Render the pages of a new snapshot ahead of the requests. Rendering errors don't fail the collection."""
+    if not current_app.config.get('PAGE_CACHE', True):
+        return
+    try:
+        page_cache.prerender(snapshot_id, cluster, data, sections, previous_snapshot_id)
+    except Exception as e:
+        logger.error(f"Error rendering the pages of snapshot {snapshot_id}: {e}")
+
+def _record_metrics(cluster, metrics):
+    """Append freshly collected usage metrics to the metrics store. Store errors don't fail the collection."""
+    try:
+        metrics_store.record_metrics(cluster, metrics)
+    except Exception as e:
+        logger.error(f"Error storing metrics of cluster {cluster}: {e}")
+
+def _record_events(cluster, events):
+    """Add freshly collected events to the event store. Store errors don't fail the collection."""
+    try:
+        event_store.ingest(cluster, events.get('events_list') or [])
+        event_store.prune(cluster, current_app.config.get('EVENT_RETENTION_DAYS', 7))
+    except Exception as e:
+        logger.error(f"Error storing events of cluster {cluster}: {e}")
+
+def _backfill_fleet_index(app):
+    """Index the collection files saved before the fleet index existed."""
     with app.app_context():
-        # Update status
-        collection_status['status'] = 'running'
-        start_time = time.time()
-        success = False
-        items_collected = 0
-        error_details = None
         try:
-            logger.info("Starting data collection")
-            kubeconfig = current_app.config.get('KUBECONFIG_PATH')
-            data = {}
-            logger.info("Collecting basic cluster info")
-            data['basic_info'] = get_basic_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting nodes info")
-            data['nodes'] = get_nodes_detailed(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting operators info")
-            data['operators'] = get_operators_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting etcd info")
-            data['etcd'] = get_etcd_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting network info")
-            data['network'] = get_network_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting storage info")
-            data['storage'] = get_storage_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting security info")
-            data['security'] = get_security_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting metrics info")
-            data['metrics'] = get_metrics_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting events info")
-            data['events'] = get_events_info(kubeconfig)
-            items_collected += 1
-            logger.info("Collecting cluster resources")
-            data['cluster_resources'] = get_cluster_resources(kubeconfig)
+            fleet_index.backfill({cluster: clusters.get_data_dir(cluster) for cluster in clusters.get_cluster_names()})
+        except Exception as e:
+            logger.error(f"Error indexing existing snapshots: {e}")
+
+def _set_cluster_running(cluster, running):
+    """Update the status of a cluster, and the overall status: running while any cluster is being collected."""
+    state = cluster_status.setdefault(cluster, {'status': 'idle', 'last_collection': None})
+    state['status'] = 'running' if running else 'idle'
+    if not running:
+        state['last_collection'] = datetime.datetime.now()
+    collection_status['status'] = 'running' if any(
+        state['status'] == 'running' for state in cluster_status.values()
+    ) else 'idle'
+
+def _run_collection_step(run, step, collector):
+    """
+    Run one step of a collection run, or load its checkpoint if it completed before the run was interrupted.
+
+    Returns:
+        tuple: (status ('success', 'resumed' or 'error'), result, error_message)
+    """
+    if staging.is_step_done(run, step):
+        return 'resumed', staging.load_step(run, step), None
+    try:
+        result = collector()
+    except Exception as e:
+        logger.error(f"Error collecting {step}: {e}")
+        staging.save_step_error(run, step, str(e))
+        return 'error', None, str(e)
+    staging.save_step(run, step, result)
+    return 'success', result, None
+
+def collect_data(cluster=None):
+    """Collect data from an OpenShift cluster (by default, the default cluster)."""
+    # Run against the long-lived app the scheduler is bound to, rather than bootstrapping a new one per run
+    with scheduler.app.app_context():
+        cluster = cluster or clusters.get_default_cluster()
+        with _get_cluster_lock(cluster), collection_slots:
+            return _collect_cluster(cluster)
+
+def _collect_cluster(cluster):
+    """Run a full collection of a cluster. Called with the cluster's lock held."""
+    # Update status
+    _set_cluster_running(cluster, True)
+    _save_collection_history()
+    live_updates.publish('collection', cluster, status='running')
+    start_time = time.time()
+    success = False
+    items_collected = 0
+    error_details = None
+    section_status = {}
+    failed_steps = []
+    try:
+        # Each section and namespace is checkpointed, so that an interrupted run resumes where it stopped
+        run, resumed = staging.open_run(cluster, current_app.config.get('STAGING_MAX_AGE', 86400))
+        if resumed:
+            logger.info(f"Resuming data collection {run['id']} of cluster {cluster}")
+        else:
+            logger.info(f"Starting data collection of cluster {cluster}")
+        kubeconfig = clusters.get_kubeconfig(cluster)
+        previous_data = _get_current_data(cluster)
+        data = {}
+        for section, collector in _get_section_collectors().items():
+            logger.info(f"Collecting {section.replace('_', ' ')} info")
+            live_updates.publish('section', cluster, section=section, status='running')
+            status, result, error = _run_collection_step(run, section, lambda: collector(kubeconfig, cluster=cluster))
+            section_status[section] = status
+            live_updates.publish('section', cluster, section=section, status=status, error=error)
+            if status == 'error':
+                failed_steps.append(f"{section}: {error}")
+                # Keep the section of the previous collection rather than dropping it
+                if section in previous_data:
+                    data[section] = previous_data[section]
+                continue
+            data[section] = result
             items_collected += 1
-            logger.info("Collecting namespaces list")
-            namespaces = get_namespaces_list(kubeconfig)
-            data['namespaces'] = namespaces
+            if section == 'metrics' and status == 'success':
+                _record_metrics(cluster, result)
+            elif section == 'events' and status == 'success':
+                _record_events(cluster, result)
+        logger.info("Collecting namespaces list")
+        live_updates.publish('section', cluster, section='namespaces', status='running')
+        status, namespaces, error = _run_collection_step(run, 'namespaces', lambda: get_namespaces_list(kubeconfig, cluster=cluster))
+        section_status['namespaces'] = status
+        live_updates.publish('section', cluster, section='namespaces', status=status, error=error)
+        if status == 'error':
+            failed_steps.append(f"namespaces: {error}")
+            namespaces = previous_data.get('namespaces') or []
+        else:
             items_collected += 1
-            logger.info("Collecting namespace resources (limited to 5)")
-            data['namespace_resources'] = {}
-            for namespace in namespaces[:5]:
-                logger.info(f"Collecting resources for namespace: {namespace}")
-                data['namespace_resources'][namespace] = get_resources_for_namespace(namespace, kubeconfig)
+        data['namespaces'] = namespaces
+        logger.info("Collecting namespace resources (limited to 5)")
+        live_updates.publish('section', cluster, section='namespace_resources', status='running')
+        data['namespace_resources'] = {}
+        for namespace in namespaces[:5]:
+            logger.info(f"Collecting resources for namespace: {namespace}")
+            status, resources, error = _run_collection_step(
+                run, f'namespace_{namespace}', lambda: get_resources_for_namespace(namespace, kubeconfig, cluster=cluster)
+            )
+            if status == 'error':
+                failed_steps.append(f"namespace {namespace}: {error}")
+                resources = (previous_data.get('namespace_resources') or {}).get(namespace)
+                if resources is None:
+                    continue
+            else:
                 items_collected += 1
-            _save_collected_data(data)
+            data['namespace_resources'][namespace] = resources
+        section_status['namespace_resources'] = 'error' if any(
+            step.startswith('namespace ') for step in failed_steps
+        ) else 'success'
+        live_updates.publish('section', cluster, section='namespace_resources', status=section_status['namespace_resources'])
+        if current_app.config.get('SECTION_SCHEDULING', True):
+            # Keep the namespace resources collected shard by shard
+            previous_resources = previous_data.get('namespace_resources') or {}
+            data['namespace_resources'] = dict(
+                {namespace: resources for namespace, resources in previous_resources.items() if namespace in namespaces},
+                **data['namespace_resources']
+            )
+        
+        # Publish the completed sections even if some failed
+        if items_collected:
+            _publish_collected_data(data, cluster)
+            staging.finish_run(run)
             success = True
-            logger.info(f"Data collection completed successfully. Collected {items_collected} items.")
-        except Exception as e:
-            logger.error(f"Error during data collection: {e}")
-            error_details = str(e)
-            success = False
-        end_time = time.time()
-        duration = end_time - start_time
-        collection_entry = {
-            'timestamp': datetime.datetime.now(),
-            'status': 'success' if success else 'error',
-            'duration': duration,
-            'items_collected': items_collected,
-            'details': error_details if error_details else None
-        }
+        if failed_steps:
+            error_details = "Failed steps: " + "; ".join(failed_steps)
+            logger.warning(f"Data collection of cluster {cluster} completed with errors. Collected {items_collected} items. {error_details}")
+        else:
+            logger.info(f"Data collection of cluster {cluster} completed successfully. Collected {items_collected} items.")
+    except Exception as e:
+        logger.error(f"Error during data collection of cluster {cluster}: {e}")
+        error_details = str(e)
+        success = False
+    end_time = time.time()
+    duration = end_time - start_time
+    if success and failed_steps:
+        status = 'partial'
+    else:
+        status = 'success' if success else 'error'
+    collection_entry = {
+        'timestamp': datetime.datetime.now(),
+        'cluster': cluster,
+        'status': status,
+        'duration': duration,
+        'items_collected': items_collected,
+        'details': error_details if error_details else None,
+        'sections': section_status
+    }
+    with _history_lock:
         collection_history.append(collection_entry)
-        if len(collection_history) > 50:
+        if len(collection_history) > current_app.config.get('COLLECTION_HISTORY_SIZE', 50):
             collection_history.pop(0)
         collection_stats['total'] += 1
-        if success:
+        if status == 'success':
             collection_stats['successful'] += 1
+        elif status == 'partial':
+            collection_stats['partial'] = collection_stats.get('partial', 0) + 1
         else:
             collection_stats['failed'] += 1
         total_duration = sum(entry['duration'] for entry in collection_history)
         collection_stats['avg_duration'] = total_duration / len(collection_history)
-        collection_status['status'] = 'idle'
-        collection_status['last_collection'] = datetime.datetime.now()
-        _save_collection_history()
-        return success
+    _set_cluster_running(cluster, False)
+    collection_status['last_collection'] = cluster_status[cluster]['last_collection']
+    if success:
+        for section, state in section_schedule.get(cluster, {}).items():
+            if section_status.get(section) != 'error':
+                state['last_run'] = collection_status['last_collection']
+    _save_collection_history()
+    live_updates.publish(
+        'collection', cluster, status=status, items_collected=items_collected,
+        duration=round(duration, 1), error=error_details
+    )
+    return success
+
+def _collect_namespace_shard(kubeconfig, cluster, data, shard):
+    """
+    Collect the namespaces list and the resources of one shard of the namespaces.
+
+    Returns:
+        dict: The namespaces and namespace_resources sections.
+    """
+    shards = max(1, current_app.config.get('NAMESPACE_SHARDS', 12))
+    namespaces = get_namespaces_list(kubeconfig, cluster=cluster)
+    
+    # Keep the resources collected for the other shards, except for deleted namespaces
+    namespace_resources = {
+        namespace: resources for namespace, resources in (data.get('namespace_resources') or {}).items()
+        if namespace in namespaces
+    }
+    for namespace in namespaces[shard % shards::shards]:
+        logger.info(f"Collecting resources for namespace: {namespace}")
+        namespace_resources[namespace] = get_resources_for_namespace(namespace, kubeconfig, cluster=cluster)
+    
+    return {
+        'namespaces': namespaces,
+        'namespace_resources': namespace_resources
+    }
+
+def collect_section(section, cluster=None):
+    """Refresh one section of the latest collection data of a cluster. Runs on the section's own schedule."""
+    with scheduler.app.app_context():
+        cluster = cluster or clusters.get_default_cluster()
+        with _get_cluster_lock(cluster), collection_slots:
+            return _refresh_section(section, cluster)
+
+def _refresh_section(section, cluster):
+    """Refresh one section of a cluster. Called with the cluster's lock held."""
+    state = section_schedule[cluster][section]
+    kubeconfig = clusters.get_kubeconfig(cluster)
+    data = _get_current_data(cluster)
+    start_time = time.time()
+    changed = False
+    live_updates.publish('section', cluster, section=section, status='running')
+    try:
+        logger.info(f"Refreshing {section.replace('_', ' ')} of cluster {cluster}")
+        if section == 'namespaces':
+            sections = _collect_namespace_shard(kubeconfig, cluster, data, state.get('runs', 0))
+        else:
+            sections = {section: _get_section_collectors()[section](kubeconfig, cluster=cluster)}
+            if section == 'metrics':
+                # Usage changes at every refresh: keep every sample, not just the latest snapshot
+                _record_metrics(cluster, sections[section])
+            elif section == 'events':
+                _record_events(cluster, sections[section])
+        
+        # Only publish a new snapshot when the section actually changed
+        changed = any(_section_digest(value, key) != _section_digest(data.get(key), key) for key, value in sections.items())
+        if changed and section in TIME_SERIES_SECTIONS:
+            # Already in its store: carried into the next snapshot, written when another section changes
+            current_data[cluster] = resource_model.compact_snapshot(dict(data, **sections))
+            unpublished_sections.setdefault(cluster, set()).add(section)
+            state['last_change'] = datetime.datetime.now()
+        elif changed:
+            _publish_collected_data(dict(data, **sections), cluster, list(sections))
+            state['last_change'] = datetime.datetime.now()
+            cluster_status.setdefault(cluster, {'status': 'idle'})['last_collection'] = state['last_change']
+            collection_status['last_collection'] = state['last_change']
+        state['status'] = 'success'
+        state['error'] = None
+    except Exception as e:
+        logger.error(f"Error refreshing {section} of cluster {cluster}: {e}")
+        state['status'] = 'error'
+        state['error'] = str(e)
+    
+    state['last_run'] = datetime.datetime.now()
+    state['duration'] = time.time() - start_time
+    state['runs'] = state.get('runs', 0) + 1
+    live_updates.publish(
+        'section', cluster, section=section, status=state['status'] if changed or state['status'] == 'error' else 'unchanged',
+        error=state['error'], duration=round(state['duration'], 1)
+    )
+    state['next_run'] = state['last_run'] + datetime.timedelta(
+        seconds=_get_section_run_interval(section, state['effective_interval'])
+    )
+    
+    # Adaptive scheduling: back off while a section doesn't change, back to its interval once it does.
+    # Namespaces are refreshed shard by shard, so an unchanged shard says little about the others.
+    if current_app.config.get('ADAPTIVE_SCHEDULING', False) and section != 'namespaces' and state['status'] == 'success':
+        effective_interval = state['interval'] if changed else min(
+            state['effective_interval'] * 2, state['interval'] * ADAPTIVE_MAX_FACTOR
+        )
+        if effective_interval != state['effective_interval']:
+            logger.info(f"Refreshing {section} of cluster {cluster} every {_format_interval(effective_interval)} "
+                        f"({'changed' if changed else 'unchanged'} since the previous run)")
+            state['effective_interval'] = effective_interval
+            _schedule_section_job(cluster, section)
+    
+    _update_next_collection()
+    _save_collection_history()
+    return changed
+
+def request_namespace_refresh(namespace, cluster):
+    """
+    Refresh the resources of one namespace of a cluster in the background, unless it is already being refreshed.
+
+    Returns:
+        bool: False if the namespace was already being refreshed.
+    """
+    # Collections run in the collector worker: ask it to refresh the namespace (pending requests are merged)
+    if not collector_process:
+        _submit_worker_request(refresh_namespaces=[f'{cluster}/{namespace}'])
+        return True
+    with _namespace_refreshes_lock:
+        if (cluster, namespace) in namespace_refreshes:
+            return False
+        namespace_refreshes.add((cluster, namespace))
+    threading.Thread(target=refresh_namespace, args=(namespace, cluster), daemon=True).start()
+    return True
 
-def _save_collected_data(data):
-    """Save collected data to file."""
-    data_dir = os.path.join(current_app.instance_path, 'collected_data')
+def refresh_namespace(namespace, cluster):
+    """Collect the resources of one namespace into the latest collection data of a cluster."""
+    try:
+        with scheduler.app.app_context():
+            with _get_cluster_lock(cluster), collection_slots:
+                return _refresh_namespace(namespace, cluster)
+    finally:
+        with _namespace_refreshes_lock:
+            namespace_refreshes.discard((cluster, namespace))
+
+def _refresh_namespace(namespace, cluster):
+    """Refresh one namespace of a cluster. Called with the cluster's lock held."""
+    logger.info(f"Refreshing namespace {namespace} of cluster {cluster}")
+    live_updates.publish('section', cluster, section='namespace_resources', namespace=namespace, status='running')
+    try:
+        resources = get_resources_for_namespace(namespace, clusters.get_kubeconfig(cluster), cluster=cluster)
+    except Exception as e:
+        logger.error(f"Error refreshing namespace {namespace} of cluster {cluster}: {e}")
+        live_updates.publish('section', cluster, section='namespace_resources', namespace=namespace, status='error', error=str(e))
+        return False
+    data = _get_current_data(cluster)
+    namespace_resources = dict(data.get('namespace_resources') or {}, **{namespace: resources})
+    _publish_collected_data(dict(data, namespace_resources=namespace_resources), cluster, ['namespace_resources'])
+    live_updates.publish('section', cluster, section='namespace_resources', namespace=namespace, status='success')
+    return True
+
+def _save_collected_data(data, cluster=None):
+    """Save collected data of a cluster to file. Returns the path of the file, or None on error."""
+    data_dir = clusters.get_data_dir(cluster or clusters.get_default_cluster())
     os.makedirs(data_dir, exist_ok=True)
     
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    data_file = os.path.join(data_dir, f'collection_{timestamp}.json')
+    # Microseconds keep the ids of snapshots saved within a second unique, and in the order they were saved
+    saved_at = datetime.datetime.now()
+    data_file = os.path.join(data_dir, f"collection_{saved_at.strftime('%Y%m%d_%H%M%S_%f')}.json")
+    while os.path.exists(data_file):
+        saved_at += datetime.timedelta(microseconds=1)
+        data_file = os.path.join(data_dir, f"collection_{saved_at.strftime('%Y%m%d_%H%M%S_%f')}.json")
     
     try:
-        with open(data_file, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        # Written with the index of its sections, which are then loaded one at a time
+        snapshot_file.write(data_file, data, default=resource_model.json_default)
         
         logger.info(f"Saved collected data to {data_file}")
     except Exception as e:
         logger.error(f"Error saving collected data: {e}")
+        return None
+    
+    # Remove the collection files older than the retention period, except the latest
+    retention_days = current_app.config.get('SNAPSHOT_RETENTION_DAYS', 7)
+    if retention_days:
+        cutoff = time.time() - retention_days * 86400
+        collection_files = sorted(f for f in os.listdir(data_dir) if f.startswith('collection_') and f.endswith('.json'))
+        for file_name in collection_files[:-1]:
+            collection_file = os.path.join(data_dir, file_name)
+            try:
+                expired = os.path.getmtime(collection_file) < cutoff
+            except FileNotFoundError:
+                continue
+            if expired:
+                snapshot_file.remove(collection_file)
+    
+    return data_file
+
+def _submit_worker_request(**fields):
+    """Forward a request (e.g. run a collection, change the interval) to the collector worker."""
+    requests_file = os.path.join(current_app.instance_path, WORKER_REQUESTS_FILE)
+    os.makedirs(os.path.dirname(requests_file), exist_ok=True)
+    
+    # Web workers and their threads submit requests concurrently: merge them one at a time
+    with open(f'{requests_file}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        
+        # Merge with requests the worker hasn't picked up yet
+        pending = {}
+        if os.path.exists(requests_file):
+            try:
+                with open(requests_file, 'r') as f:
+                    pending = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable collector requests file: {e}")
+        for key, value in fields.items():
+            # Lists (e.g. the clusters to collect) accumulate until the worker picks them up
+            if isinstance(value, list):
+                value = sorted(set(pending.get(key, [])) | set(value))
+            pending[key] = value
+        
+        fd, tmp_file = tempfile.mkstemp(prefix=f'{WORKER_REQUESTS_FILE}.', suffix='.tmp', dir=os.path.dirname(requests_file))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(pending, f, default=str)
+        os.replace(tmp_file, requests_file)
+
+def process_worker_requests():
+    """Handle the requests forwarded by the web workers. Called periodically by the collector worker."""
+    # Pick up the clusters registered or unregistered since the jobs were scheduled, e.g. by editing the registry file
+    if clusters.get_cluster_names() != scheduled_clusters:
+        logger.info("Clusters changed, rescheduling the collection jobs")
+        _schedule_collection_job()
+        _save_collection_history()
+    
+    requests_file = os.path.join(current_app.instance_path, WORKER_REQUESTS_FILE)
+    claimed_file = f'{requests_file}.processing'
+    try:
+        # Claim the requests atomically, so that none submitted meanwhile are lost
+        os.replace(requests_file, claimed_file)
+    except FileNotFoundError:
+        return
+    
+    try:
+        with open(claimed_file, 'r') as f:
+            requests = json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading collector requests: {e}")
+        requests = {}
+    finally:
+        os.remove(claimed_file)
+    
+    interval = requests.get('interval')
+    if interval and interval != collection_status['interval']:
+        logger.info(f"Collection interval changed to {_format_interval(interval)}")
+        collection_status['interval'] = interval
+        _schedule_collection_job()
+        _save_collection_history()
+    elif requests.get('reschedule'):
+        _schedule_collection_job()
+        _save_collection_history()
+    
+    for cluster in requests.get('run_collection') or []:
+        if clusters.get_cluster(cluster) and cluster_status.get(cluster, {}).get('status') != 'running':
+            logger.info(f"Running collection of cluster {cluster} requested from the web UI")
+            _start_collection_thread(cluster)
+    
+    for key in requests.get('refresh_namespaces') or []:
+        cluster, _, namespace = key.partition('/')
+        if clusters.get_cluster(cluster):
+            request_namespace_refresh(namespace, cluster)
 
 def _register_api_endpoints(app):
     """Register API endpoints for the scheduler."""
@@ -237,35 +906,125 @@ def _register_api_endpoints(app):
     
     @app.route('/api/v2/collection-status')
     def api_collection_status():
-        """API endpoint to get collection status."""
-        return jsonify({
+        """
+        API endpoint to get collection status, of all clusters or of the `cluster` parameter's.
+        Answered with 304 Not Modified while the saved collection history is unchanged.
+        """
+        # Every status change is saved to the history file: its modification time versions the status
+        history_file = os.path.join(current_app.instance_path, 'collection_history.json')
+        etag = responses.make_etag(os.stat(history_file).st_mtime_ns) if os.path.exists(history_file) else None
+        cached = responses.not_modified(etag)
+        if cached:
+            return cached
+        
+        # The collector worker owns the status: pick up its latest state
+        if not collector_process:
+            _load_collection_history(include_runtime_status=True)
+        
+        cluster = request.args.get('cluster')
+        if cluster:
+            state = cluster_status.get(cluster, {})
+            return responses.json_response({
+                'cluster': cluster,
+                'status': state.get('status', 'idle'),
+                'last_collection': state.get('last_collection'),
+                'next_collection': collection_status['next_collection'],
+                'interval': collection_status['interval'],
+                'schedule': collection_status['schedule'],
+                'stats': collection_stats,
+                'history': [entry for entry in collection_history if entry.get('cluster', clusters.DEFAULT_CLUSTER) == cluster]
+            }, etag)
+        
+        return responses.json_response({
             'status': collection_status['status'],
             'last_collection': collection_status['last_collection'],
             'next_collection': collection_status['next_collection'],
             'interval': collection_status['interval'],
             'schedule': collection_status['schedule'],
             'stats': collection_stats,
-            'history': collection_history
+            'history': collection_history,
+            'clusters': cluster_status
+        }, etag)
+    
+    @app.route('/api/v2/collection-schedule')
+    def api_collection_schedule():
+        """API endpoint to get the effective refresh schedule of each section of a cluster."""
+        # The collector worker owns the schedule: pick up its latest state
+        if not collector_process:
+            _load_collection_history(include_runtime_status=True)
+        
+        cluster = clusters.get_current_cluster()
+        sections = []
+        for section, state in section_schedule.get(cluster, {}).items():
+            sections.append({
+                'section': section,
+                'interval': state.get('interval'),
+                'effective_interval': state.get('effective_interval'),
+                'schedule': f"Every {_format_interval(state['effective_interval'])}" if state.get('effective_interval') else None,
+                'next_run': state.get('next_run'),
+                'last_run': state.get('last_run'),
+                'last_change': state.get('last_change'),
+                'duration': state.get('duration'),
+                'status': state.get('status'),
+                'error': state.get('error')
+            })
+        
+        return jsonify({
+            'success': True,
+            'cluster': cluster,
+            'section_scheduling': current_app.config.get('SECTION_SCHEDULING', True),
+            'adaptive': current_app.config.get('ADAPTIVE_SCHEDULING', False),
+            'interval': collection_status['interval'],
+            'sections': sections
+        })
+    
+    @app.route('/api/v2/client-stats')
+    def api_client_stats():
+        """API endpoint to get the rate limit, retry and circuit breaker stats of each cluster."""
+        if collector_process:
+            client_stats = rate_limit.get_stats()
+        else:
+            # The collections run in the collector worker: report its stats, as last saved
+            _load_collection_history(include_runtime_status=True)
+            client_stats = dict(collector_client_stats)
+        
+        return jsonify({
+            'success': True,
+            'clusters': client_stats,
+            # Commands run by this process for the live API endpoints
+            'local': rate_limit.get_stats() if not collector_process else {}
         })
     
     @app.route('/api/v2/run-collection', methods=['POST'])
     def api_run_collection():
-        """API endpoint to run collection manually."""
-        if collection_status['status'] == 'running':
+        """API endpoint to run collection manually, of the `cluster` parameter's cluster or of all clusters."""
+        if not collector_process:
+            _load_collection_history(include_runtime_status=True)
+        
+        cluster = request.args.get('cluster')
+        targets = [cluster] if cluster else clusters.get_cluster_names()
+        targets = [target for target in targets if cluster_status.get(target, {}).get('status') != 'running']
+        if not targets:
             return jsonify({
                 'success': False,
                 'error': 'Collection is already running'
             })
         
-        # Run collection in a separate thread
-        from threading import Thread
-        thread = Thread(target=collect_data)
-        thread.daemon = True
-        thread.start()
+        # Collections run in the collector worker: ask it to run them
+        if not collector_process:
+            _submit_worker_request(run_collection=targets)
+            return jsonify({
+                'success': True,
+                'message': f'Collection requested for {len(targets)} clusters' if len(targets) > 1 else 'Collection requested'
+            })
+        
+        # Run collections in separate threads, bounded by the collection concurrency
+        for target in targets:
+            _start_collection_thread(target)
         
         return jsonify({
             'success': True,
-            'message': 'Collection started'
+            'message': f'Collection started for {len(targets)} clusters' if len(targets) > 1 else 'Collection started'
         })
     
     @app.route('/api/v2/update-interval', methods=['POST'])
@@ -283,6 +1042,14 @@ def _register_api_endpoints(app):
         # Update interval
         collection_status['interval'] = interval
         
+        # The collector worker owns the schedule: forward the new interval to it
+        if not collector_process:
+            _submit_worker_request(interval=interval)
+            return jsonify({
+                'success': True,
+                'message': f'Collection interval updated to {_format_interval(interval)}'
+            })
+        
         # Reschedule collection job
         _schedule_collection_job()
         
@@ -0,0 +1,187 @@
+"""
+Snapshot file module.
+Writes collection files with an index of the byte range of each of their
+top-level sections (nodes, etcd, events, ...), and opens them as read-only
+mappings that load a section from the memory-mapped file only when it is first
+accessed. A single-section export or page view then parses that section alone
+rather than the whole snapshot, and JSON exports stream the bytes of the
+sections straight from the file without parsing them at all.
+
+The index is kept next to the collection file (collection_x.json.index). The
+collection file itself stays a plain JSON document, formatted as before.
+Collection files without an index (written before it existed) are loaded whole.
+"""
+
+import os
+import json
+import mmap
+import logging
+from collections.abc import Mapping
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Suffix of the section index of a collection file
+INDEX_SUFFIX = '.index'
+
+# Indentation of collection files
+INDENT = 2
+
+# Number of encoded JSON fragments written at once
+WRITE_FRAGMENTS = 4096
+
+# Size of the chunks of the sections streamed as JSON
+READ_CHUNK_SIZE = 64 * 1024
+
+# Size above which an encoded section can't be empty (the longest empty value is false)
+EMPTY_VALUE_SIZE = 8
+
+def get_index_path(collection_file):
+    """Get the path of the section index of a collection file."""
+    return f'{collection_file}{INDEX_SUFFIX}'
+
+def _write_atomically(path, write):
+    """Write a file through a temporary file, as the web workers read snapshots at any time."""
+    tmp_file = f'{path}.tmp'
+    with open(tmp_file, 'wb') as f:
+        write(f)
+    os.replace(tmp_file, path)
+
+def _write_nested(f, fragments):
+    """Write JSON fragments of a section, nested one level deeper as json.dump(data, indent=2) writes them."""
+    f.write(''.join(fragments).replace('\n', '\n' + ' ' * INDENT).encode('utf-8'))
+
+def write(collection_file, data, default=str):
+    """
+    Write a snapshot to a collection file, and its section index.
+
+    Args:
+        collection_file (str): Path of the collection file.
+        data (dict): Snapshot data.
+        default (callable): JSON encoder default, for values json can't encode.
+    """
+    encoder = json.JSONEncoder(indent=INDENT, default=default)
+    sections = {}
+
+    def write_sections(f):
+        f.write(b'{')
+        for position, (key, value) in enumerate(data.items()):
+            f.write(f'{"," if position else ""}\n{" " * INDENT}{json.dumps(key)}: '.encode('utf-8'))
+            start = f.tell()
+            buffer = []
+            for fragment in encoder.iterencode(value):
+                buffer.append(fragment)
+                if len(buffer) >= WRITE_FRAGMENTS:
+                    _write_nested(f, buffer)
+                    buffer = []
+            _write_nested(f, buffer)
+            sections[key] = [start, f.tell()]
+        f.write(b'\n}' if data else b'}')
+
+    _write_atomically(collection_file, write_sections)
+    # Written after the collection file: an index always describes a complete file
+    index = {'size': os.path.getsize(collection_file), 'sections': sections}
+    _write_atomically(get_index_path(collection_file), lambda f: f.write(json.dumps(index).encode('utf-8')))
+
+def remove(collection_file):
+    """Remove a collection file and its section index."""
+    for path in (collection_file, get_index_path(collection_file)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _read_index(collection_file, size):
+    """Get the section byte ranges of a collection file of a size, or None without a matching index."""
+    try:
+        with open(get_index_path(collection_file), 'r') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable section index of {collection_file}: {e}")
+        return None
+    if index.get('size') != size:
+        logger.warning(f"Ignoring outdated section index of {collection_file}")
+        return None
+    return {key: tuple(section_range) for key, section_range in index['sections'].items()}
+
+class SnapshotFile(Mapping):
+    """A read-only snapshot whose sections are loaded from its collection file on first access."""
+
+    def __init__(self, collection_file):
+        """Open a collection file. Raises OSError or ValueError if it can't be read."""
+        self.collection_file = collection_file
+        self._sections = {}
+        self._mmap = None
+        with open(collection_file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._index = _read_index(collection_file, size)
+            if self._index is None:
+                self._sections = json.load(f)
+                self._index = dict.fromkeys(self._sections)
+            elif size:
+                # The map keeps the file readable after f is closed (and after the file is removed)
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __getitem__(self, key):
+        if key not in self._sections:
+            start, end = self._index[key]
+            self._sections[key] = json.loads(self._mmap[start:end])
+        return self._sections[key]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __repr__(self):
+        return f'SnapshotFile({self.collection_file!r})'
+
+    def iter_json(self, keys=None, chunk_size=READ_CHUNK_SIZE):
+        """
+        Stream sections of the snapshot as a JSON object, in chunks of bytes. The sections of an
+        indexed file are copied from their byte ranges in the file, without being parsed.
+
+        Args:
+            keys (list, optional): Sections to include, in snapshot order (None: all of them).
+            chunk_size (int): Size of the chunks.
+        """
+        yield b'{'
+        for position, key in enumerate(key for key in self._index if keys is None or key in keys):
+            yield f'{", " if position else ""}{json.dumps(key)}: '.encode('utf-8')
+            section_range = self._index[key]
+            if section_range is None:
+                # Loaded whole (no index): encode it again
+                buffer = []
+                for fragment in json.JSONEncoder(default=str).iterencode(self._sections[key]):
+                    buffer.append(fragment)
+                    if len(buffer) >= WRITE_FRAGMENTS:
+                        yield ''.join(buffer).encode('utf-8')
+                        buffer = []
+                yield ''.join(buffer).encode('utf-8')
+                continue
+            for start in range(section_range[0], section_range[1], chunk_size):
+                yield self._mmap[start:min(start + chunk_size, section_range[1])]
+        yield b'}'
+
+    def has_data(self, key):
+        """
+        Whether a section is present and not empty. Checked without loading a section of an
+        indexed file: only short values ({}, [], null, "", 0...) can be empty, so only they are parsed.
+        """
+        if key not in self._index:
+            return False
+        if key in self._sections:
+            return bool(self._sections[key])
+        start, end = self._index[key]
+        return end - start > EMPTY_VALUE_SIZE or bool(json.loads(self._mmap[start:end]))
+
+    @property
+    def loaded_sections(self):
+        """The sections loaded so far."""
+        return [key for key in self._index if key in self._sections]
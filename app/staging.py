@@ -0,0 +1,125 @@
+"""
+Collection staging module.
+Checkpoints a full collection run step by step (one step per section and per
+namespace) to a staging directory in the instance directory, so that a run
+interrupted by a restart resumes where it stopped instead of starting over.
+"""
+
+import os
+import json
+import shutil
+import datetime
+import logging
+from flask import current_app
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Staging directory, in the instance directory (one subdirectory per cluster)
+STAGING_DIR = 'collection_staging'
+
+# Manifest of a staged run: run id, start time and the status of each step
+MANIFEST_FILE = 'run.json'
+
+def get_staging_dir(cluster):
+    """Get the staging directory of a cluster."""
+    return os.path.join(current_app.instance_path, STAGING_DIR, cluster)
+
+def _write_json(path, value):
+    """Write a JSON file atomically."""
+    tmp_file = f'{path}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(value, f, default=str)
+    os.replace(tmp_file, path)
+
+def _step_file(run, step):
+    """Get the path of the checkpoint file of a step."""
+    return os.path.join(run['dir'], f'{step}.json')
+
+def _save_manifest(run):
+    """Save the manifest of a staged run."""
+    run['updated'] = datetime.datetime.now().isoformat()
+    _write_json(os.path.join(run['dir'], MANIFEST_FILE), {key: value for key, value in run.items() if key != 'dir'})
+
+def _load_run(run_dir):
+    """Load a staged run from its directory."""
+    try:
+        with open(os.path.join(run_dir, MANIFEST_FILE), 'r') as f:
+            run = json.load(f)
+        run['dir'] = run_dir
+        return run
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable staged collection run {run_dir}: {e}")
+        return None
+
+def get_unfinished_run(cluster):
+    """Get the latest unfinished staged run of a cluster, or None."""
+    staging_dir = get_staging_dir(cluster)
+    if not os.path.exists(staging_dir):
+        return None
+    run_dirs = sorted(d for d in os.listdir(staging_dir) if d.startswith('run_'))
+    return _load_run(os.path.join(staging_dir, run_dirs[-1])) if run_dirs else None
+
+def open_run(cluster, max_age):
+    """
+    Open the unfinished staged run of a cluster to resume it, or start a new run.
+
+    Args:
+        cluster (str): Cluster name.
+        max_age (int): Age in seconds beyond which an unfinished run is discarded rather than resumed.
+
+    Returns:
+        tuple: (run (dict), resumed (bool))
+    """
+    run = get_unfinished_run(cluster)
+    if run:
+        age = (datetime.datetime.now() - datetime.datetime.fromisoformat(run['started'])).total_seconds()
+        if age <= max_age:
+            return run, True
+        logger.info(f"Discarding staged collection run {run['id']}, started {int(age)} seconds ago")
+
+    # Only one run is staged at a time per cluster
+    discard_runs(cluster)
+
+    now = datetime.datetime.now()
+    run_id = f"run_{now.strftime('%Y%m%d_%H%M%S')}"
+    run = {
+        'id': run_id,
+        'dir': os.path.join(get_staging_dir(cluster), run_id),
+        'started': now.isoformat(),
+        'steps': {}
+    }
+    os.makedirs(run['dir'], exist_ok=True)
+    _save_manifest(run)
+    return run, False
+
+def is_step_done(run, step):
+    """Whether a step of a staged run completed."""
+    return run['steps'].get(step, {}).get('status') == 'success'
+
+def load_step(run, step):
+    """Load the checkpointed result of a completed step."""
+    with open(_step_file(run, step), 'r') as f:
+        return json.load(f)
+
+def save_step(run, step, value):
+    """Checkpoint the result of a completed step."""
+    _write_json(_step_file(run, step), value)
+    run['steps'][step] = {'status': 'success', 'finished': datetime.datetime.now().isoformat()}
+    _save_manifest(run)
+
+def save_step_error(run, step, error):
+    """Record a failed step. It is attempted again if the run is resumed."""
+    run['steps'][step] = {'status': 'error', 'error': error, 'finished': datetime.datetime.now().isoformat()}
+    _save_manifest(run)
+
+def finish_run(run):
+    """Remove a staged run once its collection has been published."""
+    shutil.rmtree(run['dir'], ignore_errors=True)
+
+def discard_runs(cluster):
+    """Remove all staged runs of a cluster."""
+    staging_dir = get_staging_dir(cluster)
+    if os.path.exists(staging_dir):
+        for run_dir in os.listdir(staging_dir):
+            shutil.rmtree(os.path.join(staging_dir, run_dir), ignore_errors=True)
@@ -0,0 +1,70 @@
+"""
+Collector worker module.
+Runs the collection scheduler in a dedicated process, outside the web workers,
+so that collections never compete with page rendering and a web worker restart
+never interrupts a collection. Only one worker collects at a time: the leader
+holds an exclusive lock on a file in the (shared) instance directory, and any
+other worker waits on standby to take over if the leader goes away.
+"""
+
+import os
+import time
+import fcntl
+import socket
+import logging
+import datetime
+from app.scheduler import start_collection_scheduler, process_worker_requests, scheduler
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Leader lock file, in the instance directory
+LOCK_FILE = 'collector.lock'
+
+def _acquire_leader_lock(lock_path):
+    """
+    Try to become the leader collector worker.
+
+    Returns:
+        file|None: The open lock file, held for as long as it stays open, or None if another worker is the leader.
+    """
+    lock_file = open(lock_path, 'a+')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+
+    # Record who the leader is, for troubleshooting
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f'{socket.gethostname()} {os.getpid()} {datetime.datetime.now().isoformat()}\n')
+    lock_file.flush()
+    return lock_file
+
+def run_worker(app):
+    """Run the collector worker until interrupted."""
+    os.makedirs(app.instance_path, exist_ok=True)
+    lock_path = os.path.join(app.instance_path, LOCK_FILE)
+    standby_interval = app.config.get('WORKER_STANDBY_INTERVAL', 30)
+    poll_interval = app.config.get('WORKER_POLL_INTERVAL', 5)
+
+    lock_file = _acquire_leader_lock(lock_path)
+    while lock_file is None:
+        logger.info(f"Another collector worker is the leader, retrying in {standby_interval} seconds")
+        time.sleep(standby_interval)
+        lock_file = _acquire_leader_lock(lock_path)
+
+    logger.info(f"Collector worker {os.getpid()} is the leader, starting the collection scheduler")
+    try:
+        with app.app_context():
+            start_collection_scheduler(app)
+            while True:
+                process_worker_requests()
+                time.sleep(poll_interval)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Collector worker stopping")
+    finally:
+        if scheduler.running:
+            scheduler.shutdown(wait=True)
+        lock_file.close()
@@ -0,0 +1,73 @@
+"""
+Benchmark of the capacity analytics on a large cluster.
+
+Builds the node descriptions and `oc adm top` usage of a synthetic cluster
+(500 nodes and 50,000 pods by default) and times the analysis: parsing the
+describe output and quantities, joining usage and aggregating per node,
+namespace and cluster.
+
+Run from the repository root:
+    python benchmarks/bench_capacity.py [nodes] [pods]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import capacity
+
+CPU_REQUESTS = ['10m', '50m', '100m', '250m', '500m', '1', '2']
+MEMORY_REQUESTS = ['32Mi', '64Mi', '128Mi', '256Mi', '512Mi', '1Gi', '4Gi']
+
+def _build_snapshot(node_count, pod_count):
+    """Build the nodes and metrics sections of a synthetic cluster."""
+    details = {}
+    pod_usage = []
+    for node in range(node_count):
+        rows = []
+        for pod in range(node, pod_count, node_count):
+            namespace, name = f'ns-{pod % 400}', f'pod-{pod}'
+            cpu, memory = random.choice(CPU_REQUESTS), random.choice(MEMORY_REQUESTS)
+            rows.append(f'  {namespace}  {name}  {cpu} (1%)  {cpu} (1%)  {memory} (0%)  {memory} (0%)  12d')
+            pod_usage.append({'NAMESPACE': namespace, 'NAME': name, 'CPU(cores)': f'{random.randint(1, 900)}m', 'MEMORY(bytes)': f'{random.randint(10, 2000)}Mi'})
+        details[f'worker-{node}'] = (
+            "Capacity:\n  cpu:  64\n  memory:  263921456Ki\n  pods:  250\n"
+            "Allocatable:\n  cpu:  63500m\n  memory:  262770480Ki\n  pods:  250\n"
+            f"Non-terminated Pods:  ({len(rows)} in total)\n"
+            "  Namespace  Name  CPU Requests  CPU Limits  Memory Requests  Memory Limits  Age\n"
+            "  ---------  ----  ------------  ----------  ---------------  -------------  ---\n"
+            + '\n'.join(rows) + "\nAllocated resources:\n"
+        )
+    node_usage = [{'NAME': name, 'CPU(cores)': '20000m', 'MEMORY(bytes)': '120000Mi'} for name in details]
+    return {
+        'nodes': {'list': [], 'details': details},
+        'metrics': {'node_usage_list': node_usage, 'pod_usage_list': pod_usage}
+    }
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pod_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    data = _build_snapshot(node_count, pod_count)
+
+    runs = 5
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = capacity.analyze(data)
+    analyze_ms = (time.perf_counter() - start) * 1000 / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        capacity._build_tables(data)
+    parse_ms = (time.perf_counter() - start) * 1000 / runs
+
+    print(f"Nodes / pods:            {node_count} / {pod_count}")
+    print(f"analyze() per run:       {analyze_ms:8.1f} ms")
+    print(f"  of which parsing:      {parse_ms:8.1f} ms")
+    print(f"Cluster CPU requests:    {result['cluster']['cpu_requests']} of {result['cluster']['allocatable_cpu']} cores")
+    print(f"Reference pods that fit: {result['cluster']['reference_pods_fit']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark of the certificate expiry scan on a large cluster.
+
+Builds the PEM chains of a synthetic cluster (20,000 distinct certificates by
+default, as CA bundles and TLS secrets; the certificates are copies of one test
+certificate with distinct serial numbers) and times a first scan, parsing the
+certificates in-process and in a process pool, and a later scan, where every
+certificate is cached.
+
+Run from the repository root:
+    python benchmarks/bench_certificates.py [certificates] [workers]
+"""
+
+import os
+import sys
+import time
+import base64
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collector import certificates
+from tests.test_certificates import LEAF_PEM
+
+def _build_sources(count):
+    """Build TLS secret sources of count certificates with distinct serial numbers, as bundles of 10."""
+    der = certificates.split_pem(LEAF_PEM)[0]
+    serial = der.index(bytes.fromhex('25de637fdeaf62fdfb92ff6cad17756b6d4eb001'))
+    pems = []
+    for number in range(count):
+        variant = der[:serial] + number.to_bytes(20, 'big') + der[serial + 20:]
+        pems.append(f"-----BEGIN CERTIFICATE-----\n{base64.encodebytes(variant).decode()}-----END CERTIFICATE-----\n")
+    return [
+        {'KIND': 'Secret', 'NAMESPACE': f'ns-{start % 200}', 'NAME': f'tls-{start}', 'KEY': 'tls.crt', 'PEM': ''.join(pems[start:start + 10])}
+        for start in range(0, count, 10)
+    ]
+
+def _time_scan(sources, workers):
+    """Time a scan. Returns the milliseconds it took and its summary."""
+    start = time.perf_counter()
+    _, summary = certificates.build_expiry_table(sources, workers=workers)
+    return (time.perf_counter() - start) * 1000, summary
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    sources = _build_sources(count)
+
+    in_process_ms, summary = _time_scan(sources, 0)
+    certificates._parsed.clear()
+    pool_ms, _ = _time_scan(sources, workers)
+    cached_ms, _ = _time_scan(sources, workers)
+
+    print(f"Certificates:            {summary['total']}")
+    print(f"First scan, in-process:  {in_process_ms:8.1f} ms")
+    print(f"First scan, {workers} workers:   {pool_ms:8.1f} ms")
+    print(f"Later scan (cached):     {cached_ms:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of the fixed per-run overhead of a scheduled collection.
+
+Compares bootstrapping a new Flask app for every run (what collect_data used to
+do) with running against the long-lived app the scheduler is bound to, and
+checks that repeated runs don't leak threads. The collector functions and the
+file writes are replaced with no-ops so that only the overhead is measured.
+
+Run from the repository root:
+    python benchmarks/bench_collection_overhead.py [runs]
+"""
+
+import os
+import sys
+import time
+import threading
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app import scheduler as scheduler_module
+
+COLLECTOR_FUNCTIONS = [
+    'get_basic_info', 'get_nodes_detailed', 'get_operators_info', 'get_etcd_info',
+    'get_network_info', 'get_storage_info', 'get_security_info', 'get_metrics_info',
+    'get_events_info', 'get_cluster_resources'
+]
+
+def _disable_collection_io():
+    """Replace the collector functions and file writes with no-ops."""
+    for name in COLLECTOR_FUNCTIONS:
+        setattr(scheduler_module, name, lambda *args, **kwargs: {})
+    scheduler_module.get_namespaces_list = lambda *args, **kwargs: []
+    scheduler_module.get_resources_for_namespace = lambda *args, **kwargs: {}
+    scheduler_module._save_collected_data = lambda *args, **kwargs: None
+    scheduler_module._save_collection_history = lambda: None
+
+def _time_runs(func, runs):
+    """Run func repeatedly and return the mean duration in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) * 1000 / runs
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    logging.disable(logging.CRITICAL)
+    _disable_collection_io()
+
+    app = create_app()
+    threads_before = threading.active_count()
+
+    app_bootstrap_ms = _time_runs(create_app, runs)
+
+    def enter_app_context():
+        with app.app_context():
+            pass
+    app_context_ms = _time_runs(enter_app_context, runs)
+
+    collect_data_ms = _time_runs(scheduler_module.collect_data, runs)
+    threads_after = threading.active_count()
+
+    print(f"Runs:                         {runs}")
+    print(f"create_app() per run:         {app_bootstrap_ms:8.3f} ms  (previous per-run bootstrap)")
+    print(f"app_context() per run:        {app_context_ms:8.3f} ms  (long-lived app)")
+    print(f"collect_data() overhead:      {collect_data_ms:8.3f} ms  (no-op collectors)")
+    print(f"Threads before/after runs:    {threads_before} / {threads_after}")
+
+    scheduler_module.scheduler.shutdown(wait=False)
+
+if __name__ == '__main__':
+    main()
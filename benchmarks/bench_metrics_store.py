@@ -0,0 +1,73 @@
+"""
+Benchmark of the metrics store: disk footprint and range query latency.
+
+Records per-pod usage every minute for a few simulated days, then reports the
+bytes used per resolution, the projected size of a year of history with the
+default retentions (raw 7 days, hourly 90 days, daily 2 years), and the time
+to query pod usage series over a day and over the whole period.
+
+Run from the repository root:
+    python benchmarks/bench_metrics_store.py [pods] [days]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from app import metrics_store
+
+def _metrics(pods):
+    """Generate the usage of a node and of `pods` pods, as parsed from `oc adm top`."""
+    return {
+        'node_usage_list': [{'NAME': 'worker-0', 'CPU(cores)': f'{random.randint(500, 8000)}m', 'MEMORY(bytes)': f'{random.randint(8000, 30000)}Mi'}],
+        'pod_usage_list': [
+            {'NAMESPACE': f'ns-{pod % 20}', 'NAME': f'pod-{pod}', 'CPU(cores)': f'{random.randint(1, 500)}m', 'MEMORY(bytes)': f'{random.randint(20, 900)}Mi'}
+            for pod in range(pods)
+        ]
+    }
+
+def _time_ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+def main():
+    pods = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    logging.disable(logging.CRITICAL)
+
+    app = Flask(__name__, instance_path=tempfile.mkdtemp())
+    start = int(datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc).timestamp())
+    end = start + days * 86400
+    with app.app_context():
+        record_ms, _ = _time_ms(lambda: [
+            metrics_store.record_metrics('bench', _metrics(pods), timestamp)
+            for timestamp in range(start, end + 1, 60)
+        ])
+        samples = (days * 1440 + 1) * (pods + 1)
+        sizes = metrics_store.get_store_size('bench')
+
+        day_ms, day = _time_ms(lambda: metrics_store.query('bench', 'pod', end - 86400, end, limit=pods))
+        period_ms, period = _time_ms(lambda: metrics_store.query('bench', 'pod', start, end, resolution='1h', limit=pods))
+
+    per_day = {resolution: size / days for resolution, size in sizes.items()}
+    year = sum(per_day[resolution] * min(365, retention) for resolution, retention in metrics_store.DEFAULT_RETENTION.items())
+
+    print(f"Pods:                       {pods} (+1 node), every minute for {days} days")
+    print(f"Record per sample batch:    {record_ms / (days * 1440 + 1):8.3f} ms")
+    print(f"Raw bytes per sample:       {sizes['raw'] / samples:8.1f}")
+    for resolution in metrics_store.RESOLUTIONS:
+        print(f"{resolution:>4} per day:               {per_day[resolution] / 2 ** 20:8.2f} MiB")
+    print(f"Projected year on disk:     {year / 2 ** 20:8.1f} MiB")
+    print(f"Query 1 day, raw:           {day_ms:8.1f} ms  ({len(day['series'])} series)")
+    print(f"Query {days} days, hourly:       {period_ms:8.1f} ms  ({len(period['series'])} series)")
+
+if __name__ == '__main__':
+    main()
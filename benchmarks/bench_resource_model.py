@@ -0,0 +1,107 @@
+"""
+Benchmark of the compact resource model on a large snapshot.
+
+Builds the JSON of a synthetic snapshot (20,000 pods by default, with their
+events, PVCs, nodes and usage samples), loads it as the list query index and the
+collector do, and measures the memory held by the plain snapshot against the
+compacted one, and the time compacting takes.
+
+Run from the repository root:
+    python benchmarks/bench_resource_model.py [pods]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import resource_model
+
+STATUSES = ['Running'] * 8 + ['Pending', 'CrashLoopBackOff', 'Completed']
+REASONS = ['Scheduled', 'Pulled', 'Created', 'Started', 'BackOff', 'Unhealthy']
+
+def _build_json(pod_count):
+    """Build the JSON of a snapshot of a synthetic cluster."""
+    node_count = max(1, pod_count // 40)
+    namespaces = {}
+    for pod in range(pod_count):
+        namespace = f'ns-{pod % 200}'
+        app_name = f'app-{pod % 1000}'
+        namespaces.setdefault(namespace, {'pods': {'items': []}})['pods']['items'].append({
+            'apiVersion': 'v1',
+            'kind': 'Pod',
+            'metadata': {
+                'name': f'{app_name}-{pod}',
+                'namespace': namespace,
+                'labels': {'app': app_name, 'tier': random.choice(['web', 'api', 'db'])}
+            },
+            'spec': {
+                'nodeName': f'worker-{pod % node_count}',
+                'containers': [{'name': app_name, 'image': f'registry.example.com/{app_name}:1.{pod % 5}'}]
+            },
+            'status': {'phase': random.choice(STATUSES), 'podIP': f'10.{pod // 65536 % 256}.{pod // 256 % 256}.{pod % 256}'}
+        })
+    events = [{
+        'namespace': f'ns-{event % 200}',
+        'name': f'app-{event % 1000}-{event}',
+        'type': 'Warning' if event % 7 == 0 else 'Normal',
+        'reason': random.choice(REASONS),
+        'message': f'Container image "registry.example.com/app-{event % 1000}:1.{event % 5}" already present on machine',
+        'last_seen': f'{event % 60}m'
+    } for event in range(pod_count)]
+    data = {
+        'nodes': {'list': [{
+            'NAME': f'worker-{node}', 'STATUS': 'Ready', 'ROLES': 'worker', 'AGE': '120d', 'VERSION': 'v1.27.6'
+        } for node in range(node_count)]},
+        'storage': {'pvc_summary_list': [{
+            'NAMESPACE': f'ns-{pvc % 200}', 'NAME': f'data-{pvc}', 'STATUS': 'Bound', 'VOLUME': f'pvc-{pvc:08x}',
+            'CAPACITY': '10Gi', 'ACCESS MODES': 'RWO', 'STORAGECLASS': 'gp3-csi', 'AGE': '30d'
+        } for pvc in range(pod_count // 10)]},
+        'events': {'events_list': events, 'warning_events_list': [event for event in events if event['type'] == 'Warning']},
+        'metrics': {
+            'node_usage_list': [{'NAME': f'worker-{node}', 'CPU(cores)': '2000m', 'MEMORY(bytes)': '12000Mi'} for node in range(node_count)],
+            'pod_usage_list': [{
+                'NAMESPACE': f'ns-{pod % 200}', 'NAME': f'app-{pod % 1000}-{pod}',
+                'CPU(cores)': f'{random.randint(1, 900)}m', 'MEMORY(bytes)': f'{random.randint(10, 2000)}Mi'
+            } for pod in range(pod_count)]
+        },
+        'namespace_resources': namespaces
+    }
+    return json.dumps(data)
+
+def _measure(load):
+    """Get the result of load, the memory it holds (bytes) and the time it took (ms)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, elapsed_ms
+
+def main():
+    pod_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    raw = _build_json(pod_count)
+
+    plain, plain_bytes, _ = _measure(lambda: json.loads(raw))
+    del plain
+    compacted, compact_bytes, _ = _measure(lambda: resource_model.compact_snapshot(json.loads(raw)))
+    del compacted
+
+    data = json.loads(raw)
+    start = time.perf_counter()
+    resource_model.compact_snapshot(data)
+    compact_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Pods:                    {pod_count}")
+    print(f"Snapshot JSON:           {len(raw) / 1024 / 1024:8.1f} MiB")
+    print(f"Plain snapshot:          {plain_bytes / 1024 / 1024:8.1f} MiB")
+    print(f"Compacted snapshot:      {compact_bytes / 1024 / 1024:8.1f} MiB ({compact_bytes / plain_bytes:.0%})")
+    print(f"compact_snapshot():      {compact_ms:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of loading a single section of a large snapshot.
+
+Writes a synthetic snapshot (50,000 events and pods by default, plus a small
+etcd section) as a collection file with its section index, and times getting
+the etcd section by loading the whole file, against opening it as a
+SnapshotFile, which parses that section alone.
+
+Run from the repository root:
+    python benchmarks/bench_snapshot_file.py [objects]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import snapshot_file
+
+def _build_snapshot(object_count):
+    """Build a snapshot with large events and pod usage sections and a small etcd section."""
+    return {
+        'events': {'events_list': [{
+            'namespace': f'ns-{event % 200}', 'name': f'app-{event}', 'type': 'Normal', 'reason': 'Pulled',
+            'message': f'Container image "registry.example.com/app-{event % 1000}:1.0" already present on machine'
+        } for event in range(object_count)]},
+        'metrics': {'pod_usage_list': [{
+            'NAMESPACE': f'ns-{pod % 200}', 'NAME': f'app-{pod}', 'CPU(cores)': '12m', 'MEMORY(bytes)': '256Mi'
+        } for pod in range(object_count)]},
+        'etcd': {'health': 'healthy', 'members': [f'etcd-{member}' for member in range(3)]}
+    }
+
+def main():
+    object_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collection_file = os.path.join(tmp_dir, 'collection_20260301_100000.json')
+        start = time.perf_counter()
+        snapshot_file.write(collection_file, _build_snapshot(object_count))
+        write_ms = (time.perf_counter() - start) * 1000
+
+        runs = 5
+        start = time.perf_counter()
+        for _ in range(runs):
+            with open(collection_file) as f:
+                json.load(f)['etcd']
+        full_ms = (time.perf_counter() - start) * 1000 / runs
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            snapshot_file.SnapshotFile(collection_file)['etcd']
+        lazy_ms = (time.perf_counter() - start) * 1000 / runs
+
+        print(f"Objects:                 {object_count}")
+        print(f"Collection file:         {os.path.getsize(collection_file) / 1024 / 1024:8.1f} MiB")
+        print(f"write():                 {write_ms:8.1f} ms")
+        print(f"etcd, whole file:        {full_ms:8.1f} ms")
+        print(f"etcd, SnapshotFile:      {lazy_ms:8.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the table parser on large `oc get` outputs.
+
+Builds the `oc get pods -A -o wide` output of a synthetic cluster (100,000 pods
+by default), aligned like oc prints it, and times parsing it into columns and
+into rows, against splitting each line on whitespace (which misparses the
+NOMINATED NODE and READINESS GATES headers).
+
+Run from the repository root:
+    python benchmarks/bench_table_parser.py [pods]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collector.table_parser import parse_table, parse_table_columns
+
+HEADER = ['NAMESPACE', 'NAME', 'READY', 'STATUS', 'RESTARTS', 'AGE', 'IP', 'NODE', 'NOMINATED NODE', 'READINESS GATES']
+STATUSES = ['Running'] * 8 + ['Pending', 'CrashLoopBackOff', 'Completed']
+
+def _build_output(pod_count):
+    """Build the output of `oc get pods -A -o wide`, padded like the oc table writer."""
+    rows = [HEADER]
+    for pod in range(pod_count):
+        restarts = random.randint(0, 40)
+        rows.append([
+            f'ns-{pod % 400}', f'app-{pod % 900}-{pod:x}-7f9c', '1/1', random.choice(STATUSES),
+            f'{restarts} (3h ago)' if restarts else '0', f'{random.randint(1, 90)}d',
+            f'10.128.{pod // 250 % 256}.{pod % 250}', f'worker-{pod % 500}', '<none>', '<none>'
+        ])
+    widths = [max(len(row[column]) for row in rows) for column in range(len(HEADER))]
+    return '\n'.join(
+        '   '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows
+    ) + '\n'
+
+def _split_parse(raw_output):
+    """The previous parser: split the header and each line on whitespace."""
+    lines = raw_output.strip().split('\n')
+    header = lines[0].split()
+    return [dict(zip(header, line.split(None, len(header) - 1))) for line in lines[1:]]
+
+def _time(function, *args, runs=5):
+    """Average time of a call in milliseconds, and its result."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = function(*args)
+    return (time.perf_counter() - start) * 1000 / runs, result
+
+def main():
+    pod_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    raw_output = _build_output(pod_count)
+
+    columns_ms, columns = _time(parse_table_columns, raw_output)
+    rows_ms, rows = _time(parse_table, raw_output)
+    split_ms, split_rows = _time(_split_parse, raw_output)
+
+    print(f"Lines / size:                 {pod_count} / {len(raw_output) / 1e6:.1f} MB")
+    print(f"parse_table_columns():        {columns_ms:8.1f} ms")
+    print(f"parse_table():                {rows_ms:8.1f} ms")
+    print(f"whitespace split (previous):  {split_ms:8.1f} ms")
+    print(f"Restarted pods:               {sum(1 for value in columns['RESTARTS'] if value != '0')}")
+    print(f"Columns parsed / split:       {len(rows[0])} / {len(split_rows[0])} "
+          f"(split RESTARTS of a restarted pod: {next(row['RESTARTS'] for row in split_rows if row['RESTARTS'] != '0')!r})")
+
+if __name__ == '__main__':
+    main()
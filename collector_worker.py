@@ -0,0 +1,23 @@
+"""
+Collector worker entry point.
+Run this file to collect data in a dedicated process, with the web workers
+started with ENABLE_EMBEDDED_SCHEDULER=false.
+"""
+
+import os
+import signal
+import sys
+from app import create_app
+from app.worker import run_worker
+from config import DevelopmentConfig, ProductionConfig
+
+# Determine which configuration to use based on environment
+if os.environ.get('FLASK_ENV') == 'production':
+    app = create_app(ProductionConfig, start_scheduler=False)
+else:
+    app = create_app(DevelopmentConfig, start_scheduler=False)
+
+if __name__ == '__main__':
+    # Stop cleanly when the container is stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    run_worker(app)
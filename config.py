@@ -30,6 +30,61 @@ class Config:
     COLLECTION_TIMEOUT = int(os.environ.get('COLLECTION_TIMEOUT', 60))  # Timeout for collection commands
     RETRY_ATTEMPTS = int(os.environ.get('RETRY_ATTEMPTS', 2))  # Number of retry attempts
     RETRY_DELAY = int(os.environ.get('RETRY_DELAY', 2))  # Delay between retries
+    OC_QPS = float(os.environ.get('OC_QPS', 10))  # Maximum rate of oc commands per second, per cluster
+    OC_BURST = int(os.environ.get('OC_BURST', 20))  # Number of oc commands allowed in a burst above OC_QPS
+    OC_MAX_INFLIGHT = int(os.environ.get('OC_MAX_INFLIGHT', 4))  # Maximum oc commands running at the same time, per cluster
+    OC_RETRY_BUDGET = int(os.environ.get('OC_RETRY_BUDGET', 30))  # Maximum retries per minute, per cluster
+    RETRY_MAX_DELAY = int(os.environ.get('RETRY_MAX_DELAY', 30))  # Upper bound of the backoff between retries in seconds
+    CIRCUIT_BREAKER_THRESHOLD = float(os.environ.get('CIRCUIT_BREAKER_THRESHOLD', 0.5))  # Error rate above which commands fail fast
+    CIRCUIT_BREAKER_MIN_REQUESTS = int(os.environ.get('CIRCUIT_BREAKER_MIN_REQUESTS', 20))  # Requests in the window before the breaker may open
+    CIRCUIT_BREAKER_WINDOW = int(os.environ.get('CIRCUIT_BREAKER_WINDOW', 60))  # Sliding window of the error rate in seconds
+    CIRCUIT_BREAKER_COOLDOWN = int(os.environ.get('CIRCUIT_BREAKER_COOLDOWN', 30))  # Seconds before a trial request once the breaker opened
+    STAGING_MAX_AGE = int(os.environ.get('STAGING_MAX_AGE', 86400))  # Seconds within which an interrupted collection run is resumed rather than restarted
+
+    # Section scheduling settings
+    SECTION_SCHEDULING = os.environ.get('SECTION_SCHEDULING', 'true').lower() == 'true'  # Refresh each section on its own schedule instead of collecting everything at once
+    SECTION_INTERVALS = {  # Refresh interval overrides in seconds, e.g. SECTION_INTERVALS="events=120,nodes=600"
+        section: int(interval) for section, interval in
+        (item.split('=') for item in os.environ.get('SECTION_INTERVALS', '').split(',') if item)
+    }
+    ADAPTIVE_SCHEDULING = os.environ.get('ADAPTIVE_SCHEDULING', 'false').lower() == 'true'  # Refresh sections that don't change less often
+    NAMESPACE_SHARDS = int(os.environ.get('NAMESPACE_SHARDS', 12))  # Namespace resources are refreshed in this many shards over the collection interval
+    NAMESPACE_MISS_REFRESH_INTERVAL = int(os.environ.get('NAMESPACE_MISS_REFRESH_INTERVAL', 60))  # Seconds between the refreshes queued for a namespace missing from the snapshot
+    SNAPSHOT_RETENTION_DAYS = int(os.environ.get('SNAPSHOT_RETENTION_DAYS', 7))  # Days of collection files kept, besides the latest (0 to keep all)
+    METRICS_RETENTION = {  # Days of usage metrics kept per resolution, e.g. METRICS_RETENTION="raw=14,1d=365"
+        resolution: int(days) for resolution, days in
+        (item.split('=') for item in os.environ.get('METRICS_RETENTION', '').split(',') if item)
+    }
+    FLEET_INDEX_RETENTION_DAYS = int(os.environ.get('FLEET_INDEX_RETENTION_DAYS', 30))  # Days of snapshot aggregates kept in the fleet index
+    EVENT_RETENTION_DAYS = int(os.environ.get('EVENT_RETENTION_DAYS', 7))  # Days of events kept in the event store
+    EVENT_WATCH = os.environ.get('EVENT_WATCH', 'true').lower() == 'true'  # Stream events into the event store with a watch on each cluster
+    EVENT_WATCH_TIMEOUT = int(os.environ.get('EVENT_WATCH_TIMEOUT', 300))  # Seconds a watch runs before it is restarted (and the events relisted)
+    LIVE_STREAM_TIMEOUT = int(os.environ.get('LIVE_STREAM_TIMEOUT', 60))  # Seconds a live update stream stays open before the browser reconnects
+    LIVE_MAX_STREAMS = int(os.environ.get('LIVE_MAX_STREAMS', 8))  # Live update streams open at the same time per web worker (each holds a thread); others retry later
+    PAGE_CACHE = os.environ.get('PAGE_CACHE', 'true').lower() == 'true'  # Serve the snapshot pages pre-rendered after each collection
+    CERT_PARSE_WORKERS = int(os.environ.get('CERT_PARSE_WORKERS', 4))  # Processes parsing the certificates of the expiry inventory (0 to parse in-process)
+    ETCD_MEMBER_TIMEOUT = int(os.environ.get('ETCD_MEMBER_TIMEOUT', 10))  # Seconds each etcd member check may take (members are checked concurrently)
+    ETCD_CACHE_TTL = int(os.environ.get('ETCD_CACHE_TTL', 30))  # Seconds the etcd member checks are reused rather than run again
+    CERT_EXPIRY_WARNING_DAYS = int(os.environ.get('CERT_EXPIRY_WARNING_DAYS', 30))  # Certificates expiring within this many days are reported as Expiring
+
+    # Multi-cluster settings
+    CLUSTER_REGISTRY = os.environ.get('CLUSTER_REGISTRY')  # Cluster registry file (defaults to instance/clusters.json)
+    COLLECTION_CONCURRENCY = int(os.environ.get('COLLECTION_CONCURRENCY', 4))  # Maximum number of clusters collected at the same time
+    COLLECTION_HISTORY_SIZE = int(os.environ.get('COLLECTION_HISTORY_SIZE', 50))  # Number of collection runs kept in the history, across clusters
+    SCHEDULER_EXECUTORS = {  # Enough scheduler threads for the collections waiting for a slot
+        'default': {'type': 'threadpool', 'max_workers': 2 * COLLECTION_CONCURRENCY + 2}
+    }
+    SCHEDULER_JOB_DEFAULTS = {'misfire_grace_time': None}  # Run jobs that waited for a thread late rather than skipping them
+
+    # Collector worker settings
+    ENABLE_EMBEDDED_SCHEDULER = os.environ.get('ENABLE_EMBEDDED_SCHEDULER', 'true').lower() == 'true'  # Run collections in the web process (false when a collector worker runs them)
+    WORKER_POLL_INTERVAL = int(os.environ.get('WORKER_POLL_INTERVAL', 5))  # Seconds between the collector worker's checks for requests from the web UI
+    WORKER_STANDBY_INTERVAL = int(os.environ.get('WORKER_STANDBY_INTERVAL', 30))  # Seconds between a standby collector worker's attempts to take over
+
+    # Export settings
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))  # Number of worker processes rendering export jobs
+    EXPORT_QUEUE_SIZE = int(os.environ.get('EXPORT_QUEUE_SIZE', 10))  # Maximum number of export jobs in progress per web worker
+    PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 4))  # Processes rendering PDF report parts in parallel (0 for a single pass)
 
     # Feature flags
     ENABLE_CLOUD_COLLECTION = os.environ.get('ENABLE_CLOUD_COLLECTION', 'False').lower() == 'true'
@@ -2,8 +2,9 @@ import pytest
 from app import create_app
 
 @pytest.fixture
-def client():
-    app = create_app()
+def client(tmp_path):
+    # Keep the stores and collected data the app creates out of the repository's instance folder
+    app = create_app(instance_path=str(tmp_path))
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -0,0 +1,90 @@
+import json
+import numpy as np
+from flask import Flask
+from app import capacity
+
+def _description(allocatable_cpu, pods):
+    rows = '\n'.join(
+        f'  {namespace}  {name}  {cpu_request} (1%)  {cpu_limit} (2%)  {memory_request} (1%)  {memory_limit} (2%)  3d'
+        for namespace, name, cpu_request, cpu_limit, memory_request, memory_limit in pods
+    )
+    return f"""Name:               worker
+Capacity:
+  cpu:                16
+  memory:             64Gi
+  pods:               250
+Allocatable:
+  cpu:                {allocatable_cpu}
+  memory:             60Gi
+  pods:               250
+System Info:
+  Kernel Version:     5.14.0
+Non-terminated Pods:          ({len(pods)} in total)
+  Namespace  Name  CPU Requests  CPU Limits  Memory Requests  Memory Limits  Age
+  ---------  ----  ------------  ----------  ---------------  -------------  ---
+{rows}
+Allocated resources:
+  (Total limits may be over 100 percent, i.e., overcommitted.)
+"""
+
+def test_parse_quantities():
+    values = capacity.parse_quantities(['250m', '1Gi', '2', '1.5k', '100Mi', 'bogus', '1e3'])
+    assert values[:5].tolist() == [0.25, 2 ** 30, 2.0, 1500.0, 100 * 2 ** 20]
+    assert np.isnan(values[5])
+    assert values[6] == 1000.0
+
+def test_analyze_requests_limits_usage_and_headroom():
+    data = {
+        'nodes': {'details': {
+            'worker-0': _description('8', [
+                ('app', 'web-1', '2', '4', '4Gi', '8Gi'),
+                ('app', 'web-2', '2', '4', '4Gi', '8Gi'),
+            ]),
+            'worker-1': _description('8000m', [
+                ('db', 'pg-0', '1', '0', '16Gi', '0'),
+            ])
+        }},
+        'metrics': {
+            'node_usage_list': [{'NAME': 'worker-0', 'CPU(cores)': '3000m', 'MEMORY(bytes)': '10Gi'}],
+            'pod_usage_list': [
+                {'NAMESPACE': 'app', 'NAME': 'web-1', 'CPU(cores)': '500m', 'MEMORY(bytes)': '1Gi'},
+                {'NAMESPACE': 'db', 'NAME': 'pg-0', 'CPU(cores)': '250m', 'MEMORY(bytes)': '2Gi'}
+            ]
+        }
+    }
+    result = capacity.analyze(data, reference_pod={'cpu': 2, 'memory': 4 * 2 ** 30})
+
+    nodes = {node['name']: node for node in result['nodes']}
+    assert nodes['worker-0']['cpu_requests'] == 4
+    assert nodes['worker-0']['cpu_limit_ratio'] == 1.0
+    assert nodes['worker-0']['cpu_usage'] == 0.5
+    assert nodes['worker-0']['node_cpu_utilization'] == 0.375
+    assert nodes['worker-0']['reference_pods_fit'] == 2
+    assert nodes['worker-1']['reference_pods_fit'] == 3
+    assert nodes['worker-1']['node_cpu_usage'] is None
+
+    assert result['cluster']['pods'] == 3
+    assert result['cluster']['allocatable_cpu'] == 16
+    assert result['cluster']['cpu_requests'] == 5
+    assert result['cluster']['cpu_usage'] == 0.75
+    assert result['cluster']['reference_pods_fit'] == 5
+    assert result['pods_without_limits'] == 1
+
+    assert [namespace['namespace'] for namespace in result['namespaces']] == ['app', 'db']
+    assert result['namespaces'][1]['memory_usage_to_request'] == 0.125
+
+def test_analysis_cache_is_bounded(tmp_path, monkeypatch):
+    app = Flask('app', instance_path=str(tmp_path))
+    capacity.init_app(app)
+    data_dir = tmp_path / 'collected_data'
+    data_dir.mkdir()
+    snapshot = {'nodes': {'details': {'worker': _description('4', [('app', 'web', '500m', '1', '1Gi', '2Gi')])}}}
+    (data_dir / 'collection_20260301_100000.json').write_text(json.dumps(snapshot))
+    monkeypatch.setattr(capacity, '_analysis_cache', capacity.OrderedDict())
+    monkeypatch.setattr(capacity, 'ANALYSIS_CACHE_SIZE', 2)
+
+    client = app.test_client()
+    assert client.get('/api/v2/capacity?namespaces=-1').status_code == 400
+    for cpu in ('100m', '200m', '300m', '100m'):
+        assert client.get(f'/api/v2/capacity?cpu={cpu}').get_json()['success']
+    assert [dict(key[1])['cpu'] for key in capacity._analysis_cache] == [0.3, 0.1]
@@ -0,0 +1,70 @@
+import datetime
+from app.collector import certificates
+
+# api.example.com (an X.509 v1 certificate), signed by the CA below
+LEAF_PEM = """-----BEGIN CERTIFICATE-----
+MIIB0zCCATwCFCXeY3/er2L9+5L/bK0XdWttTrABMA0GCSqGSIb3DQEBCwUAMDcx
+EjAQBgNVBAoMCW9wZW5zaGlmdDEhMB8GA1UEAwwYa3ViZS1hcGlzZXJ2ZXItbGIt
+c2lnbmVyMB4XDTI2MTAxOTE5MjMzNVoXDTI2MTEyODE5MjMzNVowGjEYMBYGA1UE
+AwwPYXBpLmV4YW1wbGUuY29tMIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDk
+57gFZZu3keA2elnBTT9QFI1BITiksi/Liw4AjIH62L0Bjp/Xhhx7tGqLo4hJp9vG
+5jKja3ouwWU1157GGZXq+u14xAzrbKuego0h+sxFA/QS7zZWUGOFZllaf2Zjfz6q
+ntiw0BBXUNFyulHabj1rnrGa0kwVd+jMv7zTziZzrQIDAQABMA0GCSqGSIb3DQEB
+CwUAA4GBAKN/VQO851zMo8CmzTXZZ0mZvSdUFdvOPe56D94P9URskCfVr7S/MWRO
+mgQtlXnnBAGvRwtFtrB+4ViVnRWs5/uZMJ3Q49+AytQiC6QFFyMPLXy+qxiOMJDS
+bUSUh2G3Q1Ez/6IaSPiWvUbeotVdkmmQqBaBZr/OEAwOD47TjoGT
+-----END CERTIFICATE-----
+"""
+
+CA_PEM = """-----BEGIN CERTIFICATE-----
+MIICSjCCAbOgAwIBAgIUCV2UxIPfHZnQ8Ozk6bpjQ35F9NQwDQYJKoZIhvcNAQEL
+BQAwNzESMBAGA1UECgwJb3BlbnNoaWZ0MSEwHwYDVQQDDBhrdWJlLWFwaXNlcnZl
+ci1sYi1zaWduZXIwHhcNMjYxMDE5MTkyMzM1WhcNMzYxMDE2MTkyMzM1WjA3MRIw
+EAYDVQQKDAlvcGVuc2hpZnQxITAfBgNVBAMMGGt1YmUtYXBpc2VydmVyLWxiLXNp
+Z25lcjCBnzANBgkqhkiG9w0BAQEFAAOBjQAwgYkCgYEAupfBpKR/RVAQEEWkuOpO
+BrRtIwxbIYgYd3qucyxaiVwVuFfMyISLgCSQzyEpc0rmK8I1NIBIu5K4WKh7/YO6
+gslMngWvsrMvW2bYuqRuWA1umF4UkR7BFIgpaacODbzS5nurnbRxQlotch2bLM8d
+iUM8pWS49wzdRusG+uTwTD8CAwEAAaNTMFEwHQYDVR0OBBYEFPLPlSjOt7ECrrOj
+sIvfOVWcgCVIMB8GA1UdIwQYMBaAFPLPlSjOt7ECrrOjsIvfOVWcgCVIMA8GA1Ud
+EwEB/wQFMAMBAf8wDQYJKoZIhvcNAQELBQADgYEAh6sVXAf0V9H8MkSD3uN6+lOH
+7tBRFUteV8Asuzp3Trx0oWVcMIn1LHaV+ELYnEU7VxoAF5zOAFMhZTND+oq2llPX
+b1vf2qpnNos5inxvQlia+H/sm8OnrsK18QcvvmjvxTzdTxJWcXx0851oMb553deu
+f3VrhJDNLlxOfkrsfCA=
+-----END CERTIFICATE-----
+"""
+
+def test_pem_chains_are_parsed_in_process():
+    leaf, ca = certificates.split_pem(LEAF_PEM + CA_PEM)
+    assert certificates.parse_certificate(leaf) == {
+        'subject': 'CN=api.example.com',
+        'issuer': 'O=openshift, CN=kube-apiserver-lb-signer',
+        'serial': '25de637fdeaf62fdfb92ff6cad17756b6d4eb001',
+        'not_before': '2026-10-19T19:23:35Z',
+        'not_after': '2026-11-28T19:23:35Z'
+    }
+    parsed = certificates.parse_certificate(ca)
+    assert parsed['subject'] == parsed['issuer'] and parsed['not_after'] == '2036-10-16T19:23:35Z'
+
+def test_expiry_table_is_sorted_and_unchanged_certificates_are_not_reparsed(monkeypatch):
+    sources = [
+        {'KIND': 'ConfigMap', 'NAMESPACE': 'openshift-config', 'NAME': 'admin-kubeconfig-client-ca', 'KEY': 'ca-bundle.crt', 'PEM': CA_PEM},
+        {'KIND': 'Secret', 'NAMESPACE': 'openshift-ingress', 'NAME': 'router-certs', 'KEY': 'tls.crt', 'PEM': LEAF_PEM + CA_PEM},
+        {'KIND': 'Secret', 'NAMESPACE': 'app', 'NAME': 'broken', 'KEY': 'tls.crt', 'PEM': CA_PEM.replace('MIICSjCCAbOg', 'MIIC')}
+    ]
+    now = datetime.datetime(2026, 11, 20)
+    rows, summary = certificates.build_expiry_table(sources, warning_days=30, now=now)
+    assert [(row['NAME'], row['INDEX'], row['STATUS']) for row in rows] == [
+        ('router-certs', 0, 'Expiring'),
+        ('admin-kubeconfig-client-ca', 0, 'Valid'),
+        ('router-certs', 1, 'Valid'),
+        ('broken', 0, 'Unparseable')
+    ]
+    assert rows[0]['DAYS_LEFT'] == 8 and rows[1]['FINGERPRINT'] == rows[2]['FINGERPRINT']
+    assert summary == {'total': 4, 'expired': 0, 'expiring': 1, 'unparseable': 1, 'warning_days': 30, 'next_expiry': '2026-11-28T19:23:35Z'}
+
+    # A later scan only parses the certificates not seen before
+    def parse_certificate(der):
+        raise AssertionError('cached certificate parsed again')
+    monkeypatch.setattr(certificates, 'parse_certificate', parse_certificate)
+    later_rows, _ = certificates.build_expiry_table(sources, now=now + datetime.timedelta(days=10))
+    assert [row['STATUS'] for row in later_rows] == ['Expired', 'Valid', 'Valid', 'Unparseable']
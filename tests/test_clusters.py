@@ -0,0 +1,18 @@
+import os
+import yaml
+from flask import Flask
+from app import clusters
+
+def test_context_kubeconfig_follows_the_registered_context(tmp_path):
+    app = Flask('app', instance_path=str(tmp_path))
+    source = tmp_path / 'kubeconfig'
+    source.write_text(yaml.safe_dump({'contexts': [{'name': 'east'}, {'name': 'west'}], 'current-context': 'east'}))
+    with app.app_context():
+        east = clusters._get_context_kubeconfig({'name': 'prod', 'kubeconfig': str(source), 'context': 'east'})
+        assert clusters._get_context_kubeconfig({'name': 'prod', 'kubeconfig': str(source), 'context': 'east'}) == east
+
+        # Registered again with another context of the same kubeconfig
+        west = clusters._get_context_kubeconfig({'name': 'prod', 'kubeconfig': str(source), 'context': 'west'})
+        with open(west) as f:
+            assert yaml.safe_load(f)['current-context'] == 'west'
+        assert not os.path.exists(east)
@@ -0,0 +1,70 @@
+import json
+import time
+import pytest
+from flask import Flask
+from app.collector import openshift_collector
+
+MEMBER_IDS = {'10.0.0.1': 0x8e9e05c52164694d, '10.0.0.2': 0x91bc3c398fb3c146, '10.0.0.3': 0xfd422379fda50e48}
+
+def _pod(name, ip, phase='Running'):
+    return {'metadata': {'name': name}, 'spec': {'nodeName': f'master-{name[-1]}'}, 'status': {'phase': phase, 'podIP': ip}}
+
+PODS = {'items': [_pod('etcd-master-1', '10.0.0.1'), _pod('etcd-master-2', '10.0.0.2'), _pod('etcd-master-3', '10.0.0.3')]}
+
+def _member_output(ip):
+    """Output of the member check script: endpoint status, endpoint health and member list."""
+    endpoint = f'https://{ip}:2379'
+    status = [{'Endpoint': endpoint, 'Status': {
+        'header': {'member_id': MEMBER_IDS[ip], 'raft_term': 7}, 'version': '3.5.9', 'dbSize': 104857600,
+        'leader': MEMBER_IDS['10.0.0.1'], 'raftIndex': 4242, 'raftTerm': 7, 'raftAppliedIndex': 4242, 'dbSizeInUse': 52428800
+    }}]
+    health = [{'endpoint': endpoint, 'health': True, 'took': '9.5ms'}]
+    members = {'header': {}, 'members': [
+        {'ID': member_id, 'name': f'master-{ip[-1]}', 'peerURLs': [f'https://{ip}:2380'], 'clientURLs': [f'https://{ip}:2379']}
+        for ip, member_id in MEMBER_IDS.items()
+    ]}
+    return '\n'.join(json.dumps(value) for value in (status, health, members))
+
+@pytest.fixture
+def fake_oc(monkeypatch):
+    calls = []
+    def run_oc_command(args, kubeconfig_path=None, parse_output=None, retries=2, timeout=60, **kwargs):
+        calls.append(args)
+        if args[0] == 'get':
+            return True, PODS, None
+        pod, script = args[3], args[-1]
+        assert timeout == 10 and retries == 0
+        if pod == 'etcd-master-3':
+            # A wedged member: its exec times out
+            time.sleep(0.2)
+            return False, None, 'Command timed out after retries'
+        ip = script.split('--endpoints=https://')[1].split(':')[0]
+        return True, _member_output(ip), None
+    monkeypatch.setattr(openshift_collector, '_run_oc_command', run_oc_command)
+    openshift_collector._etcd_cache.clear()
+    app = Flask('app')
+    app.config.update(ETCD_MEMBER_TIMEOUT=10, ETCD_CACHE_TTL=30)
+    with app.app_context():
+        yield calls
+
+def test_members_are_checked_concurrently_and_in_isolation(fake_oc):
+    etcd = openshift_collector.get_etcd_info()
+    first, _, wedged = etcd['members']
+    assert first['HEALTHY'] and first['LEADER'] and first['MEMBER_ID'] == '8e9e05c52164694d'
+    assert (first['DB_SIZE'], first['RAFT_INDEX'], first['TOOK']) == (104857600, 4242, '9.5ms')
+    assert not wedged['HEALTHY'] and wedged['ERROR'] == 'Command timed out after retries'
+    assert etcd['summary'] == {'members': 3, 'healthy': 2, 'has_quorum': True, 'leader': 'etcd-master-1', 'raft_index_spread': 0}
+    assert [entry['NAME'] for entry in etcd['member_list']] == ['master-1', 'master-2', 'master-3']
+
+def test_checks_are_cached_briefly(fake_oc):
+    openshift_collector.get_etcd_info()
+    assert len(fake_oc) == 4
+    assert openshift_collector.get_etcd_info()['summary']['healthy'] == 2
+    assert len(fake_oc) == 4
+
+    # Once the cache expired, the members are checked again
+    key = next(iter(openshift_collector._etcd_cache))
+    checked, data = openshift_collector._etcd_cache[key]
+    openshift_collector._etcd_cache[key] = (checked - 31, data)
+    openshift_collector.get_etcd_info()
+    assert len(fake_oc) == 8
@@ -0,0 +1,79 @@
+import json
+import pytest
+from flask import Flask
+from app import event_store
+from app.collector.openshift_collector import _parse_event, _iter_json_objects
+
+def _event(uid, namespace, reason, last_seen, count=1, event_type='Warning', name='web-1'):
+    return {
+        'metadata': {'uid': uid, 'namespace': namespace, 'name': f'{name}.{uid}'},
+        'involvedObject': {'kind': 'Pod', 'name': name, 'namespace': namespace},
+        'type': event_type,
+        'reason': reason,
+        'message': f'{reason} on {name}',
+        'source': {'component': 'kubelet'},
+        'count': count,
+        'firstTimestamp': '2026-03-01T10:00:00Z',
+        'lastTimestamp': last_seen
+    }
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    with app.app_context():
+        event_store.init_store()
+        yield app
+
+def test_watch_stream_is_decoded_into_event_entries():
+    stream = ''.join(
+        json.dumps({'type': 'ADDED', 'object': _event(uid, 'app', 'BackOff', '2026-03-01T10:05:00Z')}, indent=4) + '\n'
+        for uid in ('a', 'b')
+    )
+    objects = list(_iter_json_objects(line + '\n' for line in stream.split('\n')))
+    assert [obj['object']['metadata']['uid'] for obj in objects] == ['a', 'b']
+
+    event = _parse_event(objects[0]['object'])
+    assert event['OBJECT'] == 'pod/web-1'
+    assert event['NAMESPACE'] == 'app'
+    assert event['SOURCE'] == 'kubelet'
+    assert event['LASTSEEN'] == '2026-03-01T10:05:00Z'
+
+def test_events_are_deduplicated_filtered_and_paged(app):
+    events = [_parse_event(_event(f'e{i}', 'app' if i % 2 else 'db', 'BackOff', f'2026-03-01T10:{i:02d}:00Z')) for i in range(10)]
+    assert event_store.ingest('c1', events) == 10
+    # The same events again change nothing; a recurrence updates the stored event
+    assert event_store.ingest('c1', events) == 0
+    recurred = _parse_event(_event('e0', 'db', 'BackOff', '2026-03-01T11:00:00Z', count=4))
+    assert event_store.ingest('c1', [recurred]) == 1
+
+    page = event_store.query_events('c1', namespace='db', limit=3)
+    assert page['total'] == 5
+    assert [event['UID'] for event in page['events']] == ['e0', 'e8', 'e6']
+    assert page['events'][0]['COUNT'] == 4
+    page = event_store.query_events('c1', namespace='db', limit=3, cursor=page['next_cursor'])
+    assert [event['UID'] for event in page['events']] == ['e4', 'e2']
+    assert page['next_cursor'] is None
+
+    assert event_store.query_events('c2')['total'] == 0
+    buckets = event_store.count_by_bucket('c1', event_store._parse_time('2026-03-01T00:00:00Z'))
+    assert [(bucket['start'], bucket['events'], bucket['count']) for bucket in buckets] == [
+        ('2026-03-01T10:00:00Z', 9, 9), ('2026-03-01T11:00:00Z', 1, 4)
+    ]
+
+def test_events_endpoint_rejects_only_invalid_cursors(app, monkeypatch):
+    from app import clusters
+    from app.routes import main_bp
+    app.register_blueprint(main_bp)
+    clusters.init_app(app)
+    event_store.ingest('default', [_parse_event(_event('a', 'app', 'BackOff', '2026-03-01T10:05:00Z'))])
+    client = app.test_client()
+
+    assert client.get('/api/v2/events?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/v2/events?cursor=1772359500:1').status_code == 200
+
+    # Other errors of the query are not reported as an invalid cursor
+    def query_events(cluster, **filters):
+        raise ValueError('database disk image is malformed')
+    monkeypatch.setattr(event_store, 'query_events', query_events)
+    response = client.get('/api/v2/events')
+    assert response.status_code == 500 and 'malformed' in response.json['error']
@@ -0,0 +1,73 @@
+import os
+import gzip
+import json
+import pytest
+from flask import Flask
+from app import clusters, export
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask('app', instance_path=str(tmp_path))
+    app.config['SERVER_NAME'] = 'localhost'
+    clusters.init_app(app)
+    with app.app_context():
+        export.init_app(app)
+        (tmp_path / 'collected_data').mkdir()
+        yield app
+
+def _save_snapshot(app, snapshot_id, data):
+    with open(os.path.join(app.instance_path, 'collected_data', f'{snapshot_id}.json'), 'w') as f:
+        json.dump(data, f)
+
+def test_cached_report_is_not_rendered_again(app, monkeypatch):
+    _save_snapshot(app, 'collection_20260301_100000', {'nodes': {'list': []}})
+    renders = []
+
+    def render_report(collection_file, export_file, format_type, **options):
+        renders.append(options)
+        with open(export_file, 'w') as f:
+            f.write('<html></html>')
+        return ['nodes']
+    monkeypatch.setattr(export, 'render_report', render_report)
+
+    first, _ = export.generate_html_report(title='Report')
+    assert export.generate_html_report(title='Report') == (first, None)
+    assert len(renders) == 1
+
+    # Other render options are another report
+    other, _ = export.generate_html_report(title='Report', include_charts=False)
+    assert other != first and len(renders) == 2
+    assert export._report_cache_key('collection_20260301_100000', 'html', title='Report') != \
+        export._report_cache_key('collection_20260301_100000', 'html', title='Report', include_raw_data=True)
+
+    # Once a new snapshot replaced it, the reports of the previous snapshot are no longer served from the cache
+    export.invalidate_report_cache('collection_20260301_100000')
+    assert export._get_cached_export(export._report_cache_key('collection_20260301_100000', 'html', title='Report')) is None
+
+def test_json_chunks_round_trip():
+    data = {'nodes': {'list': [{'NAME': f'worker-{index}', 'LABELS': 'a' * 50} for index in range(200)]}, 'note': 'é'}
+    chunks = list(export._iter_json_chunks(data, chunk_size=1024))
+    assert len(chunks) > 1 and all(isinstance(chunk, bytes) for chunk in chunks)
+    assert json.loads(b''.join(chunks)) == data
+
+def test_streamed_json_export_is_gzipped(app):
+    _save_snapshot(app, 'collection_20260301_100000', {'nodes': {'list': [{'NAME': 'worker-1'}]}, 'events': {}})
+    response = app.test_client().get('/api/v2/export/report?format=json&stream=yes&compress=gzip&sections=nodes')
+    assert response.mimetype == 'application/gzip'
+    assert 'collection_20260301_100000_nodes.json.gz' in response.headers['Content-Disposition']
+    assert json.loads(gzip.decompress(response.data)) == {'nodes': {'list': [{'NAME': 'worker-1'}]}}
+
+def test_streamed_json_export_copies_sections_without_loading_them(app, monkeypatch):
+    from app import snapshot_file
+    data = {'nodes': {'list': [{'NAME': f'worker-{index}'} for index in range(500)]}, 'events': {'note': 'é'}, 'etcd': {}}
+    snapshot_file.write(os.path.join(app.instance_path, 'collected_data', 'collection_20260301_100000.json'), data)
+    opened = []
+    open_collection_data = export._open_collection_data
+    monkeypatch.setattr(export, '_open_collection_data', lambda path: opened.append(open_collection_data(path)) or opened[-1])
+
+    chunks, _, _ = export.stream_json_export(['nodes', 'etcd'])
+    chunks = list(chunks)
+    assert len(chunks) > 3 and json.loads(b''.join(chunks)) == {'nodes': data['nodes'], 'etcd': {}}
+    assert opened[0].loaded_sections == []
+    chunks, _, _ = export.stream_json_export()
+    assert json.loads(b''.join(chunks)) == data
@@ -0,0 +1,49 @@
+import os
+import json
+import pytest
+from flask import Flask
+from app import export_catalog
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask('app', instance_path=str(tmp_path))
+    with app.app_context():
+        yield app
+
+def _entry(index):
+    return {
+        'id': f'export-{index}',
+        'date': f'2026-03-{index:02d}T10:00:00',
+        'type': 'json',
+        'sections': ['nodes'],
+        'file': f'/exports/export_{index}.json',
+        'size': 100,
+        'url': f'http://localhost/exports/export-{index}'
+    }
+
+def test_exports_history_file_is_migrated_once(app):
+    history_file = os.path.join(app.instance_path, export_catalog.HISTORY_FILE)
+    with open(history_file, 'w') as f:
+        json.dump([_entry(1), _entry(2)], f)
+
+    export_catalog.init_catalog()
+    assert not os.path.exists(history_file) and os.path.exists(f'{history_file}.migrated')
+    assert export_catalog.get_export('export-2') == dict(_entry(2), snapshot_id=None, cache_key=None)
+    assert export_catalog.get_export_by_file('/exports/export_1.json')['id'] == 'export-1'
+
+    # Starting again doesn't migrate (or duplicate) anything
+    export_catalog.init_catalog()
+    assert export_catalog.list_exports()[1] == 2
+
+def test_exports_are_listed_newest_first_one_page_at_a_time(app):
+    export_catalog.init_catalog()
+    for index in range(1, 8):
+        export_catalog.add_export(_entry(index))
+
+    entries, total = export_catalog.list_exports(limit=3, offset=0)
+    assert total == 7 and [entry['id'] for entry in entries] == ['export-7', 'export-6', 'export-5']
+    entries, _ = export_catalog.list_exports(limit=3, offset=6)
+    assert [entry['id'] for entry in entries] == ['export-1']
+
+    export_catalog.delete_export('export-7')
+    assert export_catalog.list_exports(limit=1)[0][0]['id'] == 'export-6'
@@ -0,0 +1,150 @@
+import os
+import json
+import threading
+import pytest
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask
+from app import clusters, export, export_jobs
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask('app', instance_path=str(tmp_path))
+    app.config['SERVER_NAME'] = 'localhost'
+    clusters.init_app(app)
+    with app.app_context():
+        export.init_app(app)
+    export_jobs.init_app(app)
+    (tmp_path / 'collected_data').mkdir()
+    with open(tmp_path / 'collected_data' / 'collection_20260301_100000.json', 'w') as f:
+        json.dump({'nodes': {'list': []}}, f)
+    # Jobs run in threads rather than worker processes, so that the renderer can be replaced
+    monkeypatch.setattr(export_jobs, 'executor', ThreadPoolExecutor(2))
+    monkeypatch.setattr(export_jobs, 'futures', {})
+    monkeypatch.setattr(export_jobs, 'finished_events', {})
+    monkeypatch.setattr(export_jobs, '_owner', None)
+    with app.app_context():
+        yield app
+
+def _renderer(monkeypatch, before_render=None):
+    def render_report(collection_file, export_file, format_type, progress=None, **options):
+        if before_render:
+            before_render()
+        progress('Rendering', 50)
+        with open(export_file, 'w') as f:
+            f.write('<html></html>')
+        return ['nodes']
+    monkeypatch.setattr(export_jobs, 'render_report', render_report)
+
+def test_job_lifecycle_and_cached_rerun(app, monkeypatch):
+    _renderer(monkeypatch)
+    job, error = export_jobs.submit_export_job('html', title='Report')
+    assert error is None and job['status'] == 'queued'
+
+    job = export_jobs.wait_export_job(job['id'], 5)
+    assert job['status'] == 'completed' and job['progress'] == 100 and os.path.exists(job['file'])
+
+    # The same export of the same snapshot is completed from the cache right away
+    rerun, _ = export_jobs.submit_export_job('html', title='Report')
+    assert rerun['status'] == 'completed' and rerun['file'] == job['file']
+
+    # The report endpoint renders through the job pool too, answering with the job rather than waiting for it
+    client = app.test_client()
+    response = client.get('/api/v2/export/report?format=html&title=Other')
+    assert response.status_code == 202 and response.headers['Location'] == response.json['status_url']
+    assert response.json['status_url'] == f"http://localhost/api/v2/export/jobs/{response.json['job_id']}"
+    assert export_jobs.wait_export_job(response.json['job_id'], 5)['status'] == 'completed'
+    assert client.get(response.json['status_url']).json['job']['status'] == 'completed'
+
+    # Once rendered, the same report is answered with its download URL
+    response = client.get('/api/v2/export/report?format=html&title=Other')
+    assert response.status_code == 200 and response.json['download_url'].startswith('http://localhost/exports/')
+
+def test_running_job_is_cancelled_through_its_cancel_file(app, monkeypatch):
+    started, resume = threading.Event(), threading.Event()
+    _renderer(monkeypatch, lambda: (started.set(), resume.wait(5)))
+    job, _ = export_jobs.submit_export_job('html')
+    assert started.wait(5)
+
+    cancelling, error = export_jobs.cancel_export_job(job['id'])
+    assert error is None and cancelling['stage'] == 'Cancelling'
+    assert os.path.exists(export_jobs._cancel_file(export_jobs._get_jobs_dir(), job['id']))
+    resume.set()
+
+    job = export_jobs.wait_export_job(job['id'], 5)
+    assert job['status'] == 'cancelled' and not os.path.exists(job['file'])
+    assert not os.path.exists(export_jobs._cancel_file(export_jobs._get_jobs_dir(), job['id']))
+
+def test_jobs_beyond_the_queue_size_are_rejected(app, monkeypatch):
+    app.config['EXPORT_QUEUE_SIZE'] = 1
+    resume = threading.Event()
+    _renderer(monkeypatch, lambda: resume.wait(5))
+    first, _ = export_jobs.submit_export_job('html')
+    try:
+        job, error = export_jobs.submit_export_job('pdf')
+        assert job is None and 'limit 1' in error
+    finally:
+        resume.set()
+    assert export_jobs.wait_export_job(first['id'], 5)['status'] == 'completed'
+
+def test_broken_pool_fails_its_jobs_and_is_replaced(app, monkeypatch):
+    _renderer(monkeypatch)
+    monkeypatch.setattr(export_jobs, 'ProcessPoolExecutor', ThreadPoolExecutor)
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool('A child process terminated abruptly')
+
+    # Broken before the job was submitted: the job goes to a new pool
+    monkeypatch.setattr(export_jobs, 'executor', BrokenPool())
+    job, _ = export_jobs.submit_export_job('html')
+    assert export_jobs.wait_export_job(job['id'], 5)['status'] == 'completed'
+    assert isinstance(export_jobs.executor, ThreadPoolExecutor)
+
+    # Broken while the job ran: the job fails and the next one starts a new pool
+    class BreakingPool:
+        def submit(self, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool('A child process terminated abruptly'))
+            return future
+
+    monkeypatch.setattr(export_jobs, 'executor', BreakingPool())
+    job, _ = export_jobs.submit_export_job('html', title='Other')
+    job = export_jobs.wait_export_job(job['id'], 5)
+    assert job['status'] == 'failed' and 'terminated' in job['error']
+    assert export_jobs.executor is None
+
+def test_cancel_during_a_render_without_progress_steps(app, monkeypatch):
+    started, resume = threading.Event(), threading.Event()
+
+    def render_report(collection_file, export_file, format_type, progress=None, **options):
+        # A single-pass render: no progress call to stop at
+        started.set()
+        resume.wait(5)
+        with open(export_file, 'w') as f:
+            f.write('<html></html>')
+        return ['nodes']
+    monkeypatch.setattr(export_jobs, 'render_report', render_report)
+    job, _ = export_jobs.submit_export_job('html')
+    assert started.wait(5)
+    export_jobs.cancel_export_job(job['id'])
+    resume.set()
+
+    job = export_jobs.wait_export_job(job['id'], 5)
+    assert job['status'] == 'cancelled' and not os.path.exists(job['file'])
+    assert export._get_cached_export(job['cache_key']) is None
+
+def test_jobs_of_a_restarted_worker_are_failed_on_startup(app):
+    jobs_dir = export_jobs._get_jobs_dir()
+    owner = export_jobs._get_owner(jobs_dir)
+    for job_id, job_owner in (('lost', 'restarted-worker'), ('alive', owner), ('legacy', None)):
+        export_jobs._save_job(jobs_dir, {'id': job_id, 'status': 'running', 'created': job_id, 'owner': job_owner})
+
+    export_jobs.init_app(type(app)('other', instance_path=app.instance_path))
+    assert export_jobs._load_job(jobs_dir, 'lost')['status'] == 'failed'
+    assert export_jobs._load_job(jobs_dir, 'legacy')['status'] == 'failed'
+    assert export_jobs._load_job(jobs_dir, 'alive')['status'] == 'running'
+
+def test_json_jobs_share_the_cache_of_synchronous_exports():
+    assert export._report_cache_key('collection_20260301_100000', 'json', ['nodes'], 'Report', include_charts=False) == \
+        export._report_cache_key('collection_20260301_100000', 'json', ['nodes'])
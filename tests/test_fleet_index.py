@@ -0,0 +1,76 @@
+import datetime
+import pytest
+from flask import Flask
+from app import fleet_index
+
+NODE_DESCRIPTION = """Name: worker-0
+Capacity:
+  cpu:     16
+  memory:  32Gi
+  pods:    250
+Allocatable:
+  cpu:     15500m
+"""
+
+def _snapshot(version, operator_version, reasons):
+    return {
+        'basic_info': {'summary': {'openshiftVersion': version, 'platform': 'AWS'}},
+        'nodes': {
+            'list': [{'NAME': 'worker-0', 'STATUS': 'Ready'}, {'NAME': 'worker-1', 'STATUS': 'NotReady'}],
+            'details': {'worker-0': NODE_DESCRIPTION, 'worker-1': NODE_DESCRIPTION}
+        },
+        'operators': {'csv_list': [{
+            'NAMESPACE': 'openshift-logging', 'NAME': f'elasticsearch-operator.v{operator_version}',
+            'VERSION': operator_version, 'PHASE': 'Succeeded'
+        }]},
+        'events': {'top_warning_reasons': reasons}
+    }
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    with app.app_context():
+        fleet_index.init_index()
+        yield app
+
+def test_version_key_sorts_numerically():
+    assert fleet_index.version_key('4.9.1') < fleet_index.version_key('4.10.0')
+    assert fleet_index.version_key('v5.8.1-12') == fleet_index.version_key('5.8.1')
+    assert fleet_index.version_key('N/A') is None
+
+def test_node_capacity_accepts_any_kubernetes_quantity():
+    details = {
+        'worker-0': NODE_DESCRIPTION,
+        'worker-1': NODE_DESCRIPTION.replace('16', '500m').replace('32Gi', '1e3'),
+        'worker-2': NODE_DESCRIPTION.replace('32Gi', 'lots')
+    }
+    summary = fleet_index._summarize_nodes({'list': [], 'details': details})
+    assert summary['cpu_capacity'] == 16.5
+    assert summary['memory_capacity'] == 32 * 2 ** 30 + 1000
+    assert summary['pods_capacity'] == 500
+
+def test_latest_snapshot_per_cluster(app):
+    now = datetime.datetime.now()
+    fleet_index.index_snapshot('east/collection_1', 'east', _snapshot('4.14.2', '5.7.0', {}), now - datetime.timedelta(hours=1))
+    fleet_index.index_snapshot('east/collection_2', 'east', _snapshot('4.15.0', '5.8.1', {}), now)
+    fleet_index.index_snapshot('collection_1', 'default', _snapshot('4.12.9', '5.6.3', {}), now)
+
+    clusters = {entry['cluster']: entry for entry in fleet_index.get_latest_clusters()}
+    assert clusters['east']['openshift_version'] == '4.15.0'
+    assert clusters['east']['nodes'] == 2
+    assert clusters['east']['ready_nodes'] == 1
+    assert clusters['east']['cpu_capacity'] == 32
+    assert clusters['east']['memory_capacity'] == 64 * 2 ** 30
+
+    outdated = fleet_index.find_operators('elasticsearch-operator', below='5.8')
+    assert [entry['cluster'] for entry in outdated] == ['default']
+
+def test_top_warning_reasons_counts_daily_peak(app):
+    now = datetime.datetime.now().replace(hour=12)
+    fleet_index.index_snapshot('a/collection_1', 'a', _snapshot('4.15.0', '5.8.1', {'BackOff': 3}), now)
+    fleet_index.index_snapshot('a/collection_2', 'a', _snapshot('4.15.0', '5.8.1', {'BackOff': 5}), now + datetime.timedelta(minutes=1))
+    fleet_index.index_snapshot('b/collection_1', 'b', _snapshot('4.15.0', '5.8.1', {'BackOff': 1, 'FailedMount': 2}), now)
+
+    reasons = fleet_index.top_warning_reasons(now - datetime.timedelta(days=1))
+    assert reasons[0] == {'reason': 'BackOff', 'count': 6, 'clusters': 2}
+    assert reasons[1] == {'reason': 'FailedMount', 'count': 2, 'clusters': 1}
@@ -0,0 +1,87 @@
+import os
+import json
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+from app import list_query
+
+def _pod(name, phase, restarts):
+    return {
+        'metadata': {'name': name, 'namespace': 'app', 'labels': {'app': name.split('-')[0]}},
+        'spec': {'containers': [{'name': 'main', 'image': f'registry/{name}:1'}]},
+        'status': {'phase': phase, 'containerStatuses': [{'restartCount': restarts}]}
+    }
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    data_dir = tmp_path / 'collected_data'
+    data_dir.mkdir()
+    pods = [_pod(f'web-{i}', 'Running' if i % 3 else 'Pending', 12 - i) for i in range(10)] + [_pod('db-0', 'Running', 0)]
+    snapshot = {
+        'nodes': {'list': [{'NAME': 'worker-1', 'STATUS': 'Ready'}, {'NAME': 'master-0', 'STATUS': 'Ready'}]},
+        'namespace_resources': {'app': {'pods': {'items': pods}}}
+    }
+    (data_dir / 'collection_20260301_100000.json').write_text(json.dumps(snapshot))
+    list_query._index.clear()
+    with app.app_context():
+        yield app
+
+def test_filter_sort_and_page_through_snapshot_list(app):
+    path = ('namespace_resources', 'app', 'pods', 'items')
+    args = MultiDict([
+        ('filter', 'metadata.labels.app=web'), ('filter', 'status.containerStatuses.0.restartCount>4'),
+        ('sort', '-status.phase,status.containerStatuses.0.restartCount'),
+        ('fields', 'metadata.name,status.phase'), ('limit', '3')
+    ])
+    page = list_query.query_snapshot_list('default', path, args)
+    assert page['snapshot_id'] == 'collection_20260301_100000'
+    assert page['total'] == 8
+    assert page['items'][0] == {'metadata': {'name': 'web-7'}, 'status': {'phase': 'Running'}}
+
+    names = [item['metadata']['name'] for item in page['items']]
+    while page['next_cursor']:
+        args['cursor'] = page['next_cursor']
+        page = list_query.query_snapshot_list('default', path, args)
+        names += [item['metadata']['name'] for item in page['items']]
+    assert names == ['web-7', 'web-5', 'web-4', 'web-2', 'web-1', 'web-6', 'web-3', 'web-0']
+
+def test_missing_lists_and_invalid_parameters(app):
+    nodes = list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'sort': 'NAME'}))
+    assert [node['NAME'] for node in nodes['items']] == ['master-0', 'worker-1']
+
+    fallback = list_query.query_snapshot_list(
+        'default', ('namespaces',), MultiDict({'filter': 'NAME~prod'}), lambda: {'namespaces': ['prod-a', 'dev']}
+    )
+    assert fallback['items'] == [{'NAME': 'prod-a'}] and fallback['snapshot_id'] is None
+
+    with pytest.raises(LookupError):
+        list_query.query_snapshot_list('default', ('namespace_resources', 'app', 'routes', 'items'), MultiDict({'limit': '5'}))
+    with pytest.raises(ValueError):
+        list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'filter': 'STATUS'}))
+    with pytest.raises(ValueError):
+        list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'cursor': list_query._encode_cursor('default', '../etc', 0)}))
+
+def test_cursor_of_another_cluster_is_rejected(app):
+    page = list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'limit': '1'}))
+    with pytest.raises(ValueError, match='cluster east'):
+        list_query.query_snapshot_list('east', ('nodes', 'list'), MultiDict({'cursor': page['next_cursor']}))
+    # Nor can a cursor of a cluster point into the snapshots of another one
+    cursor = list_query._encode_cursor('east', 'collection_20260301_100000', 1)
+    with pytest.raises(ValueError, match='cluster east'):
+        list_query.query_snapshot_list('east', ('nodes', 'list'), MultiDict({'cursor': cursor}))
+
+def test_only_the_section_of_a_list_is_loaded_and_indexed(app, monkeypatch):
+    from app import export, snapshot_file
+    snapshot_file.write(os.path.join(app.instance_path, 'collected_data', 'collection_20260301_100000.json'), {
+        'nodes': {'list': [{'NAME': 'worker-1'}]}, 'namespace_resources': {'app': {'pods': {'items': []}}}
+    })
+    opened = []
+    open_collection_data = export._open_collection_data
+    monkeypatch.setattr(export, '_open_collection_data', lambda path: opened.append(open_collection_data(path)) or opened[-1])
+
+    list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'sort': 'NAME'}))
+    list_query.query_snapshot_list('default', ('nodes', 'list'), MultiDict({'sort': '-NAME'}))
+    assert [snapshot.loaded_sections for snapshot in opened] == [['nodes']]
+    assert list(list_query._index) == [('collection_20260301_100000', 'nodes')]
+    assert list_query._index[('collection_20260301_100000', 'nodes')]['data'] == {'list': [{'NAME': 'worker-1'}]}
@@ -0,0 +1,77 @@
+import os
+import pytest
+from flask import Flask
+from app import live_updates
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    monkeypatch.setattr(live_updates, '_stream_slots', None)
+    app.config['LIVE_STREAM_TIMEOUT'] = 0
+    live_updates.init_app(app)
+    with app.app_context():
+        yield app
+
+def _events(stream):
+    """Parse Server-Sent Events frames into (id, event, data) tuples."""
+    events = []
+    for frame in stream:
+        fields = dict(line.split(': ', 1) for line in frame.strip().split('\n') if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields.get('id'), fields['event'], fields['data']))
+    return events
+
+def test_stream_resumes_after_last_event_id_and_filters_clusters(app):
+    live_updates.publish('collection', 'prod', status='running')
+    first = _events(live_updates.iter_events(last_event_id='0:0', timeout=0))
+    assert [event for _, event, _ in first] == ['reset']
+
+    stat = os.stat(live_updates.get_log_path())
+    last_event_id = f'{stat.st_ino}:{stat.st_size}'
+    live_updates.publish('section', 'dev', section='nodes', status='running')
+    live_updates.publish('section', 'prod', section='nodes', status='error', error='timeout')
+    live_updates.publish('snapshot', 'prod', snapshot_id='prod/collection_20260301_100000', sections=['nodes'])
+
+    events = _events(live_updates.iter_events('prod', last_event_id, timeout=0))
+    assert [event for _, event, _ in events] == ['section', 'snapshot']
+    assert '"error": "timeout"' in events[0][2]
+
+    # Resuming from the last event received sends nothing twice
+    assert _events(live_updates.iter_events('prod', events[-1][0], timeout=0)) == []
+
+def test_stream_follows_a_rotated_log(app, monkeypatch):
+    monkeypatch.setattr(live_updates, 'MAX_LOG_SIZE', 100)
+    live_updates.publish('section', 'prod', section='nodes', status='running', padding='x' * 100)
+    stat = os.stat(live_updates.get_log_path())
+    last_event_id = f'{stat.st_ino}:0'
+
+    live_updates.publish('section', 'prod', section='nodes', status='success')
+    assert os.path.exists(live_updates.get_log_path() + '.1')
+
+    events = _events(live_updates.iter_events(last_event_id=last_event_id, timeout=0))
+    assert [('padding' in data, '"success"' in data) for _, _, data in events] == [(True, False), (False, True)]
+
+    response = app.test_client().get('/api/v2/live')
+    assert response.mimetype == 'text/event-stream' and response.headers['Cache-Control'] == 'no-cache'
+    assert response.get_data(as_text=True).startswith('retry: ')
+
+def test_streams_beyond_the_limit_are_told_to_retry_later(app):
+    app.config['LIVE_MAX_STREAMS'] = 1
+    client = app.test_client()
+    held = live_updates._get_stream_slots()
+    assert held.acquire(blocking=False)
+    busy = client.get('/api/v2/live')
+    assert busy.get_data(as_text=True) == f'retry: {live_updates.BUSY_RECONNECT_DELAY}\n\n'
+
+    # The slot is released once a stream ends
+    held.release()
+    assert client.get('/api/v2/live').get_data(as_text=True).startswith(f'retry: {live_updates.RECONNECT_DELAY}')
+    assert client.get('/api/v2/live').get_data(as_text=True).startswith(f'retry: {live_updates.RECONNECT_DELAY}')
+
+def test_only_pages_using_live_updates_open_a_stream(tmp_path):
+    from app import create_app
+    app = create_app(instance_path=str(tmp_path), start_scheduler=False)
+    with app.test_request_context():
+        from flask import render_template
+        assert "const liveUpdates = true &&" in render_template('pages/collection_status.html', title='Collection Status')
+        assert "const liveUpdates = false &&" in render_template('base.html')
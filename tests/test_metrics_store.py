@@ -0,0 +1,52 @@
+import datetime
+import pytest
+from flask import Flask
+from app import metrics_store
+
+HOUR = 3600
+# Midnight UTC, so that buckets and partitions line up with the samples
+START = int(datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+def _metrics(node_cpu, pod_memory):
+    return {
+        'node_usage_list': [{'NAME': 'worker-0', 'CPU(cores)': node_cpu, 'CPU%': '5%', 'MEMORY(bytes)': '2Gi', 'MEMORY%': '10%'}],
+        'pod_usage_list': [
+            {'NAMESPACE': 'app', 'NAME': 'web-1', 'CPU(cores)': '10m', 'MEMORY(bytes)': pod_memory},
+            {'NAMESPACE': 'app', 'NAME': 'bad', 'CPU(cores)': 'n/a', 'MEMORY(bytes)': '1Mi'}
+        ]
+    }
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    with app.app_context():
+        yield app
+
+def test_samples_are_parsed_and_queried_as_vectors(app):
+    assert metrics_store.record_metrics('c1', _metrics('250m', '64Mi'), START) == 2
+    metrics_store.record_metrics('c1', _metrics('750m', '128Mi'), START + 60)
+
+    result = metrics_store.query('c1', 'node', START, START + 120)
+    assert result['resolution'] == 'raw'
+    assert result['series'][0]['name'] == 'worker-0'
+    assert result['series'][0]['timestamps'] == [START, START + 60]
+    assert result['series'][0]['cpu'] == [0.25, 0.75]
+
+    pods = metrics_store.query('c1', 'pod', START, START + 120, namespace='app')
+    assert pods['series'][0]['memory'] == [64 * 2 ** 20, 128 * 2 ** 20]
+
+def test_completed_buckets_are_rolled_up(app):
+    for minute in range(0, 120, 30):
+        metrics_store.record_metrics('c1', _metrics(f'{100 * (minute // 30 + 1)}m', '64Mi'), START + minute * 60)
+    # The next day's first sample completes the hourly and daily buckets of the first day
+    metrics_store.record_metrics('c1', _metrics('100m', '64Mi'), START + 24 * HOUR)
+
+    hourly = metrics_store.query('c1', 'node', START, START + 2 * HOUR, resolution='1h')['series'][0]
+    assert hourly['timestamps'] == [START, START + HOUR]
+    assert hourly['cpu'] == [0.15, 0.35]
+    assert hourly['cpu_max'] == [0.2, 0.4]
+
+    daily = metrics_store.query('c1', 'node', START, START + 24 * HOUR, resolution='1d')['series'][0]
+    assert daily['timestamps'] == [START]
+    assert daily['cpu'] == [0.25]
+    assert daily['cpu_max'] == [0.4]
@@ -0,0 +1,93 @@
+import os
+import json
+import datetime
+import threading
+import pytest
+from flask import Flask
+from app import clusters, responses, event_store, list_query, scheduler, resource_model
+from app import routes
+from app.routes import main_bp
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask('app', instance_path=str(tmp_path))
+    app.register_blueprint(main_bp)
+    clusters.init_app(app)
+    responses.init_app(app)
+    resource_model.init_app(app)
+    monkeypatch.setattr(scheduler, 'collector_process', False)
+    monkeypatch.setattr(routes, '_missing_namespace_refreshes', {})
+    (tmp_path / 'collected_data').mkdir()
+    collected_at = (datetime.datetime.now() - datetime.timedelta(minutes=5)).isoformat()
+    snapshot = {'namespaces': ['app', 'db'], 'namespace_resources': {'app': {
+        'namespace': 'app', 'collected_at': collected_at,
+        'pods': {'items': [{'metadata': {'name': 'web-1'}, 'status': {'phase': 'Running'}}]}
+    }}}
+    (tmp_path / 'collected_data' / 'collection_20260301_100000.json').write_text(json.dumps(snapshot))
+    list_query._index.clear()
+    with app.app_context():
+        event_store.init_store()
+        yield app
+
+def test_namespace_is_served_from_the_snapshot_with_its_age(app):
+    client = app.test_client()
+    page = client.get('/namespace/app')
+    assert page.status_code == 200 and b'web-1' in page.data and b'(5 minutes ago)' in page.data
+
+    data = client.get('/api/v2/namespace/app').json
+    assert data['pods']['items'][0]['metadata']['name'] == 'web-1'
+    assert 295 <= data['age_seconds'] <= 305
+
+    # Namespaces that weren't collected yet are collected by the collector worker, not per request
+    missing = client.get('/api/v2/namespace/db')
+    assert missing.status_code == 202 and missing.json['refreshing']
+    assert b'being collected' in client.get('/namespace/db').data
+    with open(os.path.join(app.instance_path, scheduler.WORKER_REQUESTS_FILE)) as f:
+        assert json.load(f)['refresh_namespaces'] == ['default/db']
+    assert client.get('/api/v2/namespace/..%2Fetc').status_code in (400, 404)
+
+def _wait_for_refreshes():
+    for _ in range(50):
+        if not scheduler.namespace_refreshes:
+            return
+        threading.Event().wait(0.1)
+
+def test_concurrent_refreshes_of_a_namespace_are_coalesced(app, monkeypatch):
+    release, calls, published = threading.Event(), [], []
+    def collect(namespace, kubeconfig, cluster=None):
+        calls.append(namespace)
+        release.wait(5)
+        return {'namespace': namespace, 'pods': {'items': []}}
+    monkeypatch.setattr(scheduler, 'collector_process', True)
+    monkeypatch.setattr(scheduler.scheduler, 'app', app, raising=False)
+    monkeypatch.setattr(scheduler, 'get_resources_for_namespace', collect)
+    monkeypatch.setattr(scheduler, '_publish_collected_data', lambda data, cluster, sections: published.append(sections))
+
+    assert scheduler.request_namespace_refresh('db', 'default')
+    assert not scheduler.request_namespace_refresh('db', 'default')
+    release.set()
+    _wait_for_refreshes()
+    assert calls == ['db'] and published == [['namespace_resources']]
+
+    # Once done, the namespace can be refreshed again
+    assert scheduler.request_namespace_refresh('db', 'default')
+    _wait_for_refreshes()
+    assert calls == ['db', 'db']
+
+def test_only_listed_namespaces_are_queued_and_misses_are_rate_limited(app, monkeypatch):
+    requested = []
+    monkeypatch.setattr(scheduler, 'request_namespace_refresh', lambda namespace, cluster: requested.append(namespace))
+    client = app.test_client()
+
+    # Names that aren't in the latest namespace list don't run any oc command
+    assert client.get('/api/v2/namespace/ghost').status_code == 404
+    assert client.get('/namespace/ghost').status_code == 404
+    assert requested == []
+
+    # Repeated misses of a listed namespace queue one refresh per interval
+    for _ in range(3):
+        assert client.get('/api/v2/namespace/db').status_code == 202
+    assert requested == ['db']
+    app.config['NAMESPACE_MISS_REFRESH_INTERVAL'] = 0
+    assert client.get('/api/v2/namespace/db').status_code == 202
+    assert requested == ['db', 'db']
@@ -0,0 +1,52 @@
+import os
+import gzip
+import json
+import pytest
+from flask import Flask
+from app import clusters, responses, page_cache
+from app.routes import main_bp
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask('app', instance_path=str(tmp_path))
+    app.register_blueprint(main_bp)
+    clusters.init_app(app)
+    responses.init_app(app)
+    (tmp_path / 'collected_data').mkdir()
+    with app.app_context():
+        yield app
+
+def _save_snapshot(app, snapshot_id, nodes):
+    data = {'nodes': {'list': [{'NAME': name, 'STATUS': 'Ready'} for name in nodes]}, 'metrics': {}}
+    with open(os.path.join(app.instance_path, 'collected_data', f'{snapshot_id}.json'), 'w') as f:
+        json.dump(data, f)
+    return data
+
+def test_prerendered_page_is_served_compressed_and_revalidated(app):
+    data = _save_snapshot(app, 'collection_20260301_100000', ['worker-1', 'worker-2'])
+    assert page_cache.prerender('collection_20260301_100000', 'default', data) == len(page_cache.PAGES)
+
+    client = app.test_client()
+    response = client.get('/nodes', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+    assert b'worker-2' in gzip.decompress(response.data)
+
+    cached = client.get('/nodes', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+
+    # A page missing from the cache is rendered on demand
+    os.remove(page_cache._get_page_file('collection_20260301_100000', 'nodes'))
+    assert b'worker-1' in client.get('/nodes').data
+
+def test_unchanged_pages_are_carried_over_and_old_snapshots_pruned(app):
+    snapshots = ['collection_20260301_100000', 'collection_20260301_100100', 'collection_20260301_100200']
+    data = _save_snapshot(app, snapshots[0], ['worker-1'])
+    page_cache.prerender(snapshots[0], 'default', data)
+    for previous, snapshot in zip(snapshots, snapshots[1:]):
+        data = _save_snapshot(app, snapshot, ['worker-1'])
+        assert page_cache.prerender(snapshot, 'default', data, ['metrics'], previous) == 1
+
+    nodes_pages = [page_cache._get_page_file(snapshot, 'nodes') for snapshot in snapshots]
+    assert not os.path.exists(nodes_pages[0])
+    assert os.stat(nodes_pages[1]).st_ino == os.stat(nodes_pages[2]).st_ino
+    assert b'worker-1' in app.test_client().get('/nodes').data
@@ -0,0 +1,82 @@
+import time
+import threading
+import pytest
+from types import SimpleNamespace
+from app.collector.rate_limit import TokenBucket, CircuitBreaker, ClusterLimiter, DEFAULT_SETTINGS, parse_retry_after
+
+def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert not bucket.try_acquire()
+    assert bucket.acquire() > 0
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(threshold=0.5, min_requests=4, window=60, cooldown=0.05)
+    for success in (True, False, False, False):
+        breaker.record(success)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial request
+    breaker.record(True)
+    assert breaker.state == 'closed'
+
+def test_non_transient_failures_dont_open_the_breaker():
+    limiter = ClusterLimiter('test', dict(DEFAULT_SETTINGS, CIRCUIT_BREAKER_MIN_REQUESTS=2))
+    for _ in range(5):
+        limiter.record(False)
+    assert limiter.get_stats()['circuit_state'] == 'closed'
+    assert limiter.get_stats()['failures'] == 5
+
+def test_retry_delay_uses_jitter_budget_and_retry_after():
+    limiter = ClusterLimiter('test', dict(DEFAULT_SETTINGS, OC_RETRY_BUDGET=2, RETRY_MAX_DELAY=5))
+    assert 0 <= limiter.retry_delay(3, 1) <= 4
+    assert limiter.retry_delay(1, 1, retry_after=60) == 5
+    assert limiter.retry_delay(1, 1) is None
+    assert limiter.get_stats()['retries_denied'] == 1
+
+def test_parse_retry_after():
+    assert parse_retry_after('Error from server (TooManyRequests): Retry-After: 7') == 7
+    assert parse_retry_after('connection refused') is None
+
+def test_commands_are_limited_per_cluster_name(monkeypatch):
+    from app.collector import openshift_collector, rate_limit
+    monkeypatch.setattr(rate_limit, 'limiters', {})
+    monkeypatch.setattr(openshift_collector.subprocess, 'run', lambda *args, **kwargs: SimpleNamespace(returncode=0, stdout='ok', stderr=''))
+    # Contexts of one kubeconfig are separate clusters with their own limits
+    for cluster in ('east', 'west', 'west'):
+        assert openshift_collector._run_oc_command(['get', 'nodes'], '/shared/kubeconfig', cluster=cluster) == (True, 'ok', None)
+    assert set(rate_limit.get_stats()) == {'east', 'west'}
+    assert rate_limit.get_stats()['west']['requests'] == 2
+
+def test_watches_never_take_the_trial_slot_and_record_once_started(monkeypatch):
+    from app.collector import openshift_collector, rate_limit
+    breaker = CircuitBreaker(threshold=0.5, min_requests=1, window=60, cooldown=0)
+    breaker.record(False)
+    assert not breaker.allow(trial=False) and breaker.state == 'open'
+    assert breaker.allow() and breaker.state == 'half_open'
+
+    monkeypatch.setattr(rate_limit, 'limiters', {})
+    event = '{"type": "ADDED", "object": {"metadata": {"namespace": "app", "name": "web.1"}, "reason": "BackOff"}}\n'
+
+    class Process:
+        stdout = iter([event, event])
+        returncode = None
+        def poll(self):
+            return self.returncode
+        def terminate(self):
+            self.returncode = -15
+        def communicate(self, timeout=None):
+            return '', ''
+    monkeypatch.setattr(openshift_collector.subprocess, 'Popen', lambda *args, **kwargs: Process())
+
+    def on_event(entry):
+        # The breaker already knows the stream started
+        assert rate_limit.get_stats()['east']['successes'] == 1
+        raise RuntimeError('store unavailable')
+    with pytest.raises(RuntimeError):
+        openshift_collector.watch_events(on_event, threading.Event(), '/shared/kubeconfig', cluster='east')
+    assert rate_limit.get_stats()['east']['successes'] == 1 and rate_limit.get_stats()['east']['failures'] == 0
@@ -0,0 +1,54 @@
+import pytest
+from app import report_render, snapshot_file
+
+def test_part_start_pages_follow_the_cover():
+    page_counts = {'overview': 3, 'nodes': 12, 'events': 1}
+    assert report_render._get_part_start_pages(['overview', 'nodes', 'events'], page_counts, 2) == {
+        'overview': 3, 'nodes': 6, 'events': 18
+    }
+
+def test_cover_is_rendered_again_until_its_page_count_settles(monkeypatch):
+    renders = []
+
+    def render_pdf_part(part, data, output_file, context):
+        renders.append(context['toc_pages'])
+        # A long table of contents takes two pages, then three once the page numbers grow
+        return min(len(renders) + 1, 3)
+    monkeypatch.setattr(report_render, '_render_pdf_part', render_pdf_part)
+
+    toc_pages = report_render._render_pdf_cover(
+        {'nodes', 'events'}, 'cover.pdf', {'title': 'Report'}, ['nodes', 'events'], {'nodes': 4, 'events': 2}
+    )
+    assert renders == [{'nodes': 2, 'events': 6}, {'nodes': 3, 'events': 7}, {'nodes': 4, 'events': 8}]
+    assert toc_pages == {'nodes': 4, 'events': 8}
+
+def test_page_header_title_is_a_css_string():
+    html = report_render._render_html('reports/pdf_page_overlay.html', title='Prod "A" & </style>', page_count=1)
+    assert 'content: "Prod \\000022A\\000022 \\000026 \\00003c\\00002fstyle\\00003e";' in html
+
+def test_pdf_parts_load_their_sections_in_the_part_workers(tmp_path, monkeypatch):
+    collection_file = str(tmp_path / 'collection.json')
+    snapshot_file.write(collection_file, {'basic_info': {'version': '4.14'}, 'nodes': {'list': [{'name': 'a'}]}, 'events': {}})
+    parts = []
+
+    def render_pdf_in_parts(collection_file, sections, output_file, context, workers, progress=None, cancel_file=None):
+        parts.append(sections)
+    monkeypatch.setattr(report_render, '_render_pdf_in_parts', render_pdf_in_parts)
+    monkeypatch.setattr(report_render, 'analyze_capacity', lambda snapshot: pytest.fail('capacity computed in the parent'))
+
+    report_render.render_report(collection_file, str(tmp_path / 'report.pdf'), 'pdf', pdf_workers=2)
+    assert parts == [{'basic_info', 'nodes', 'capacity'}]
+
+    rendered = []
+    monkeypatch.setattr(report_render, '_render_pdf_part', lambda part, data, *args: rendered.append((part, data)) or 1)
+    report_render._render_pdf_section_part(collection_file, 'nodes', ['nodes'], str(tmp_path / 'nodes.pdf'), {})
+    assert rendered == [('nodes', {'nodes': {'list': [{'name': 'a'}]}})]
+
+def test_cancelled_part_stops_before_layout(tmp_path, monkeypatch):
+    cancel_file = tmp_path / 'job.cancel'
+    cancel_file.touch()
+    monkeypatch.setattr(report_render, '_render_pdf_part', lambda *args: pytest.fail('part rendered'))
+    collection_file = str(tmp_path / 'collection.json')
+    snapshot_file.write(collection_file, {'nodes': {'list': []}})
+    with pytest.raises(report_render.ExportCancelled):
+        report_render._render_pdf_section_part(collection_file, 'nodes', ['nodes'], str(tmp_path / 'nodes.pdf'), {}, str(cancel_file))
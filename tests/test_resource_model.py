@@ -0,0 +1,56 @@
+import copy
+import json
+import pytest
+from flask import Flask, jsonify
+from app import clusters, page_cache, resource_model
+from app.list_query import get_field, select_fields
+from app.routes import main_bp
+
+def _pod(name, namespace='app'):
+    return {
+        'apiVersion': 'v1', 'kind': 'Pod',
+        'metadata': {'name': name, 'namespace': namespace, 'labels': {'app': name.split('-')[0]}},
+        'spec': {'containers': [{'name': 'main', 'image': 'registry/web:1.0'}]},
+        'status': {'phase': 'Running'}
+    }
+
+def _snapshot():
+    return {
+        'nodes': {'list': [{'NAME': f'worker-{i}', 'STATUS': 'Ready', 'ROLES': 'worker'} for i in range(3)], 'details': {}},
+        'events': {'events_list': [{'TYPE': 'Warning', 'REASON': 'BackOff', 'OBJECT': 'pod/web-1', 'MESSAGE': 'Back-off'}]},
+        'storage': {'pvc_summary_list': [{'NAMESPACE': 'app', 'NAME': 'data', 'STATUS': 'Bound', 'ACCESS MODES': 'RWO'}]},
+        'namespace_resources': {'app': {'namespace': 'app', 'pods': {'items': [_pod('web-1'), _pod('web-2')]}}},
+        'namespaces': ['app']
+    }
+
+def test_records_behave_like_the_dicts_they_replace():
+    pods = [resource_model.compact(_pod(name)) for name in ('web-1', 'web-2')]
+    assert pods[0] == _pod('web-1') and pods[0] != _pod('web-2')
+    assert pods[0]['metadata'].get('labels') == {'app': 'web'} and 'kind' in pods[0] and pods[0].get('missing') is None
+    assert get_field(pods[1], 'spec.containers.0.image') == 'registry/web:1.0'
+    assert select_fields(pods[1], ['metadata.name', 'status.phase']) == {'metadata': {'name': 'web-2'}, 'status': {'phase': 'Running'}}
+
+    # Objects with the same keys share a shape, and equal strings are stored once
+    assert pods[0]._shape is pods[1]._shape
+    assert pods[0]['spec']['containers'][0]['image'] is pods[1]['spec']['containers'][0]['image']
+
+    app = Flask(__name__)
+    resource_model.init_app(app)
+    with app.app_context():
+        assert json.loads(jsonify(pods).get_data()) == [_pod('web-1'), _pod('web-2')]
+    assert json.loads(json.dumps(pods, default=resource_model.json_default)) == [_pod('web-1'), _pod('web-2')]
+
+def test_compacted_snapshot_renders_like_the_original(tmp_path):
+    data = _snapshot()
+    compacted = resource_model.compact_snapshot(copy.deepcopy(data))
+    assert isinstance(compacted['nodes']['list'], list) and isinstance(compacted['nodes']['list'][0], resource_model.Record)
+    assert isinstance(compacted['namespace_resources']['app']['pods']['items'][0], resource_model.Record)
+    assert compacted['namespaces'] == ['app'] and compacted == data
+
+    app = Flask('app', instance_path=str(tmp_path))
+    app.register_blueprint(main_bp)
+    clusters.init_app(app)
+    resource_model.init_app(app)
+    with app.test_request_context():
+        for page in ('nodes', 'events', 'storage'):
+            assert page_cache.render_page(page, compacted) == page_cache.render_page(page, data)
@@ -0,0 +1,57 @@
+import gzip
+import json
+import pytest
+from flask import Flask, jsonify
+from app import responses
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    responses.init_app(app)
+
+    @app.route('/snapshot')
+    def snapshot():
+        etag = responses.make_etag('collection_20260301_100000')
+        cached = responses.not_modified(etag)
+        if cached:
+            return cached
+        return responses.json_response({'items': [{'name': f'pod-{i}', 'phase': 'Running'} for i in range(5000)]}, etag)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'status': 'idle'})
+
+    @app.route('/large')
+    def large():
+        return jsonify({'history': ['entry'] * 1000})
+
+    return app.test_client()
+
+def test_streamed_response_is_compressed_and_revalidated(client):
+    resp = client.get('/snapshot', headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    data = json.loads(gzip.decompress(resp.get_data()))
+    assert len(data['items']) == 5000
+
+    etag = resp.headers['ETag']
+    assert etag.startswith('W/"collection_20260301_100000:')
+    resp = client.get('/snapshot', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.get_data() == b''
+
+    # A different query is a different representation
+    resp = client.get('/snapshot?limit=1', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert 'Content-Encoding' not in resp.headers
+
+def test_buffered_json_is_compressed_when_worth_it(client):
+    resp = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.json == {'status': 'idle'}
+
+    resp = client.get('/large', headers={'Accept-Encoding': 'gzip;q=1.0, identity;q=0.5'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(resp.get_data()))['history'] == ['entry'] * 1000
@@ -0,0 +1,165 @@
+import os
+import time
+import pytest
+from flask import Flask
+from app import clusters, scheduler
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask('app', instance_path=str(tmp_path))
+    clusters.init_app(app)
+    monkeypatch.setattr(scheduler, 'current_data', {})
+    monkeypatch.setattr(scheduler, 'section_schedule', {})
+    monkeypatch.setattr(scheduler, 'unpublished_sections', {})
+    with app.app_context():
+        yield app
+
+def _schedule(section, cluster='default'):
+    state = {'interval': 60, 'effective_interval': 60}
+    scheduler.section_schedule.setdefault(cluster, {})[section] = state
+    return state
+
+def test_time_series_refresh_is_kept_for_the_next_snapshot(app, monkeypatch):
+    published, recorded = [], []
+    monkeypatch.setattr(scheduler, '_get_section_collectors', lambda: {
+        'metrics': lambda kubeconfig, cluster=None: {'nodes': [{'NAME': 'worker-1', 'CPU': '1'}]},
+        'nodes': lambda kubeconfig, cluster=None: {'list': [{'NAME': 'worker-1'}]}
+    })
+    monkeypatch.setattr(scheduler, '_record_metrics', lambda cluster, metrics: recorded.append(metrics))
+    monkeypatch.setattr(scheduler, '_index_snapshot', lambda snapshot_id, cluster, data: None)
+    monkeypatch.setattr(scheduler, '_prerender_pages', lambda snapshot_id, cluster, data, sections, previous: published.append(sections))
+    monkeypatch.setattr(scheduler.live_updates, 'publish', lambda *args, **fields: None)
+    scheduler.current_data['default'] = {'nodes': {'list': []}, 'metrics': {}}
+    _schedule('metrics')
+    _schedule('nodes')
+
+    assert scheduler._refresh_section('metrics', 'default')
+    assert recorded and not published
+    assert scheduler.current_data['default']['metrics'] == {'nodes': [{'NAME': 'worker-1', 'CPU': '1'}]}
+
+    # The next snapshot, written for another section, carries the latest metrics, and has their pages rendered again
+    assert scheduler._refresh_section('nodes', 'default')
+    assert published == [['nodes', 'metrics']]
+    assert scheduler.unpublished_sections == {}
+
+def test_snapshot_ids_are_unique_and_retention_counts_days(app):
+    data_dir = clusters.get_data_dir('default')
+    first = scheduler._save_collected_data({'nodes': {}}, 'default')
+    second = scheduler._save_collected_data({'nodes': {}}, 'default')
+    assert first != second and sorted([second, first]) == [first, second]
+
+    # Files older than the retention period are removed
+    app.config['SNAPSHOT_RETENTION_DAYS'] = 1
+    expired = time.time() - 2 * 86400
+    for path in (first, second):
+        os.utime(path, (expired, expired))
+    scheduler._save_collected_data({'nodes': {}}, 'default')
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert len([f for f in os.listdir(data_dir) if f.endswith('.json')]) == 1
+
+def test_run_waiting_for_its_cluster_does_not_hold_a_slot(app, monkeypatch):
+    monkeypatch.setattr(scheduler, 'collection_slots', scheduler.threading.BoundedSemaphore(1))
+    monkeypatch.setattr(scheduler.scheduler, 'app', app, raising=False)
+    monkeypatch.setattr(scheduler, '_collect_cluster', lambda cluster: cluster)
+    busy = scheduler._get_cluster_lock('busy')
+    busy.acquire()
+    waiting = scheduler.threading.Thread(target=scheduler.collect_data, args=['busy'], daemon=True)
+    waiting.start()
+    waiting.join(0.1)
+    # The other cluster gets the only slot while the busy cluster's run waits for its lock
+    other = scheduler.threading.Thread(target=scheduler.collect_data, args=['idle'], daemon=True)
+    other.start()
+    other.join(1)
+    busy.release()
+    assert not other.is_alive()
+    waiting.join(1)
+    assert not waiting.is_alive()
+
+def test_concurrent_worker_requests_are_all_merged(app):
+    threads = [
+        scheduler.threading.Thread(target=lambda name=name: _submit_in_context(app, run_collection=[name]))
+        for name in (f'cluster-{index}' for index in range(8))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(os.path.join(app.instance_path, scheduler.WORKER_REQUESTS_FILE)) as f:
+        assert len(scheduler.json.load(f)['run_collection']) == 8
+    assert not [name for name in os.listdir(app.instance_path) if name.endswith('.tmp')]
+
+def _submit_in_context(app, **fields):
+    with app.app_context():
+        scheduler._submit_worker_request(**fields)
+
+def test_scheduled_runs_use_the_app_the_scheduler_is_bound_to(app, monkeypatch):
+    from flask import current_app
+    monkeypatch.setattr(scheduler.scheduler, 'app', app, raising=False)
+    monkeypatch.setattr(scheduler, '_collect_cluster', lambda cluster: current_app._get_current_object())
+    monkeypatch.setattr(scheduler, '_refresh_section', lambda section, cluster: current_app._get_current_object())
+
+    # Jobs run in scheduler threads, outside any app context
+    results = []
+    runs = [
+        scheduler.threading.Thread(target=lambda: results.append(scheduler.collect_data('default'))),
+        scheduler.threading.Thread(target=lambda: results.append(scheduler.collect_section('nodes', 'default')))
+    ]
+    for run in runs:
+        run.start()
+        run.join()
+    assert results == [app, app]
+
+class Interrupted(BaseException):
+    """A collector worker shutdown in the middle of a run."""
+
+def test_resumed_run_skips_the_sections_already_staged(app, monkeypatch):
+    calls, published = [], []
+
+    def collector(section, interrupt=False):
+        def collect(kubeconfig, cluster=None):
+            calls.append(section)
+            if interrupt and calls.count(section) == 1:
+                raise Interrupted()
+            return {'list': [section]}
+        return collect
+    monkeypatch.setattr(scheduler, '_get_section_collectors', lambda: {
+        'nodes': collector('nodes'),
+        'operators': collector('operators', interrupt=True)
+    })
+    monkeypatch.setattr(scheduler, 'get_namespaces_list', lambda kubeconfig, cluster=None: ['app'])
+    monkeypatch.setattr(scheduler, 'get_resources_for_namespace', lambda namespace, kubeconfig, cluster=None: {'pods': []})
+    monkeypatch.setattr(scheduler, '_publish_collected_data', lambda data, cluster, sections=None: published.append(data))
+    monkeypatch.setattr(scheduler, '_save_collection_history', lambda: None)
+    monkeypatch.setattr(scheduler, 'collection_history', [])
+    monkeypatch.setattr(scheduler, 'collection_stats', {'total': 0, 'successful': 0, 'partial': 0, 'failed': 0, 'avg_duration': 0})
+    monkeypatch.setattr(scheduler, 'collection_status', dict(scheduler.collection_status))
+    monkeypatch.setattr(scheduler, 'cluster_status', {})
+
+    with pytest.raises(Interrupted):
+        scheduler._collect_cluster('default')
+    assert scheduler.staging.get_unfinished_run('default')['steps']['nodes']['status'] == 'success'
+
+    assert scheduler._collect_cluster('default')
+    assert calls == ['nodes', 'operators', 'operators']
+    assert published[0]['nodes'] == {'list': ['nodes']} and published[0]['operators'] == {'list': ['operators']}
+    assert scheduler.collection_history[-1]['sections']['nodes'] == 'resumed'
+    assert scheduler.staging.get_unfinished_run('default') is None
+
+def test_volatile_fields_dont_count_as_changes():
+    etcd = {'members': [{'POD': 'etcd-0', 'HEALTHY': True, 'TOOK': '5ms', 'RAFT_INDEX': 100}], 'checked_at': '2026-03-01T10:00:00'}
+    rechecked = {'members': [{'POD': 'etcd-0', 'HEALTHY': True, 'TOOK': '7ms', 'RAFT_INDEX': 180}], 'checked_at': '2026-03-01T10:05:00'}
+    assert scheduler._section_digest(etcd, 'etcd') == scheduler._section_digest(rechecked, 'etcd')
+    assert scheduler._section_digest(etcd, 'etcd') != scheduler._section_digest(
+        {'members': [{'POD': 'etcd-0', 'HEALTHY': False, 'TOOK': '5ms', 'RAFT_INDEX': 100}], 'checked_at': '2026-03-01T10:00:00'}, 'etcd'
+    )
+
+    def describe(heartbeat, status='False'):
+        return (
+            f"Lease:\n  HolderIdentity:  worker-1\n  RenewTime:       {heartbeat}\n"
+            f"Conditions:\n  MemoryPressure   {status}   {heartbeat}   Sun, 01 Mar 2026 09:00:00 +0000   KubeletHasSufficientMemory\n"
+        )
+    nodes = {'list': [{'NAME': 'worker-1', 'AGE': '10d'}], 'details': {'worker-1': describe('Sun, 01 Mar 2026 10:00:00 +0000')}}
+    later = {'list': [{'NAME': 'worker-1', 'AGE': '11d'}], 'details': {'worker-1': describe('Sun, 01 Mar 2026 10:05:07 +0000')}}
+    pressure = {'list': [{'NAME': 'worker-1', 'AGE': '11d'}], 'details': {'worker-1': describe('Sun, 01 Mar 2026 10:05:07 +0000', 'True')}}
+    assert scheduler._section_digest(nodes, 'nodes') == scheduler._section_digest(later, 'nodes')
+    assert scheduler._section_digest(nodes, 'nodes') != scheduler._section_digest(pressure, 'nodes')
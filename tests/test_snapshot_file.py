@@ -0,0 +1,47 @@
+import json
+from app import snapshot_file
+
+SNAPSHOT = {
+    'nodes': {'list': [{'NAME': 'worker-1', 'STATUS': 'Ready'}]},
+    'etcd': {'health': 'healthy', 'members': ['etcd-1', 'etcd-2']},
+    'events': {'events_list': [{'reason': 'BackOff', 'message': 'Back-off restarting "app"\n'}]}
+}
+
+def test_sections_are_loaded_on_first_access(tmp_path):
+    collection_file = str(tmp_path / 'collection_20260301_100000.json')
+    snapshot_file.write(collection_file, SNAPSHOT)
+    # Still the document json.dump writes, for the readers of whole files
+    with open(collection_file) as f:
+        assert f.read() == json.dumps(SNAPSHOT, indent=2)
+
+    snapshot = snapshot_file.SnapshotFile(collection_file)
+    assert list(snapshot) == ['nodes', 'etcd', 'events'] and 'etcd' in snapshot
+    assert snapshot.loaded_sections == []
+    assert snapshot['etcd'] == SNAPSHOT['etcd']
+    assert snapshot.get('metrics') is None
+    assert snapshot.loaded_sections == ['etcd']
+    assert snapshot.has_data('nodes') and not snapshot.has_data('metrics')
+    assert snapshot.loaded_sections == ['etcd']
+    assert dict(snapshot) == SNAPSHOT
+
+def test_files_without_a_matching_index_are_loaded_whole(tmp_path):
+    legacy_file = tmp_path / 'collection_20260301_100000.json'
+    legacy_file.write_text(json.dumps(SNAPSHOT))
+    snapshot = snapshot_file.SnapshotFile(str(legacy_file))
+    assert snapshot.loaded_sections == list(SNAPSHOT) and dict(snapshot) == SNAPSHOT
+
+    # An index that doesn't describe the file (e.g. rewritten since) is ignored
+    collection_file = str(tmp_path / 'collection_20260301_100100.json')
+    snapshot_file.write(collection_file, SNAPSHOT)
+    with open(collection_file, 'w') as f:
+        json.dump(dict(SNAPSHOT, etcd={}), f)
+    assert snapshot_file.SnapshotFile(collection_file)['etcd'] == {}
+
+    snapshot_file.remove(collection_file)
+    assert not (tmp_path / 'collection_20260301_100100.json.index').exists()
+
+def test_empty_sections_have_no_data(tmp_path):
+    collection_file = str(tmp_path / 'collection_20260301_100000.json')
+    snapshot_file.write(collection_file, {'etcd': {}, 'events': [], 'network': None, 'nodes': {'list': []}})
+    snapshot = snapshot_file.SnapshotFile(collection_file)
+    assert [key for key in snapshot if snapshot.has_data(key)] == ['nodes']
@@ -0,0 +1,37 @@
+from app.collector.table_parser import parse_table, parse_table_columns
+
+PVCS = (
+    "NAMESPACE   NAME        STATUS    VOLUME     CAPACITY   ACCESS MODES   STORAGECLASS   AGE   VOLUMEMODE\n"
+    "app         data-db-0   Bound     pvc-1a2b   10Gi       RWO            gp3-csi        12d   Filesystem\n"
+    "app         cache       Pending                                        gp3-csi        5m    Filesystem\n"
+)
+
+OPERATORS = (
+    "NAME             VERSION   AVAILABLE   PROGRESSING   DEGRADED   SINCE   MESSAGE\n"
+    "authentication   4.17.4    True        False         False      3d      \n"
+    "ingress          4.17.4    True        True          False      2m      Progressing: 1 of 2 router pods updated\n"
+)
+
+def test_columns_are_located_from_header_offsets():
+    pvcs = parse_table(PVCS)
+    assert pvcs[0]['ACCESS MODES'] == 'RWO' and pvcs[0]['AGE'] == '12d'
+    assert pvcs[1]['CAPACITY'] == '' and pvcs[1]['STORAGECLASS'] == 'gp3-csi'
+
+    operators = parse_table_columns(OPERATORS)
+    assert list(operators) == ['NAME', 'VERSION', 'AVAILABLE', 'PROGRESSING', 'DEGRADED', 'SINCE', 'MESSAGE']
+    assert operators['MESSAGE'] == ['', 'Progressing: 1 of 2 router pods updated']
+
+def test_headerless_and_misaligned_lines():
+    usage = parse_table("worker-1   250m   3%   4012Mi   12%\nworker-2   1200m   15%   8000Mi   25%\nbroken\n",
+                        ['NAME', 'CPU(cores)', 'CPU%', 'MEMORY(bytes)', 'MEMORY%'])
+    assert [node['NAME'] for node in usage] == ['worker-1', 'worker-2'] and usage[1]['MEMORY%'] == '25%'
+
+    # A line whose value overflows its column is split on whitespace, one that can't be is skipped,
+    # and trailing empty values are trimmed by oc
+    table = "NAME    STATUS    AGE\nweb-1   Running   3d\nweb-2-with-a-long-name Pending 1m\nweb-3-with-a-long-name Failed\nweb-4\n"
+    assert parse_table(table) == [
+        {'NAME': 'web-1', 'STATUS': 'Running', 'AGE': '3d'},
+        {'NAME': 'web-2-with-a-long-name', 'STATUS': 'Pending', 'AGE': '1m'},
+        {'NAME': 'web-4', 'STATUS': '', 'AGE': ''}
+    ]
+    assert parse_table('') == [] and parse_table_columns('NAME   AGE\n') == {}
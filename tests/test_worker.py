@@ -0,0 +1,51 @@
+import os
+import json
+import pytest
+from flask import Flask
+from app import clusters, scheduler, worker
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask('app', instance_path=str(tmp_path))
+    clusters.init_app(app)
+    with app.app_context():
+        yield app
+
+def test_only_one_worker_is_the_leader(tmp_path):
+    lock_path = str(tmp_path / worker.LOCK_FILE)
+    leader = worker._acquire_leader_lock(lock_path)
+    assert leader is not None
+    with open(lock_path) as f:
+        assert str(os.getpid()) in f.read()
+    assert worker._acquire_leader_lock(lock_path) is None
+
+    # The standby worker takes over once the leader goes away
+    leader.close()
+    standby = worker._acquire_leader_lock(lock_path)
+    assert standby is not None
+    standby.close()
+
+def test_requests_are_merged_until_the_worker_claims_them(app, monkeypatch):
+    scheduler._submit_worker_request(run_collection=['default'], interval=7200)
+    scheduler._submit_worker_request(run_collection=['default', 'other'], refresh_namespaces=['default/app'])
+    requests_file = os.path.join(app.instance_path, scheduler.WORKER_REQUESTS_FILE)
+    with open(requests_file) as f:
+        assert json.load(f) == {'run_collection': ['default', 'other'], 'interval': 7200, 'refresh_namespaces': ['default/app']}
+
+    started, refreshed, scheduled = [], [], []
+    monkeypatch.setattr(scheduler, 'collector_process', True)
+    monkeypatch.setattr(scheduler, 'scheduled_clusters', clusters.get_cluster_names())
+    monkeypatch.setattr(scheduler, 'collection_status', dict(scheduler.collection_status, interval=3600))
+    monkeypatch.setattr(scheduler, 'cluster_status', {})
+    monkeypatch.setattr(scheduler, '_start_collection_thread', started.append)
+    monkeypatch.setattr(scheduler, 'request_namespace_refresh', lambda namespace, cluster: refreshed.append((cluster, namespace)))
+    monkeypatch.setattr(scheduler, '_schedule_collection_job', lambda: scheduled.append(True))
+    monkeypatch.setattr(scheduler, '_save_collection_history', lambda: None)
+    scheduler.process_worker_requests()
+
+    # Unknown clusters are ignored, and the claimed requests are handled only once
+    assert started == ['default'] and refreshed == [('default', 'app')] and scheduled == [True]
+    assert scheduler.collection_status['interval'] == 7200
+    assert not os.path.exists(requests_file) and not os.path.exists(f'{requests_file}.processing')
+    scheduler.process_worker_requests()
+    assert started == ['default']